@@ -1,9 +1,15 @@
 from flask import Blueprint
 from app.api.routes.conda import conda_routes
 from app.api.routes.tasks import task_routes
+from app.api.routes.cache import cache_routes
+from app.api.routes.logs import logs_routes
+from app.api.routes.retention import retention_routes
 
 api = Blueprint('api', __name__, url_prefix='/api')
 
 # 注册子路由
 api.register_blueprint(conda_routes)
 api.register_blueprint(task_routes)
+api.register_blueprint(cache_routes)
+api.register_blueprint(logs_routes)
+api.register_blueprint(retention_routes)
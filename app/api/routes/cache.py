@@ -0,0 +1,73 @@
+from flask import Blueprint, request, jsonify
+from app.api.routes.tasks import task_scheduler
+
+# 数据缓存由任务执行器管理，与任务路由共用同一个实例
+data_cache = task_scheduler.executor.data_cache
+
+# 创建蓝图
+cache_routes = Blueprint('cache', __name__, url_prefix='/cache')
+
+
+@cache_routes.route('', methods=['GET'])
+def get_cache_usage():
+    """获取数据缓存的总占用、各命名空间的大小、最近访问时间和命中统计
+
+    可选查询参数refresh=true：立即重新统计，默认返回后台线程最近一次的统计结果
+    """
+    try:
+        refresh = request.args.get('refresh', 'false').lower() == 'true'
+        return jsonify({"success": True, "data": data_cache.get_usage(refresh=refresh)}), 200
+    except Exception as e:
+        return jsonify({"success": False, "message": "Failed to get cache usage", "error": str(e)}), 500
+
+
+@cache_routes.route('/evict', methods=['POST'])
+def evict_cache():
+    """立即执行一次淘汰，超出预算时按最近访问时间删除未固定的文件"""
+    try:
+        result = data_cache.evict()
+        return jsonify({"success": True, "message": "Cache eviction completed", "data": result}), 200
+    except Exception as e:
+        return jsonify({"success": False, "message": "Failed to evict cache", "error": str(e)}), 500
+
+
+def _get_pin_params():
+    """从JSON请求体中读取固定项参数，格式无效时返回错误响应"""
+    data = request.get_json(silent=True) or {}
+    namespace = data.get('namespace')
+    path = data.get('path') or ''
+    if not namespace or not data_cache.is_known_namespace(namespace):
+        return None, None, (jsonify({
+            "success": False,
+            "message": "Invalid cache namespace",
+            "error": "namespace must be tasks/<task_id> or shared/<name>"
+        }), 400)
+    return namespace, path, None
+
+
+@cache_routes.route('/pins', methods=['POST'])
+def pin_cache_path():
+    """固定命名空间或其中的路径，固定的文件不会被淘汰"""
+    namespace, path, error = _get_pin_params()
+    if error:
+        return error
+    try:
+        data_cache.pin(namespace, path)
+    except ValueError as e:
+        return jsonify({"success": False, "message": "Invalid cache path", "error": str(e)}), 400
+    return jsonify({"success": True, "message": "Cache path pinned", "namespace": namespace, "path": path}), 200
+
+
+@cache_routes.route('/pins', methods=['DELETE'])
+def unpin_cache_path():
+    """取消固定"""
+    namespace, path, error = _get_pin_params()
+    if error:
+        return error
+    try:
+        removed = data_cache.unpin(namespace, path)
+    except ValueError as e:
+        return jsonify({"success": False, "message": "Invalid cache path", "error": str(e)}), 400
+    if not removed:
+        return jsonify({"success": False, "message": "Pin not found"}), 404
+    return jsonify({"success": True, "message": "Cache path unpinned", "namespace": namespace, "path": path}), 200
@@ -0,0 +1,58 @@
+from flask import Blueprint, request, jsonify
+from app.api.routes.tasks import task_scheduler
+
+# 创建蓝图
+logs_routes = Blueprint('logs', __name__, url_prefix='/logs')
+
+# 搜索结果最多返回的执行数
+DEFAULT_SEARCH_LIMIT = 50
+MAX_SEARCH_LIMIT = 200
+
+
+@logs_routes.route('/search', methods=['GET'])
+def search_logs():
+    """在已结束执行的日志中搜索文本
+
+    查询参数:
+    - q: 要搜索的文本，按子串匹配，不区分大小写，至少3个字符
+    - task_id: 只搜索该任务的执行（可选）
+    - since: 只搜索在该时间之后开始的执行，格式为YYYY-MM-DD或YYYY-MM-DD HH:MM:SS（可选）
+    - status: 只搜索这些状态的执行，多个状态用逗号分隔（可选）
+    - limit: 最多返回的执行数，默认50，最大200（可选）
+    """
+    query = request.args.get('q', '')
+    if not query.strip():
+        return jsonify({"success": False, "message": "Missing search query", "error": "q is required"}), 400
+
+    try:
+        task_id = request.args.get('task_id')
+        task_id = int(task_id) if task_id else None
+        limit = min(int(request.args.get('limit', DEFAULT_SEARCH_LIMIT)), MAX_SEARCH_LIMIT)
+        if limit <= 0:
+            raise ValueError("limit must be a positive integer")
+    except ValueError as e:
+        return jsonify({"success": False, "message": "Invalid search parameters", "error": str(e)}), 400
+
+    statuses = [status.strip() for status in request.args.get('status', '').split(',') if status.strip()]
+
+    try:
+        results = task_scheduler.history.search_logs(query,
+                                                     task_id=task_id,
+                                                     since=request.args.get('since') or None,
+                                                     statuses=statuses or None,
+                                                     limit=limit)
+    except ValueError as e:
+        return jsonify({"success": False, "message": "Invalid search query", "error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"success": False, "message": "Failed to search logs", "error": str(e)}), 500
+
+    return jsonify({"success": True, "query": query, "count": len(results), "data": results}), 200
+
+
+@logs_routes.route('/stats', methods=['GET'])
+def get_log_storage_stats():
+    """获取日志占用的磁盘空间和压缩效果（压缩比、节省的字节数）"""
+    try:
+        return jsonify({"success": True, "data": task_scheduler.history.get_log_storage_stats()}), 200
+    except Exception as e:
+        return jsonify({"success": False, "message": "Failed to get log storage stats", "error": str(e)}), 500
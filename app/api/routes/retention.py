@@ -0,0 +1,78 @@
+from flask import Blueprint, request, jsonify
+from app.api.routes.tasks import task_scheduler
+
+# 保留策略由任务历史管理，与任务路由共用同一个实例
+history = task_scheduler.history
+
+# 创建蓝图
+retention_routes = Blueprint('retention', __name__, url_prefix='/retention')
+
+
+@retention_routes.route('', methods=['GET'])
+def get_retention():
+    """获取全局策略、任务策略、后台清理间隔和最近一次清理的结果"""
+    try:
+        return jsonify({
+            "success": True,
+            "data": {
+                **history.retention.get_config(), "last_run": history.last_retention
+            }
+        }), 200
+    except Exception as e:
+        return jsonify({"success": False, "message": "Failed to get retention policy", "error": str(e)}), 500
+
+
+@retention_routes.route('', methods=['PUT'])
+def update_retention():
+    """更新全局策略的部分字段和后台清理间隔
+
+    请求体: {"global": {"max_age_days": 30, ...}, "interval_seconds": 3600}，字段为null表示不限制
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        history.retention.update(data.get('global'), data.get('interval_seconds'))
+    except ValueError as e:
+        return jsonify({"success": False, "message": "Invalid retention policy", "error": str(e)}), 400
+    return jsonify({
+        "success": True,
+        "message": "Retention policy updated",
+        "data": history.retention.get_config()
+    }), 200
+
+
+@retention_routes.route('/tasks/<int:task_id>', methods=['PUT'])
+def set_task_retention(task_id):
+    """设置任务策略，替换该任务原有的策略"""
+    if not task_scheduler.scheduler.repository.get_task(task_id):
+        return jsonify({"success": False, "message": f"Task with ID {task_id} not found"}), 404
+    data = request.get_json(silent=True)
+    try:
+        history.retention.set_task_policy(task_id, data if data is not None else {})
+    except ValueError as e:
+        return jsonify({"success": False, "message": "Invalid retention policy", "error": str(e)}), 400
+    return jsonify({
+        "success": True,
+        "message": "Task retention policy updated",
+        "data": history.retention.get_config()
+    }), 200
+
+
+@retention_routes.route('/tasks/<int:task_id>', methods=['DELETE'])
+def delete_task_retention(task_id):
+    """删除任务策略，之后该任务只受全局策略限制"""
+    history.retention.set_task_policy(task_id, None)
+    return jsonify({
+        "success": True,
+        "message": "Task retention policy removed",
+        "data": history.retention.get_config()
+    }), 200
+
+
+@retention_routes.route('/run', methods=['POST'])
+def run_retention():
+    """立即按当前策略清理一次"""
+    try:
+        result = history.apply_retention()
+        return jsonify({"success": True, "message": "Retention completed", "data": result}), 200
+    except Exception as e:
+        return jsonify({"success": False, "message": "Failed to apply retention", "error": str(e)}), 500
@@ -1,8 +1,8 @@
-from flask import Blueprint, request, jsonify, Response, stream_with_context
+from flask import Blueprint, request, jsonify, Response, stream_with_context, send_file
 from app.services import TaskScheduler, CondaManager
+from app.services.tasks.helpers import ExitClassifier, ProcessPriority, RetryPolicy
 from datetime import datetime
 import json
-import time
 
 # 创建实例
 task_scheduler = TaskScheduler()
@@ -17,6 +17,22 @@ task_operation_manager = task_scheduler.operation_manager
 # 创建蓝图
 task_routes = Blueprint('tasks', __name__, url_prefix='/tasks')
 
+# 实时日志流没有新日志时发送保活注释的间隔（秒），以及客户端断线后重连的等待时间（毫秒）
+LOG_STREAM_KEEPALIVE = 15
+LOG_STREAM_RETRY_MS = 3000
+# 实时日志流发送已有日志时每个事件的最大字节数
+LOG_STREAM_CHUNK_BYTES = 256 * 1024
+# 按行向前翻页未指定limit时每页的行数
+DEFAULT_LOG_PAGE_LINES = 1000
+# 任务详情中最多返回的最近执行数
+MAX_HISTORY_LIMIT = 200
+# 分页获取执行记录时每页的条数
+DEFAULT_EXECUTIONS_LIMIT = 50
+MAX_EXECUTIONS_LIMIT = 200
+# 资源时间序列默认和最多返回的点数
+DEFAULT_METRICS_POINTS = 500
+MAX_METRICS_POINTS = 5000
+
 
 # 通用错误响应处理
 def handle_error_response(result, default_status_code=400):
@@ -38,6 +54,36 @@ def handle_error_response(result, default_status_code=400):
     return jsonify(result), 200
 
 
+def parse_form_number(name, cast=int):
+    """从表单中读取数值参数，未提供时返回None
+
+    Raises:
+        ValueError: 参数不是有效的数值
+    """
+    value = request.form.get(name)
+    if value is None or value.strip() == '':
+        return None
+    try:
+        return cast(value)
+    except ValueError:
+        raise ValueError(f"{name} must be a {'number' if cast is float else 'integer'}")
+
+
+def parse_query_number(name, cast=int):
+    """读取非负数值查询参数，未提供时返回None
+
+    Raises:
+        ValueError: 参数不是非负数
+    """
+    value = request.args.get(name)
+    if value is None or value == '':
+        return None
+    number = cast(value)
+    if not number >= 0:
+        raise ValueError(f"{name} must be a non-negative number")
+    return number
+
+
 @task_routes.route('', methods=['POST'])
 def schedule_task():
     """创建新任务，支持上传脚本文件或ZIP包，以及cron表达式或延时执行"""
@@ -70,6 +116,49 @@ def schedule_task():
         else:
             memory_limit = None
 
+        try:
+            # 获取cgroup资源限制
+            cpu_limit = parse_form_number('cpu_limit', float)
+            pids_limit = parse_form_number('pids_limit')
+            io_read_bps = parse_form_number('io_read_bps')
+            io_write_bps = parse_form_number('io_write_bps')
+
+            # 获取执行超时和卡死检测设置
+            timeout_seconds = parse_form_number('timeout_seconds', float)
+            idle_output_timeout = parse_form_number('idle_output_timeout', float)
+
+            # 获取重试策略
+            max_retries = parse_form_number('max_retries')
+            backoff_base = parse_form_number('backoff_base', float)
+            backoff_max = parse_form_number('backoff_max', float)
+
+            # 获取记忆化的有效期和scratch目录的tmpfs大小上限
+            memoize_ttl = parse_form_number('memoize_ttl', float)
+            scratch_tmpfs_mb = parse_form_number('scratch_tmpfs_mb')
+        except ValueError as e:
+            return jsonify({"success": False, "message": "Invalid numeric parameter", "error": str(e)}), 400
+
+        # retry_on为逗号分隔的退出码或执行状态
+        retry_on = RetryPolicy.parse_retry_on(request.form.get('retry_on'))
+
+        # 获取记忆化设置，memoize_inputs为逗号分隔的文件或目录
+        memoize = request.form.get('memoize', 'false').lower() == 'true'
+        memoize_inputs = [path.strip() for path in request.form.get('memoize_inputs', '').split(',')
+                          if path.strip()] or None
+
+        # 获取CPU亲和性，格式如"0,2,4-7"
+        try:
+            cpu_affinity = ProcessPriority.parse_cpu_affinity(request.form.get('cpu_affinity'))
+        except ValueError:
+            return jsonify({
+                "success": False,
+                "message": "Invalid CPU affinity",
+                "error": "cpu_affinity must be a comma separated list of CPU numbers or ranges, e.g. 0,2,4-7"
+            }), 400
+
+        # 获取共享数据缓存的命名空间，不提供时使用任务独立的命名空间
+        cache_namespace = request.form.get('cache_namespace') or None
+
         # 获取自定义启动命令
         command = request.form.get('command')
 
@@ -83,7 +172,23 @@ def schedule_task():
                                                     delay_seconds=delay_seconds,
                                                     priority=priority,
                                                     memory_limit=memory_limit,
-                                                    command=command)
+                                                    command=command,
+                                                    cpu_limit=cpu_limit,
+                                                    pids_limit=pids_limit,
+                                                    io_read_bps=io_read_bps,
+                                                    io_write_bps=io_write_bps,
+                                                    timeout_seconds=timeout_seconds,
+                                                    idle_output_timeout=idle_output_timeout,
+                                                    max_retries=max_retries,
+                                                    backoff_base=backoff_base,
+                                                    backoff_max=backoff_max,
+                                                    retry_on=retry_on,
+                                                    memoize=memoize,
+                                                    memoize_inputs=memoize_inputs,
+                                                    memoize_ttl=memoize_ttl,
+                                                    cpu_affinity=cpu_affinity,
+                                                    scratch_tmpfs_mb=scratch_tmpfs_mb,
+                                                    cache_namespace=cache_namespace)
 
         # 根据结果返回响应
         if result.get('success', False):
@@ -143,9 +248,20 @@ def get_tasks():
 
 @task_routes.route('/<int:task_id>', methods=['GET'])
 def get_task_status(task_id):
-    """获取特定任务状态和执行历史"""
+    """获取特定任务状态和最近几次执行
+
+    查询参数:
+    - history_limit: 返回的最近执行数，默认20，最大200（可选）
+    """
+    try:
+        history_limit = parse_query_number('history_limit')
+    except ValueError as e:
+        return jsonify({"success": False, "message": "Invalid history_limit", "error": str(e)}), 400
+    if history_limit is None:
+        history_limit = task_scheduler.scheduler.DEFAULT_HISTORY_LIMIT
+
     try:
-        status = task_scheduler.scheduler.get_task_status(task_id)
+        status = task_scheduler.scheduler.get_task_status(task_id, min(history_limit, MAX_HISTORY_LIMIT))
         if not status.get('success', False):
             return jsonify(status), 404
         return jsonify(status), 200
@@ -161,9 +277,26 @@ def stop_task(task_id):
     - 运行中的任务：停止其执行进程并将状态改为stopped
     - 已调度或已暂停的任务：将状态改为stopped，不再参与后续调度
     - 已停止的任务：返回不能停止的错误
+
+    可选参数grace_period（JSON请求体或查询参数）：SIGTERM后等待进程组退出的秒数，
+    超时后发送SIGKILL
     """
     try:
-        result = task_scheduler.stop_task(task_id)
+        data = request.get_json(silent=True) or {}
+        grace_period = data.get('grace_period', request.args.get('grace_period'))
+        if grace_period is not None:
+            try:
+                grace_period = float(grace_period)
+            except (TypeError, ValueError):
+                grace_period = -1
+            if grace_period < 0:
+                return jsonify({
+                    "success": False,
+                    "message": "Invalid grace period",
+                    "error": "grace_period must be a non-negative number of seconds"
+                }), 400
+
+        result = task_scheduler.stop_task(task_id, grace_period)
         return handle_error_response(result)
     except Exception as e:
         return jsonify({"success": False, "message": f"Failed to stop task", "error": str(e)}), 500
@@ -221,28 +354,124 @@ def get_task_history():
         return jsonify({"status": "error", "message": str(e)}), 500
 
 
+def send_compressed_log(log_store, task_id, execution_id):
+    """流式解压并返回压缩的日志，支持单个区间的Range请求，偏移量按解压后的内容计算"""
+    total = log_store.get_size(task_id, execution_id)
+    start, end = 0, total
+    status = 200
+    if request.range is not None:
+        byte_range = request.range.range_for_length(total)
+        if byte_range is None:
+            response = Response('', status=416)
+            response.headers['Content-Range'] = f"bytes */{total}"
+            return response
+        start, end = byte_range
+        status = 206
+
+    response = Response(stream_with_context(log_store.iter_bytes(task_id, execution_id, start, end,
+                                                                 LOG_STREAM_CHUNK_BYTES)),
+                        status=status,
+                        mimetype='text/plain; charset=utf-8')
+    response.headers['Content-Length'] = str(end - start)
+    response.headers['Accept-Ranges'] = 'bytes'
+    if status == 206:
+        response.headers['Content-Range'] = f"bytes {start}-{end - 1}/{total}"
+    return response
+
+
+@task_routes.route('/<int:task_id>/executions', methods=['GET'])
+def get_task_executions(task_id):
+    """分页获取任务执行记录的摘要，最近的执行在前
+
+    查询参数:
+    - offset: 跳过最近的多少条，默认0（可选）
+    - limit: 每页的条数，默认50，最大200（可选）
+    - status: 只返回这些状态的执行，多个状态用逗号分隔（可选）
+    """
+    try:
+        offset = parse_query_number('offset') or 0
+        limit = parse_query_number('limit')
+        limit = DEFAULT_EXECUTIONS_LIMIT if limit is None else min(limit, MAX_EXECUTIONS_LIMIT)
+    except ValueError as e:
+        return jsonify({"success": False, "message": "Invalid pagination parameters", "error": str(e)}), 400
+
+    statuses = [status.strip() for status in request.args.get('status', '').split(',') if status.strip()]
+
+    try:
+        result = task_scheduler.scheduler.get_task_executions(task_id, offset, limit, statuses or None)
+        if not result.get('success', False):
+            return jsonify(result), 404
+        return jsonify(result), 200
+    except Exception as e:
+        return jsonify({"success": False, "message": "Failed to get executions", "error": str(e)}), 500
+
+
+@task_routes.route('/<int:task_id>/executions/<execution_id>', methods=['GET'])
+def get_execution(task_id, execution_id):
+    """获取完整的执行记录，包括资源时间序列、日志压缩统计等详情，不包括日志"""
+    try:
+        if not task_scheduler.scheduler.repository.get_task(task_id):
+            return jsonify({"success": False, "message": f"Task with ID {task_id} not found"}), 404
+        execution = task_scheduler.history.get_execution_record(task_id, execution_id)
+        if not execution:
+            return jsonify({
+                "success": False,
+                "message": f"Execution with ID {execution_id} not found for task {task_id}"
+            }), 404
+        return jsonify({"success": True, "data": execution}), 200
+    except Exception as e:
+        return jsonify({"success": False, "message": "Failed to get execution", "error": str(e)}), 500
+
+
+@task_routes.route('/<int:task_id>/executions/<execution_id>/metrics', methods=['GET'])
+def get_execution_metrics(task_id, execution_id):
+    """获取执行的资源时间序列，在服务端降采样，保留每个区间的最小值和最大值
+
+    查询参数:
+    - points: 最多返回的点数，默认500，最大5000（可选）
+    - fields: 只返回这些字段，多个字段用逗号分隔，如memory_usage,cpu_usage（可选）
+    """
+    try:
+        points = parse_query_number('points')
+        if points == 0:
+            raise ValueError("points must be a positive integer")
+    except ValueError as e:
+        return jsonify({"success": False, "message": "Invalid points", "error": str(e)}), 400
+    points = DEFAULT_METRICS_POINTS if points is None else min(points, MAX_METRICS_POINTS)
+    fields = [field.strip() for field in request.args.get('fields', '').split(',') if field.strip()]
+
+    try:
+        result = task_scheduler.scheduler.get_execution_metrics(task_id, execution_id, points, fields or None)
+        if not result.get('success', False):
+            return jsonify(result), 404
+        return jsonify(result), 200
+    except Exception as e:
+        return jsonify({"success": False, "message": "Failed to get execution metrics", "error": str(e)}), 500
+
+
 @task_routes.route('/<int:task_id>/executions/<execution_id>/logs', methods=['GET'])
 def get_task_execution_logs(task_id, execution_id):
     """获取任务执行的日志内容
     
     支持查询参数:
     - stream=true (实时获取最新日志)
+    - offset=&limit=&unit=bytes|lines (按字节或行读取一段日志)
+    - tail=N (读取最后N行)
+    - before=<offset>&limit= (读取偏移量之前的一段日志，用于向前翻页)
+    - from=&to= (读取在该时间区间内写入的日志，单位为相对执行开始的秒数)
+    - format=raw (以纯文本返回日志文件，支持HTTP Range请求)
     """
     # 检查查询参数
     stream = request.args.get('stream', 'false').lower() == 'true'
 
     try:
-        # 先获取任务状态以验证任务存在
-        task_status = task_scheduler.scheduler.get_task_status(task_id)
-        if not task_status.get('success', False):
+        # 先验证任务存在
+        task = task_scheduler.scheduler.repository.get_task(task_id)
+        if not task:
             return jsonify({"success": False, "message": f"Task with ID {task_id} not found"}), 404
 
-        # 获取任务执行记录
-        task = task_status.get('task', {})
-        executions = task_status.get('execution_history', [])
-
-        # 查找特定执行记录
-        execution = next((e for e in executions if e.get('execution_id') == execution_id), None)
+        # 查找特定执行记录，只需要状态，不读取执行详情
+        execution = task_scheduler.history.get_execution_summary(task_id, execution_id)
         if not execution:
             return jsonify({
                 "success": False,
@@ -251,66 +480,118 @@ def get_task_execution_logs(task_id, execution_id):
 
         # 如果是流式请求，使用Server-Sent Events返回数据
         if stream:
+            # 断线重连时浏览器通过Last-Event-ID携带已收到的日志字节偏移量，也可以通过offset参数指定
+            resume_from = request.headers.get('Last-Event-ID') or request.args.get('offset')
+            try:
+                start_offset = max(int(resume_from), 0) if resume_from else 0
+            except ValueError:
+                start_offset = 0
+
+            def format_event(logs, offset, is_complete):
+                payload = json.dumps({'logs': logs, 'offset': offset, 'is_complete': is_complete})
+                return f"id: {offset}\ndata: {payload}\n\n"
 
             def generate():
-                # 初始化位置标记和状态
-                last_position = 0
-
-                # 发送当前已有的日志
-                current_record = task_scheduler.history.get_execution_record(task_id, execution_id)
-                if current_record:
-                    current_logs = current_record.get('logs', '')
-                    if current_logs:
-                        yield f"data: {json.dumps({'logs': current_logs, 'is_complete': False})}\n\n"
-                        last_position = len(current_logs)
-
-                # 如果任务仍在运行，持续发送新日志
-                while task_scheduler.executor.is_execution_running(task_id, execution_id):
-                    time.sleep(0.5)  # 短暂暂停避免过度占用CPU
-
-                    current_record = task_scheduler.history.get_execution_record(task_id, execution_id)
-                    if not current_record:
-                        break
-
-                    current_logs = current_record.get('logs', '')
-                    if len(current_logs) > last_position:
-                        new_content = current_logs[last_position:]
-                        yield f"data: {json.dumps({'logs': new_content, 'is_complete': False})}\n\n"
-                        last_position = len(current_logs)
-
-                # 任务完成时发送所有剩余日志和完成事件
-                final_record = task_scheduler.history.get_execution_record(task_id, execution_id)
-                if final_record:
-                    final_logs = final_record.get('logs', '')
-                    if len(final_logs) > last_position:
-                        new_content = final_logs[last_position:]
-                        yield f"data: {json.dumps({'logs': new_content, 'is_complete': True})}\n\n"
+                yield f"retry: {LOG_STREAM_RETRY_MS}\n\n"
+                offset = start_offset
+
+                while True:
+                    # 获取当前日志大小，执行仍在运行时同时订阅新日志
+                    snapshot = task_scheduler.history.subscribe_logs(task_id, execution_id)
+                    if snapshot is None:
+                        return
+
+                    subscription = snapshot['subscription']
+                    try:
+                        # 从日志文件分块发送偏移量之后的已有日志
+                        for logs, end_offset in task_scheduler.history.log_store.iter_chunks(
+                                task_id, execution_id, min(offset, snapshot['size']), snapshot['size'],
+                                LOG_STREAM_CHUNK_BYTES):
+                            yield format_event(logs, end_offset, False)
+                        offset = snapshot['size']
+
+                        if subscription is None:
+                            # 执行已结束，发送完成事件
+                            yield format_event('', offset, True)
+                            return
+
+                        # 新日志写入时立即推送；执行结束或积压过多被断开时回到外层重新读取
+                        while True:
+                            event = subscription.get(timeout=LOG_STREAM_KEEPALIVE)
+                            if event is None:
+                                yield ": keep-alive\n\n"
+                                continue
+                            kind, data, end_offset = event
+                            if kind != subscription.DATA:
+                                break
+                            yield format_event(data.decode('utf-8', errors='replace'), end_offset, False)
+                            offset = end_offset
+                    finally:
+                        if subscription is not None:
+                            task_scheduler.history.log_broadcaster.unsubscribe(subscription)
 
             return Response(stream_with_context(generate()), content_type='text/event-stream')
 
-        # 非流式请求，返回普通JSON响应
-        # 初始化日志内容
-        logs = execution.get('logs', '')
+        # 纯文本请求直接返回日志文件，由send_file处理Range请求，服务器支持时使用sendfile发送
+        if request.args.get('format') == 'raw' or request.headers.get('Range'):
+            log_store = task_scheduler.history.log_store
+            if not log_store.exists(task_id, execution_id):
+                return Response('', mimetype='text/plain')
+            if log_store.get_compression(task_id, execution_id) is None:
+                try:
+                    return send_file(log_store.get_path(task_id, execution_id),
+                                     mimetype='text/plain; charset=utf-8',
+                                     conditional=True)
+                except FileNotFoundError:
+                    pass  # 日志刚被压缩
+            return send_compressed_log(log_store, task_id, execution_id)
+
+        # 非流式请求，按区间读取日志并返回JSON响应
+        try:
+            range_args = {
+                'offset': parse_query_number('offset'),
+                'limit': parse_query_number('limit'),
+                'tail': parse_query_number('tail'),
+                'before': parse_query_number('before'),
+                'start_seconds': parse_query_number('from', float),
+                'end_seconds': parse_query_number('to', float),
+                'unit': request.args.get('unit', 'bytes')
+            }
+            if range_args['start_seconds'] is not None and range_args['end_seconds'] is not None and \
+                    range_args['end_seconds'] < range_args['start_seconds']:
+                raise ValueError("to must not be earlier than from")
+        except ValueError as e:
+            return jsonify({"success": False, "message": "Invalid log range", "error": str(e)}), 400
+        if range_args['unit'] not in ('bytes', 'lines'):
+            return jsonify({
+                "success": False,
+                "message": "Invalid log range",
+                "error": "unit must be bytes or lines"
+            }), 400
+        if range_args['before'] is not None and range_args['unit'] == 'lines' and range_args['limit'] is None:
+            range_args['limit'] = DEFAULT_LOG_PAGE_LINES
 
-        # 处理实时日志请求 - 获取最新日志内容
-        if task.get('status') == 'running':
-            # 从历史记录管理器中获取最新日志
-            latest_logs = task_scheduler.history.get_execution_record(task_id, execution_id)
-            if latest_logs:
-                logs = latest_logs.get('logs', logs)
+        try:
+            result = task_scheduler.history.read_execution_logs(task_id, execution_id, **range_args)
+        except ValueError as e:
+            return jsonify({"success": False, "message": "Log timestamps not available", "error": str(e)}), 400
 
-        # 检查任务是否已完成
-        is_complete = execution.get('status') in ['completed', 'failed', 'stopped']
-        # 如果任务仍在运行，强制设置为未完成
-        if task.get('status') == 'running':
-            is_complete = False
+        # 检查执行是否已完成
+        is_complete = execution.get('status') in ExitClassifier.TERMINAL_STATUSES
 
         # 构建响应数据
         response_data = {
             "success": True,
             "task_id": task_id,
             "execution_id": execution_id,
-            "logs": logs,
+            "logs": result['logs'],
+            "start": result['start'],
+            "end": result['end'],
+            "total_size": result['total_size'],
+            "has_more_before": result['start'] > 0,
+            "has_more_after": result['end'] < result['total_size'],
+            "time_start": result['time_start'],
+            "time_end": result['time_end'],
             "is_complete": is_complete,
             "last_update": datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         }
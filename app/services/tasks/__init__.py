@@ -1,5 +1,6 @@
 from app.services.tasks.scheduler import Scheduler
 from app.services.tasks.executor import TaskExecutor
+from app.services.tasks.async_executor import AsyncTaskExecutor
 from app.services.tasks.history import TaskHistory
 from app.services.tasks.stats import TaskStats
 from app.services.tasks.file_manager import TaskFileManager
@@ -17,7 +18,8 @@ class TaskScheduler:
     def __init__(self, conda_manager=None):
         # 初始化各个子模块
         self.history = TaskHistory()
-        self.executor = TaskExecutor(self.history)
+        # 设置FIDLTER_ASYNC_EXECUTOR=1时使用基于asyncio事件循环的执行器，接口与TaskExecutor相同
+        self.executor = AsyncTaskExecutor(self.history) if AsyncTaskExecutor.is_enabled() else TaskExecutor(self.history)
         self.scheduler = Scheduler(self.executor, self.history)
         self.stats = TaskStats(self.history, self.scheduler)
 
@@ -72,15 +74,37 @@ class TaskScheduler:
                       delay_seconds=None,
                       priority="normal",
                       memory_limit=None,
-                      command=None):
+                      command=None,
+                      cpu_limit=None,
+                      pids_limit=None,
+                      io_read_bps=None,
+                      io_write_bps=None,
+                      timeout_seconds=None,
+                      idle_output_timeout=None,
+                      max_retries=None,
+                      backoff_base=None,
+                      backoff_max=None,
+                      retry_on=None,
+                      memoize=False,
+                      memoize_inputs=None,
+                      memoize_ttl=None,
+                      cpu_affinity=None,
+                      scratch_tmpfs_mb=None,
+                      cache_namespace=None):
         """调度一个新任务（保留此核心方法作为主要入口点）"""
         return self.scheduler.schedule_task(script_path, conda_env, task_name, requirements, reuse_env, cron_expression,
-                                            delay_seconds, priority, memory_limit, command)
+                                            delay_seconds, priority, memory_limit, command, cpu_limit, pids_limit,
+                                            io_read_bps, io_write_bps, timeout_seconds, idle_output_timeout,
+                                            max_retries, backoff_base, backoff_max, retry_on, memoize,
+                                            memoize_inputs, memoize_ttl, cpu_affinity, scratch_tmpfs_mb,
+                                            cache_namespace)
 
-    def stop_task(self, task_id):
+    def stop_task(self, task_id, grace_period=None):
         """停止任务（保留此常用方法作为快捷方式）"""
-        return self.scheduler.stop_task(task_id)
+        return self.scheduler.stop_task(task_id, grace_period)
 
     def shutdown(self):
         """停止调度器（保留此系统生命周期方法）"""
         self.scheduler.shutdown()
+        self.executor.shutdown()
+        self.history.shutdown()
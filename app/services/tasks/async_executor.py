@@ -0,0 +1,251 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+
+import psutil
+
+from .executor import TaskExecutor
+from .helpers.launch_gate import LaunchGate
+from .helpers.log_filter import LogFilter
+
+
+class AsyncTaskExecutor(TaskExecutor):
+    """基于单个asyncio事件循环的任务执行器
+
+    同步执行器每次执行需要两个线程（读取输出、监控资源），并发执行数较多时线程数随之线性增长。
+    此执行器在一个后台事件循环中完成子进程的创建和等待、输出读取以及采样和超时定时，
+    只有会阻塞的资源采样、收尾和进程终止放入固定大小的线程池执行，线程数与并发执行数无关。
+    进程终止使用单独的线程池，等待进程退出的宽限期不会阻塞其他执行的采样和收尾。
+
+    对外接口（execute_task/stop_task/pause_task/resume_task等）与TaskExecutor相同，
+    设置环境变量FIDLTER_ASYNC_EXECUTOR=1后由TaskScheduler启用
+    """
+
+    ENABLE_ENV = "FIDLTER_ASYNC_EXECUTOR"
+
+    # 执行采样、收尾等阻塞操作的线程数
+    BLOCKING_WORKERS = 8
+    # 终止进程和删除控制组的线程数，等待进程退出的宽限期不占用采样和收尾的线程
+    TERMINATION_WORKERS = 4
+
+    # 执行暂停期间检查恢复的间隔（秒）
+    PAUSED_POLL_INTERVAL = 0.5
+
+    def __init__(self, history_manager):
+        super().__init__(history_manager)
+        self._blocking_pool = ThreadPoolExecutor(max_workers=self.BLOCKING_WORKERS,
+                                                 thread_name_prefix="fidlter-executor")
+        self._termination_pool = ThreadPoolExecutor(max_workers=self.TERMINATION_WORKERS,
+                                                    thread_name_prefix="fidlter-terminate")
+        self._loop = asyncio.new_event_loop()
+        self._loop_ready = threading.Event()
+        self._loop_thread = threading.Thread(target=self._run_loop, name="fidlter-event-loop", daemon=True)
+        self._loop_thread.start()
+        self._loop_ready.wait()
+
+    @classmethod
+    def is_enabled(cls):
+        """检查是否通过环境变量启用了asyncio执行器"""
+        return os.environ.get(cls.ENABLE_ENV, '').lower() in ('1', 'true', 'yes')
+
+    def _run_loop(self):
+        """事件循环线程的入口"""
+        asyncio.set_event_loop(self._loop)
+        self._install_child_watcher()
+        self._loop.call_soon(self._loop_ready.set)
+        self._loop.run_forever()
+
+    def _install_child_watcher(self):
+        """Python 3.12之前默认的子进程监视器会为每个子进程创建一个等待线程，
+        内核支持pidfd时改用PidfdChildWatcher，在事件循环中等待子进程退出"""
+        if sys.version_info >= (3, 12) or not hasattr(asyncio, 'PidfdChildWatcher'):
+            return
+        try:
+            os.close(os.pidfd_open(os.getpid()))
+        except (AttributeError, OSError):
+            self.logger.info("pidfd is not supported, falling back to the default child watcher")
+            return
+        watcher = asyncio.PidfdChildWatcher()
+        watcher.attach_loop(self._loop)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", DeprecationWarning)
+            asyncio.get_event_loop_policy().set_child_watcher(watcher)
+
+    def _start_execution(self, task, execution_id):
+        """将执行提交到事件循环"""
+        asyncio.run_coroutine_threadsafe(self._run_task_async(task, execution_id), self._loop)
+
+    async def _run_task_async(self, task, execution_id):
+        """在事件循环中运行任务进程"""
+        task_id = task['task_id']
+        loop = asyncio.get_running_loop()
+
+        # 为任务创建暂停事件，默认为非阻塞状态
+        self._create_pause_event(task_id)
+
+        cgroup_path = None
+        gate = None
+
+        try:
+            command, working_dir, limits, cgroup_path = await loop.run_in_executor(
+                self._blocking_pool, self._prepare_execution, task, execution_id)
+
+            # 通过/bin/sh -c执行，与同步执行器的shell=True行为一致，进程在放行之前不会执行任务命令
+            gate = LaunchGate()
+            process = await asyncio.create_subprocess_exec(
+                "/bin/sh",
+                "-c",
+                gate.wrap(command),
+                stdin=gate.stdin,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.STDOUT,
+                cwd=working_dir,
+                env=self._build_environment(execution_id),  # 传入scratch目录和数据缓存目录
+                start_new_session=True)  # 每次执行使用独立的会话和进程组，便于整体发送信号
+            gate.spawned()
+
+            # 在父进程中将进程移入控制组（或设置rlimit）并设置调度参数，完成后放行
+            cgroup_path = await loop.run_in_executor(self._blocking_pool, self._attach_resources, task, execution_id,
+                                                     process.pid, cgroup_path, limits)
+            gate.release()
+
+            # 存储进程组信息，便于发送信号
+            self._register_execution(task_id, execution_id, process.pid, cgroup_path)
+            await loop.run_in_executor(self._blocking_pool, self._apply_scheduling, task, execution_id, process.pid,
+                                       cgroup_path)
+
+            # 资源监控和输出读取都是事件循环中的协程
+            sampler = self._create_sampler(process.pid, cgroup_path)
+            monitor = asyncio.ensure_future(self._monitor_async(process, sampler, task, execution_id))
+            reader = asyncio.ensure_future(self._read_output_async(process, task_id, execution_id))
+
+            # 等待进程完成
+            exit_code = await process.wait()
+
+            # 确保输出读取完成
+            try:
+                await asyncio.wait_for(reader, timeout=2.0)
+            except asyncio.TimeoutError:
+                pass
+            monitor.cancel()
+
+            await loop.run_in_executor(self._blocking_pool, self._finish_execution, task, execution_id, exit_code,
+                                       sampler, cgroup_path)
+
+        except Exception as e:
+            if gate:
+                gate.abort()
+            await loop.run_in_executor(self._blocking_pool, self._fail_execution, task, execution_id, e)
+
+        finally:
+            await loop.run_in_executor(self._termination_pool, self._cleanup_execution, task_id, execution_id,
+                                       cgroup_path)
+
+    def _terminate_execution(self, task_id, execution_id, pgid, reason, detail):
+        """在终止线程池中终止执行，采样线程提交后立即返回，不等待进程退出"""
+        self._termination_pool.submit(self._terminate_execution_logged, task_id, execution_id, pgid, reason, detail)
+
+    def _terminate_execution_logged(self, task_id, execution_id, pgid, reason, detail):
+        try:
+            super()._terminate_execution(task_id, execution_id, pgid, reason, detail)
+        except Exception as e:
+            self.logger.error(f"Failed to terminate execution {execution_id} of task {task_id}: {str(e)}")
+
+    def _schedule_escalation(self, grace_period, pgid, cgroup_path, task_id, execution_id):
+        """由事件循环计时宽限期，到期后才在终止线程池中检查并发送SIGKILL，等待期间不占用线程"""
+
+        def escalate():
+            self._termination_pool.submit(self._kill_process_group_logged, pgid, grace_period, cgroup_path, task_id,
+                                          execution_id)
+
+        self._loop.call_soon_threadsafe(self._loop.call_later, grace_period, escalate)
+
+    def _kill_process_group_logged(self, pgid, grace_period, cgroup_path, task_id, execution_id):
+        try:
+            self._kill_process_group(pgid, grace_period, cgroup_path, task_id, execution_id)
+        except Exception as e:
+            self.logger.error(f"Failed to kill process group {pgid} of task {task_id}: {str(e)}")
+
+    async def _read_output_async(self, process, task_id, execution_id):
+        """实时读取和记录进程输出
+
+        参数:
+            process: asyncio子进程对象
+            task_id: 任务ID
+            execution_id: 执行ID
+        """
+        loop = asyncio.get_running_loop()
+        with self.lock:
+            execution = self.active_executions.get(task_id)
+
+        log_filter = LogFilter()
+        # 写日志和推送订阅者需要获取历史记录的锁，放入线程池执行，不阻塞事件循环；
+        # 每个执行同时最多有一次写入，读取下一段输出与上一段的写入并行，日志顺序不变
+        pending_write = None
+        try:
+            # 分块读取而不是readline，进度条只用\r不换行时不会超出StreamReader的行长度限制
+            while True:
+                data = await process.stdout.read(self.OUTPUT_READ_SIZE)
+                if not data:
+                    break
+                if execution:
+                    execution['last_output_at'] = time.monotonic()  # 用于卡死检测
+                if pending_write:
+                    await pending_write
+                pending_write = loop.run_in_executor(self._blocking_pool, self._append_filtered_output, task_id,
+                                                     execution_id, log_filter, data)
+
+            if pending_write:
+                await pending_write
+            await loop.run_in_executor(self._blocking_pool, self._flush_filtered_output, task_id, execution_id,
+                                       log_filter)
+        except Exception as e:
+            self.logger.error(f"Error reading process output for task {task_id}: {str(e)}")
+            await loop.run_in_executor(self._blocking_pool, self.history.append_to_execution_log, task_id,
+                                       execution_id, f"\nError reading output: {str(e)}\n")
+
+    async def _monitor_async(self, process, sampler, task, execution_id):
+        """按采样策略定时采样，超出内存限制、执行超时或卡死时终止进程"""
+        if not sampler:
+            return  # 进程可能已经结束
+
+        task_id = task['task_id']
+        loop = asyncio.get_running_loop()
+        last_pressure_check = 0.0
+
+        while process.returncode is None:
+            try:
+                # 暂停期间不采样，定期检查是否需要回收内存
+                pause_event = self.pause_events.get(task_id)
+                if pause_event and not pause_event.is_set():
+                    now = time.monotonic()
+                    if now - last_pressure_check >= self.PAUSED_PRESSURE_CHECK_INTERVAL:
+                        last_pressure_check = now
+                        await loop.run_in_executor(self._blocking_pool, self._reclaim_paused_memory, task_id,
+                                                   execution_id)
+                    await asyncio.sleep(self.PAUSED_POLL_INTERVAL)
+                    continue
+
+                interval = await loop.run_in_executor(self._blocking_pool, self._monitor_step, sampler, task,
+                                                      execution_id)
+                if interval is None:
+                    break
+                await asyncio.sleep(interval)
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                break
+
+    def shutdown(self):
+        """停止事件循环、线程池和数据缓存的淘汰线程"""
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._loop_thread.join(timeout=5)
+        self._blocking_pool.shutdown(wait=False)
+        self._termination_pool.shutdown(wait=False)
+        with self.lock:
+            fingerprint_pool, self._fingerprint_pool = self._fingerprint_pool, None
+        if fingerprint_pool:
+            fingerprint_pool.shutdown(wait=False)
+        self.data_cache.shutdown()
@@ -6,22 +6,123 @@ import uuid
 import logging
 import os
 import signal
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+from .helpers.cgroup_manager import CgroupManager
+from .helpers.data_cache import DataCache
+from .helpers.exit_classifier import ExitClassifier
+from .helpers.launch_gate import LaunchGate
+from .helpers.log_filter import LogFilter
+from .helpers.memoization import InputFingerprint, MemoCache
+from .helpers.memory_pressure import MemoryPressure
+from .helpers.process_priority import ProcessPriority
+from .helpers.process_reaper import ProcessReaper
+from .helpers.resource_sampler import ResourceSampler
+from .helpers.scratch_manager import ScratchManager
+from .helpers.time_series import SamplingPolicy
+
 
 class TaskExecutor:
     """负责任务的执行和监控"""
 
+    # 停止任务时SIGTERM到SIGKILL之间的默认宽限期（秒）
+    DEFAULT_STOP_GRACE_PERIOD = 10
+    # 发送SIGKILL后等待进程组退出的秒数
+    KILL_WAIT_TIMEOUT = 5
+    # 执行暂停期间检查主机内存压力的间隔（秒）
+    PAUSED_PRESSURE_CHECK_INTERVAL = 5
+    # 判断结束原因时检查的日志尾部字节数
+    LOG_TAIL_BYTES = 2000
+    # 超时或卡死终止时保存到执行记录的日志行数
+    LAST_LOG_LINES = 20
+    # 每次从输出管道读取的最大字节数
+    OUTPUT_READ_SIZE = 64 * 1024
+    # 无输出期间CPU使用率低于该百分比视为卡死
+    STALL_CPU_THRESHOLD = 1.0
+    # 计算输入指纹的线程数
+    FINGERPRINT_WORKERS = 2
+
     def __init__(self, history_manager):
         self.history = history_manager
         self.logger = logging.getLogger("TaskExecutor")
         self.lock = threading.Lock()
         self.pause_events = {}  # 用于存储任务ID与暂停事件的映射
+        self.sampling_policy = SamplingPolicy()  # 资源采样间隔随运行时长逐步放宽
+        self.cgroups = CgroupManager()  # 每次执行使用独立的cgroup施加资源限制
+        self.priorities = ProcessPriority()  # 将任务优先级映射为nice、ionice、oom_score_adj和cgroup权重
+        self.scratch = ScratchManager()  # 每次执行独立的临时目录，执行结束后删除
+        self.data_cache = DataCache(history_manager.persistence)  # 任务之间共享的数据缓存，超出预算时后台淘汰
+        self.memory_pressure = MemoryPressure()  # 内存紧张时回收已暂停执行的内存
+        self.fingerprints = InputFingerprint()  # 计算开启记忆化的任务的输入指纹
+        self.memo_cache = MemoCache(history_manager.persistence)  # 任务ID -> 最近一次成功执行的输入指纹，重启后仍有效
+        self.active_executions = {}  # 任务ID -> 正在运行的执行信息（执行ID、进程组ID、控制组路径、状态）
+        self.stop_grace_period = self.DEFAULT_STOP_GRACE_PERIOD
+        self._completion_callback = None  # 执行结束后调用，用于安排重试
+        self._reaper = None  # 统一检测所有任务进程的退出，首次启动进程时创建
+        self._fingerprint_pool = None  # 计算输入指纹的线程池，首次执行开启记忆化的任务时创建
+
+    def execute_task(self, task, attempt=1, retry_of=None, use_cache=True):
+        """执行任务并监控资源使用情况
 
-    def execute_task(self, task):
-        """执行任务并监控资源使用情况"""
-        task_id = task['task_id']
+        参数:
+            task: 任务对象
+            attempt: 第几次尝试，首次执行为1，重试时递增
+            retry_of: 重试时为上一次尝试的执行ID
+            use_cache: 开启记忆化的任务在输入未变化时是否跳过执行，手动触发时为False
+
+        返回:
+            执行ID
+        """
         execution_id = str(uuid.uuid4())
+        self._add_execution_record(task, execution_id, attempt, retry_of)
+
+        # 开启记忆化的任务需要读取输入文件、查询Conda环境来计算输入指纹，在后台线程中计算后再决定是否跳过，
+        # 不阻塞调度线程和HTTP请求。计算期间执行先登记为pending，is_task_running、停止和删除都能看到它
+        if task.get('memoize'):
+            self._register_pending_execution(task['task_id'], execution_id)
+            self._get_fingerprint_pool().submit(self._execute_memoized, task, execution_id, use_cache)
+            return execution_id
+
+        self._start_execution(task, execution_id)
+        return execution_id
+
+    def _execute_memoized(self, task, execution_id, use_cache):
+        """计算输入指纹，输入与上一次成功执行相同时不再启动进程，否则正常执行"""
+        task_id = task['task_id']
+        try:
+            fingerprint = self._get_input_fingerprint(task)
+            if fingerprint:
+                self.history.update_execution_record(task_id, execution_id, {'input_fingerprint': fingerprint})
+
+            if self._is_stop_requested(task_id, execution_id):
+                self._record_stopped_before_start(task, execution_id)
+                return
+
+            if fingerprint and use_cache:
+                cached_from = self.memo_cache.lookup(task_id, fingerprint, task.get('memoize_ttl'))
+                if cached_from and self.history.get_execution_summary(task_id, cached_from):
+                    self._record_cached_execution(task, execution_id, cached_from)
+                    return
+        except Exception as e:
+            # 返回给调用方的执行ID需要有最终状态
+            self._fail_execution(task, execution_id, e)
+            self._cleanup_execution(task_id, execution_id, None)
+            return
+
+        self._start_execution(task, execution_id)
+
+    def _get_fingerprint_pool(self):
+        """首次执行开启记忆化的任务时创建计算输入指纹的线程池"""
+        with self.lock:
+            if self._fingerprint_pool is None:
+                self._fingerprint_pool = ThreadPoolExecutor(max_workers=self.FINGERPRINT_WORKERS,
+                                                            thread_name_prefix="fidlter-fingerprint")
+            return self._fingerprint_pool
+
+    def _add_execution_record(self, task, execution_id, attempt, retry_of):
+        """写入状态为running的执行记录"""
+        task_id = task['task_id']
         task['status'] = 'running'
         task['last_execution_id'] = execution_id
 
@@ -33,71 +134,112 @@ class TaskExecutor:
             'execution_id': execution_id,
             'start_time': start_time.strftime('%Y-%m-%d %H:%M:%S'),
             'status': 'running',
-            'memory_usage': [],  # 记录内存使用情况
             'end_time': None,
             'duration': None,
-            'peak_memory': None,
-            'avg_memory': None,
             'exit_code': None,
-            'logs': ''
+            'attempt': attempt,
+            'retry_of': retry_of,
+            'input_fingerprint': None
         }
+        # 资源使用时间序列（内存、CPU、I/O、线程、文件描述符、上下文切换）及其汇总字段
+        execution_record.update(ResourceSampler.empty_record_fields(self.sampling_policy.initial_interval))
 
         # 添加到执行历史记录中
         with self.lock:
             task['executions'].append(execution_id)
             self.history.add_execution_record(task_id, execution_record)
 
-        # 启动执行线程
-        execution_thread = threading.Thread(target=self._run_task_process, args=(task, execution_id))
-        execution_thread.daemon = True
-        execution_thread.start()
-
-        return execution_id
+    def _get_input_fingerprint(self, task):
+        """计算任务的输入指纹，计算失败时返回None，任务照常执行"""
+        try:
+            return self.fingerprints.compute(task, self._build_command(task))
+        except Exception as e:
+            self.logger.warning(f"Failed to compute input fingerprint for task {task['task_id']}: {str(e)}")
+            return None
 
-    def _run_task_process(self, task, execution_id):
-        """在单独的线程中运行任务进程"""
+    def _record_cached_execution(self, task, execution_id, cached_from):
+        """输入未变化时将执行记录改为cached，不启动进程"""
+        task_id = task['task_id']
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        cached_record = self.history.get_execution_summary(task_id, cached_from)
+        reason = f"Inputs unchanged since execution {cached_from} at {cached_record.get('start_time')}"
+
+        task['status'] = ExitClassifier.CACHED
+        task['last_run_duration'] = 0
+
+        self.history.append_to_execution_log(task_id, execution_id, f"{reason}, execution skipped\n")
+        self.history.update_execution_record(
+            task_id, execution_id, {
+                'status': ExitClassifier.CACHED,
+                'end_time': now,
+                'duration': 0,
+                'exit_code': 0,
+                'exit_reason': reason,
+                'signal': None,
+                'cached_from': cached_from
+            })
+
+        self.logger.info(f"Task {task_id} skipped: {reason}")
+
+        # 与正常结束的执行一样通知调度器
+        self._cleanup_execution(task_id, execution_id, None)
+
+    def _record_stopped_before_start(self, task, execution_id):
+        """计算输入指纹期间被停止的执行，不再启动进程"""
+        task_id = task['task_id']
+        task['status'] = ExitClassifier.STOPPED
+        self.history.update_execution_record(
+            task_id, execution_id, {
+                'status': ExitClassifier.STOPPED,
+                'end_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                'duration': 0,
+                'exit_code': None,
+                'exit_reason': "Stopped before the process was started",
+                'signal': None
+            })
+        self._cleanup_execution(task_id, execution_id, None)
+
+    def _start_execution(self, task, execution_id):
+        """启动任务进程，进程退出由ProcessReaper统一检测，不再为每个进程保留一个等待线程"""
         task_id = task['task_id']
 
         # 为任务创建暂停事件，默认为非阻塞状态
-        with self.lock:
-            self.pause_events[task_id] = threading.Event()
-            self.pause_events[task_id].set()  # 设置为非阻塞状态
+        self._create_pause_event(task_id)
 
-        try:
-            # 创建命令 - 如果任务有自定义命令则使用，否则使用默认命令
-            if task.get('command'):
-                # 使用自定义命令
-                command = f"conda run --no-capture-output -n {task['conda_env']} {task['command']}"
-            else:
-                # 使用默认命令
-                command = f"conda run --no-capture-output -n {task['conda_env']} python {task['script_path']}"
+        cgroup_path = None
+        gate = None
 
-            # 记录使用的命令到日志
-            self.history.append_to_execution_log(
-                task_id, execution_id,
-                f"Executing command: {command}\nWorking directory: {os.path.dirname(task['script_path'])}\n\n")
-
-            # 设置工作目录为脚本所在目录
-            working_dir = os.path.dirname(task['script_path'])
+        try:
+            command, working_dir, limits, cgroup_path = self._prepare_execution(task, execution_id)
 
-            # 启动进程，设置stdout和stderr为管道
+            # 启动进程，设置stdout和stderr为管道，进程在放行之前不会执行任务命令
+            gate = LaunchGate()
             process = subprocess.Popen(
-                command,
+                gate.wrap(command),
                 shell=True,
+                stdin=gate.stdin,
                 stdout=subprocess.PIPE,
                 stderr=subprocess.STDOUT,
-                text=True,
-                bufsize=1,  # 行缓冲模式
-                cwd=working_dir)
-
-            # 存储进程PID，便于发送信号
-            task['process_pid'] = process.pid
-
-            # 监控进程的内存使用情况
-            memory_monitor_thread = threading.Thread(target=self._monitor_process_memory,
-                                                     args=(process.pid, task, execution_id))
-            memory_monitor_thread.daemon = True
-            memory_monitor_thread.start()
+                bufsize=0,  # 以二进制分块读取，进度条的\r由LogFilter处理
+                cwd=working_dir,
+                env=self._build_environment(execution_id),  # 传入scratch目录和数据缓存目录
+                start_new_session=True)  # 每次执行使用独立的会话和进程组，便于整体发送信号
+            gate.spawned()
+
+            # 在父进程中将进程移入控制组（或设置rlimit）并设置调度参数，完成后放行
+            cgroup_path = self._attach_resources(task, execution_id, process.pid, cgroup_path, limits)
+            gate.release()
+
+            # 存储进程组信息，便于发送信号
+            self._register_execution(task_id, execution_id, process.pid, cgroup_path)
+            self._apply_scheduling(task, execution_id, process.pid, cgroup_path)
+
+            # 监控进程树的资源使用情况
+            sampler = self._create_sampler(process.pid, cgroup_path)
+            resource_monitor_thread = threading.Thread(target=self._monitor_process_resources,
+                                                       args=(sampler, task, execution_id))
+            resource_monitor_thread.daemon = True
+            resource_monitor_thread.start()
 
             # 创建单独的线程实时读取并记录输出
             output_reader_thread = threading.Thread(target=self._read_process_output,
@@ -105,75 +247,279 @@ class TaskExecutor:
             output_reader_thread.daemon = True
             output_reader_thread.start()
 
-            # 等待进程完成
-            exit_code = process.wait()
+            # 进程退出后在回收器的回调线程中完成执行
+            self._get_reaper().register(
+                process, lambda exit_code: self._on_process_exit(task, execution_id, exit_code, sampler, cgroup_path,
+                                                                 output_reader_thread))
+
+        except Exception as e:
+            if gate:
+                gate.abort()
+            self._fail_execution(task, execution_id, e)
+            self._cleanup_execution(task_id, execution_id, cgroup_path)
 
+    def _on_process_exit(self, task, execution_id, exit_code, sampler, cgroup_path, output_reader_thread):
+        """任务进程退出后的回调，由ProcessReaper调用"""
+        try:
             # 确保输出读取线程完成
             output_reader_thread.join(timeout=2.0)
 
+            self._finish_execution(task, execution_id, exit_code, sampler, cgroup_path)
+
+        except Exception as e:
+            self._fail_execution(task, execution_id, e)
+
+        finally:
+            self._cleanup_execution(task['task_id'], execution_id, cgroup_path)
+
+    def _get_reaper(self):
+        """首次启动进程时创建子进程回收器"""
+        with self.lock:
+            if self._reaper is None:
+                self._reaper = ProcessReaper()
+            return self._reaper
+
+    def _create_pause_event(self, task_id):
+        """为任务创建暂停事件，默认为非阻塞状态"""
+        with self.lock:
+            self.pause_events[task_id] = threading.Event()
+            self.pause_events[task_id].set()  # 设置为非阻塞状态
+
+    def _build_command(self, task):
+        """创建命令 - 如果任务有自定义命令则使用，否则使用默认命令"""
+        if task.get('command'):
+            # 使用自定义命令
+            return f"conda run --no-capture-output -n {task['conda_env']} {task['command']}"
+        # 使用默认命令
+        return f"conda run --no-capture-output -n {task['conda_env']} python {task['script_path']}"
+
+    def _prepare_execution(self, task, execution_id):
+        """准备启动进程所需的命令、工作目录和资源限制
+
+        返回:
+            (命令, 工作目录, 资源限制, 控制组路径)，cgroup不可用时控制组路径为None
+        """
+        task_id = task['task_id']
+        command = self._build_command(task)
+
+        # 记录使用的命令到日志
+        self.history.append_to_execution_log(
+            task_id, execution_id,
+            f"Executing command: {command}\nWorking directory: {os.path.dirname(task['script_path'])}\n\n")
+
+        # 设置工作目录为脚本所在目录
+        working_dir = os.path.dirname(task['script_path'])
+
+        # 创建执行专用的控制组并写入资源限制，不可用时回退到setrlimit
+        limits = self._get_resource_limits(task, working_dir)
+        cgroup_path = self.cgroups.create_execution_cgroup(execution_id, limits)
+        self.history.update_execution_record(task_id, execution_id,
+                                             {'resource_enforcement': self._describe_enforcement(cgroup_path, limits)})
+
+        # 创建执行专用的scratch目录，任务的临时文件不再写入脚本目录
+        self.scratch.create(execution_id, task.get('scratch_tmpfs_mb'))
+
+        # 准备任务的数据缓存命名空间，记录执行开始时的文件用于判断是否命中
+        self.data_cache.begin(execution_id, DataCache.namespace_for(task_id, task.get('cache_namespace')))
+
+        return command, working_dir, limits, cgroup_path
+
+    def _build_environment(self, execution_id):
+        """生成任务进程的环境变量：FIDLTER_SCRATCH和TMPDIR指向scratch目录，FIDLTER_CACHE指向数据缓存目录"""
+        env = dict(os.environ)
+        env.update(self.scratch.get_environment(execution_id))
+        cache_path = self.data_cache.get_path(execution_id)
+        if cache_path:
+            env['FIDLTER_CACHE'] = cache_path
+        return env
+
+    def _attach_resources(self, task, execution_id, pid, cgroup_path, limits):
+        """将已启动、尚未执行任务命令的进程移入控制组（无法加入时删除控制组并回退到rlimit），
+        并按任务优先级设置nice值、I/O调度类别、oom_score_adj和CPU亲和性
+
+        返回:
+            实际使用的控制组路径，回退到rlimit时为None
+        """
+        task_id = task['task_id']
+        if cgroup_path and not self.cgroups.attach(cgroup_path, pid):
+            self.cgroups.remove_cgroup(cgroup_path)
+            cgroup_path = None
+            self.history.update_execution_record(task_id, execution_id,
+                                                 {'resource_enforcement': self._describe_enforcement(None, limits)})
+        if not cgroup_path:
+            self.cgroups.apply_rlimits(pid, limits)
+        self.priorities.apply(pid, task.get('priority'), task.get('cpu_affinity'))
+        return cgroup_path
+
+    def _apply_scheduling(self, task, execution_id, pid, cgroup_path):
+        """写入控制组的CPU和I/O权重，并将实际生效的调度参数记录到执行记录"""
+        profile = self.priorities.get_profile(task.get('priority'))
+        scheduling = self.priorities.read_effective(pid, task.get('priority'))
+        if cgroup_path:
+            scheduling.update(self.cgroups.apply_weights(cgroup_path, profile['cpu_weight'], profile['io_weight']))
+        else:
+            scheduling.update({'cpu_weight': None, 'io_weight': None})
+        self.history.update_execution_record(task['task_id'], execution_id, {'scheduling': scheduling})
+
+    def _register_pending_execution(self, task_id, execution_id):
+        """登记尚未启动进程的执行（正在计算输入指纹），此时只能停止，不能暂停"""
+        with self.lock:
+            self.active_executions[task_id] = {
+                'execution_id': execution_id,
+                'pid': None,
+                'pgid': None,
+                'cgroup': None,
+                'status': 'pending',
+                'termination_reason': None,
+                'termination_detail': None
+            }
+
+    def _is_stop_requested(self, task_id, execution_id):
+        """执行在启动进程之前是否已被停止"""
+        with self.lock:
+            execution = self.active_executions.get(task_id)
+            return bool(execution) and execution['execution_id'] == execution_id and \
+                execution.get('termination_reason') == ExitClassifier.STOPPED
+
+    def _register_execution(self, task_id, execution_id, pid, cgroup_path):
+        """登记正在运行的执行，停止、暂停和恢复操作通过它找到进程组和控制组
+
+        pending期间收到停止请求时，登记后立即终止进程组
+        """
+        stop_requested = self._is_stop_requested(task_id, execution_id)
+        with self.lock:
+            self.active_executions[task_id] = {
+                'execution_id': execution_id,
+                'pid': pid,
+                'pgid': pid,
+                'cgroup': cgroup_path,
+                'status': 'running',
+                'pause_method': None,
+                'termination_reason': None,
+                'termination_detail': None,
+                'last_output_at': time.monotonic(),
+                'paused_at': None,
+                'paused_seconds': 0.0,  # 累计暂停时长，不计入超时
+                'memory_reclaimed': False,  # 本次暂停期间是否已回收内存
+                'memory_reclaimed_bytes': 0,
+                'refault_baseline': None  # 首次回收时的workingset_refault字节数
+            }
+            if stop_requested:
+                self.active_executions[task_id]['termination_reason'] = ExitClassifier.STOPPED
+        if stop_requested:
+            self._terminate_process_group(pid, self.stop_grace_period, cgroup_path, task_id, execution_id)
+
+    def _finish_execution(self, task, execution_id, exit_code, sampler, cgroup_path):
+        """进程退出后判断结束原因，写入执行记录的最终状态和资源汇总"""
+        task_id = task['task_id']
+
+        # 更新执行记录
+        end_time = datetime.now()
+        record = self.history.get_execution_record(task_id, execution_id)
+        start_time = datetime.strptime(record['start_time'], '%Y-%m-%d %H:%M:%S')
+        duration = (end_time - start_time).total_seconds()
+
+        # 控制组在清理时才删除，此时仍可读取OOM事件
+        oom_kills, limit_ooms = self.cgroups.read_oom_events(cgroup_path) if cgroup_path else (0, None)
+
+        # scratch目录在清理时才删除，先统计占用
+        scratch_usage = self.scratch.measure(execution_id)
+        cache_usage = self.data_cache.finish(execution_id)
+
+        with self.lock:
+            execution = self.active_executions.get(task_id, {})
+
+            # 资源使用汇总（峰值、平均值和累计计数）
+            summary = sampler.summary() if sampler else {}
+
+            # 区分普通失败、信号终止、OOM、超出内存限制、超时和手动停止
+            outcome = ExitClassifier.classify(exit_code,
+                                              termination_reason=execution.get('termination_reason'),
+                                              termination_detail=execution.get('termination_detail'),
+                                              oom_kills=oom_kills,
+                                              limit_ooms=limit_ooms,
+                                              memory_limit=task.get('memory_limit'),
+                                              peak_memory=summary.get('peak_memory'),
+                                              log_tail=self.history.get_log_tail(
+                                                  task_id, execution_id, self.LOG_TAIL_BYTES))
+
+            # 更新任务状态
+            task['status'] = outcome['status']
+            task['last_run_duration'] = duration
+
             # 更新执行记录
-            end_time = datetime.now()
-            start_time = datetime.strptime(
-                self.history.get_execution_record(task_id, execution_id)['start_time'], '%Y-%m-%d %H:%M:%S')
-            duration = (end_time - start_time).total_seconds()
-
-            with self.lock:
-                # 更新任务状态
-                task['status'] = 'completed' if exit_code == 0 else 'failed'
-                task['last_run_duration'] = duration
-
-                # 清除进程PID
-                if 'process_pid' in task:
-                    del task['process_pid']
-
-                # 更新执行记录
-                updates = {
-                    'status': 'completed' if exit_code == 0 else 'failed',
-                    'end_time': end_time.strftime('%Y-%m-%d %H:%M:%S'),
-                    'duration': duration,
-                    'exit_code': exit_code
-                }
+            updates = {
+                'end_time': end_time.strftime('%Y-%m-%d %H:%M:%S'),
+                'duration': duration,
+                'exit_code': exit_code,
+                'scratch': scratch_usage,
+                'cache': cache_usage,
+                **outcome
+            }
+            updates.update(summary)
 
-                # 计算内存使用统计
-                record = self.history.get_execution_record(task_id, execution_id)
-                if record and record.get('memory_usage'):
-                    memory_samples = record['memory_usage']
-                    updates['peak_memory'] = max(memory_samples)
-                    updates['avg_memory'] = sum(memory_samples) / len(memory_samples)
+            # 暂停期间回收的内存及之后重新读回的内存
+            updates.update(self._get_memory_reclaim_summary(execution, cgroup_path))
 
-                self.history.update_execution_record(task_id, execution_id, updates)
+            self.history.update_execution_record(task_id, execution_id, updates)
 
-                # 任务完成后清理暂停事件
-                if task_id in self.pause_events:
-                    del self.pause_events[task_id]
+            # 记录成功执行的输入指纹，失败的执行可能已经改写了输出，清除之前的记录
+            if record.get('input_fingerprint'):
+                if outcome['status'] == ExitClassifier.COMPLETED:
+                    self.memo_cache.store(task_id, record['input_fingerprint'], execution_id)
+                else:
+                    self.memo_cache.invalidate(task_id)
 
-        except Exception as e:
-            self.logger.error(f"Error executing task {task_id}: {str(e)}")
-
-            with self.lock:
-                task['status'] = 'failed'
-
-                # 清除进程PID
-                if 'process_pid' in task:
-                    del task['process_pid']
-
-                # 更新执行记录
-                updates = {
-                    'status':
-                    'failed',
-                    'end_time':
-                    datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                    'duration': (datetime.now() - datetime.strptime(
-                        self.history.get_execution_record(task_id, execution_id)['start_time'],
-                        '%Y-%m-%d %H:%M:%S')).total_seconds(),
-                    'logs':
-                    self.history.get_execution_record(task_id, execution_id)['logs'] + f"\nError: {str(e)}"
-                }
-                self.history.update_execution_record(task_id, execution_id, updates)
+            # 任务完成后清理暂停事件
+            if task_id in self.pause_events:
+                del self.pause_events[task_id]
+
+    def _fail_execution(self, task, execution_id, error):
+        """执行器自身出错时将执行记录标记为失败"""
+        task_id = task['task_id']
+        self.logger.error(f"Error executing task {task_id}: {str(error)}")
+
+        with self.lock:
+            task['status'] = 'failed'
 
-                # 出现异常时也清理暂停事件
-                if task_id in self.pause_events:
-                    del self.pause_events[task_id]
+            # 更新执行记录
+            updates = {
+                'status':
+                'failed',
+                'exit_reason':
+                f"Executor error: {str(error)}",
+                'signal':
+                None,
+                'end_time':
+                datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                'duration': (datetime.now() - datetime.strptime(
+                    self.history.get_execution_summary(task_id, execution_id)['start_time'],
+                    '%Y-%m-%d %H:%M:%S')).total_seconds()
+            }
+            self.history.append_to_execution_log(task_id, execution_id, f"\nError: {str(error)}")
+            self.history.update_execution_record(task_id, execution_id, updates)
+            self.memo_cache.invalidate(task_id)
+
+            # 出现异常时也清理暂停事件
+            if task_id in self.pause_events:
+                del self.pause_events[task_id]
+
+    def _cleanup_execution(self, task_id, execution_id, cgroup_path):
+        """清理执行信息并删除控制组和scratch目录，然后通知调度器执行已结束"""
+        with self.lock:
+            execution = self.active_executions.get(task_id)
+            if execution and execution['execution_id'] == execution_id:
+                del self.active_executions[task_id]
+        self.cgroups.remove_cgroup(cgroup_path)
+        self.scratch.remove(execution_id)
+        self.data_cache.discard(execution_id)
+
+        # 通知调度器执行已结束
+        if self._completion_callback:
+            try:
+                self._completion_callback(task_id, execution_id)
+            except Exception as e:
+                self.logger.error(f"Error in completion callback for task {task_id}: {str(e)}")
 
     def _read_process_output(self, process, task_id, execution_id):
         """在单独的线程中实时读取和处理进程输出
@@ -183,16 +529,22 @@ class TaskExecutor:
             task_id: 任务ID
             execution_id: 执行ID
         """
+        with self.lock:
+            execution = self.active_executions.get(task_id)
+
+        log_filter = LogFilter()
         try:
-            # 按行读取stdout内容
-            for line in iter(process.stdout.readline, ''):
-                if line:  # 确保不是空行
-                    self.history.append_to_execution_log(task_id, execution_id, line)
+            # 分块读取stdout，经过滤后写入日志
+            fd = process.stdout.fileno()
+            while True:
+                data = os.read(fd, self.OUTPUT_READ_SIZE)
+                if not data:
+                    break
+                self._append_filtered_output(task_id, execution_id, log_filter, data)
+                if execution:
+                    execution['last_output_at'] = time.monotonic()  # 用于卡死检测
 
-            # 确保读取了所有剩余输出，即使进程已退出
-            remaining_output = process.stdout.read()
-            if remaining_output:
-                self.history.append_to_execution_log(task_id, execution_id, remaining_output)
+            self._flush_filtered_output(task_id, execution_id, log_filter)
 
         except Exception as e:
             self.logger.error(f"Error reading process output for task {task_id}: {str(e)}")
@@ -203,177 +555,384 @@ class TaskExecutor:
             if process.stdout:
                 process.stdout.close()
 
-    def _monitor_process_memory(self, pid, task, execution_id):
-        """监控进程的内存使用情况，如果设置了内存限制且超限则终止进程"""
+    def _append_filtered_output(self, task_id, execution_id, log_filter, data):
+        """将一段进程输出经过LogFilter压缩后追加到执行日志"""
+        text = log_filter.feed(data)
+        if text:
+            self.history.append_to_execution_log(task_id, execution_id, text)
+
+    def _flush_filtered_output(self, task_id, execution_id, log_filter):
+        """输出结束时写入LogFilter中剩余的内容，并在执行记录中保存压缩统计"""
+        text = log_filter.flush()
+        if text:
+            self.history.append_to_execution_log(task_id, execution_id, text)
+        self.history.update_execution_record(task_id, execution_id, {'log_stats': log_filter.get_stats()})
+
+    def _create_sampler(self, pid, cgroup_path=None):
+        """为任务进程创建资源采样器，进程已退出时返回None"""
+        try:
+            return ResourceSampler(pid, cgroup_path, self.cgroups)
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            return None
+
+    def _get_resource_limits(self, task, working_dir):
+        """从任务配置中提取资源限制
+
+        参数:
+            task: 任务对象
+            working_dir: 任务工作目录，用于确定io.max限制的块设备
+
+        返回:
+            资源限制字典
+        """
+        return {
+            'memory_limit': task.get('memory_limit'),
+            'cpu_limit': task.get('cpu_limit'),
+            'pids_limit': task.get('pids_limit'),
+            'io_read_bps': task.get('io_read_bps'),
+            'io_write_bps': task.get('io_write_bps'),
+            'io_path': working_dir
+        }
+
+    def _describe_enforcement(self, cgroup_path, limits):
+        """生成记录在执行记录中的资源限制方式说明"""
+        configured = {
+            key: value
+            for key, value in limits.items() if key != 'io_path' and value is not None
+        }
+        if cgroup_path:
+            return {'mode': 'cgroup', 'cgroup': cgroup_path, 'limits': configured}
+        if configured:
+            return {'mode': 'rlimit', 'cgroup': None, 'limits': configured}
+        return {'mode': 'none', 'cgroup': None, 'limits': configured}
+
+    def _monitor_process_resources(self, sampler, task, execution_id):
+        """监控进程树的资源使用情况，超出内存限制、执行超时或卡死时终止进程"""
+        if not sampler:
+            return  # 进程可能已经结束
+
         task_id = task['task_id']
-        memory_limit = task.get('memory_limit')
 
-        try:
-            process = psutil.Process(pid)
-
-            while process.is_running() and psutil.pid_exists(pid):
-                try:
-                    # 检查暂停状态，如果暂停则等待恢复
-                    if task_id in self.pause_events:
-                        self.pause_events[task_id].wait()
-
-                    # 获取内存使用情况（MB）
-                    memory_mb = process.memory_info().rss / (1024 * 1024)
-
-                    # 记录内存使用情况
-                    record = self.history.get_execution_record(task_id, execution_id)
-                    if record:
-                        with self.lock:
-                            record['memory_usage'].append(memory_mb)
-
-                    # 检查是否超过内存限制
-                    if memory_limit and memory_mb > memory_limit:
-                        self.logger.warning(
-                            f"Task {task_id} exceeded memory limit of {memory_limit}MB (current: {memory_mb:.2f}MB). Terminating..."
-                        )
-
-                        # 终止进程
-                        process.terminate()
-
-                        # 更新任务状态和记录
-                        with self.lock:
-                            task['status'] = 'failed'
-
-                            updates = {
-                                'status':
-                                'failed',
-                                'end_time':
-                                datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                                'duration':
-                                (datetime.now() -
-                                 datetime.strptime(record['start_time'], '%Y-%m-%d %H:%M:%S')).total_seconds(),
-                                'logs':
-                                record['logs'] +
-                                f"\nTask terminated: Memory usage exceeded limit of {memory_limit}MB (reached {memory_mb:.2f}MB)"
-                            }
-
-                            # 计算内存使用统计
-                            memory_samples = record['memory_usage']
-                            if memory_samples:
-                                updates['peak_memory'] = max(memory_samples)
-                                updates['avg_memory'] = sum(memory_samples) / len(memory_samples)
-
-                            self.history.update_execution_record(task_id, execution_id, updates)
-                        break
-
-                    time.sleep(0.5)  # 每0.5秒采样一次
-                except (psutil.NoSuchProcess, psutil.AccessDenied):
+        while sampler.is_running():
+            try:
+                # 检查暂停状态，如果暂停则等待恢复，等待期间定期检查是否需要回收内存
+                pause_event = self.pause_events.get(task_id)
+                while pause_event and not pause_event.wait(timeout=self.PAUSED_PRESSURE_CHECK_INTERVAL):
+                    self._reclaim_paused_memory(task_id, execution_id)
+
+                interval = self._monitor_step(sampler, task, execution_id)
+                if interval is None:
                     break
-        except (psutil.NoSuchProcess, psutil.AccessDenied):
-            pass  # 进程可能已经结束
+                time.sleep(interval)
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                break
+
+    def _monitor_step(self, sampler, task, execution_id):
+        """执行一次资源采样，并检查内存限制、执行超时和卡死
+
+        返回:
+            距下一次采样的秒数，执行已被终止时返回None
+
+        异常:
+            psutil.NoSuchProcess: 主进程已经退出
+        """
+        task_id = task['task_id']
+        memory_limit = task.get('memory_limit')
+
+        # 采集进程树的内存、CPU、I/O等指标
+        sample = sampler.sample()
+        elapsed = sampler.elapsed()
+        self.history.append_resource_sample(task_id, execution_id, elapsed, sample)
+        memory_mb = sample['memory_usage']
+
+        # 检查是否超过内存限制，使用cgroup时由内核强制执行memory.max，这里只作为回退
+        if memory_limit and not sampler.cgroup_path and memory_mb > memory_limit:
+            self._terminate_execution(task_id, execution_id, sampler.pid, ExitClassifier.MEMORY_LIMIT,
+                                      f"Memory usage exceeded limit of {memory_limit}MB (reached {memory_mb:.2f}MB)")
+            return None
+
+        # 检查执行超时和卡死
+        running_time, idle_time = self._get_execution_timing(task_id, execution_id, elapsed)
+        timeout_seconds = task.get('timeout_seconds')
+        if timeout_seconds and running_time >= timeout_seconds:
+            self._terminate_execution(task_id, execution_id, sampler.pid, ExitClassifier.TIMEOUT,
+                                      f"Execution exceeded timeout of {timeout_seconds}s")
+            return None
+
+        idle_output_timeout = task.get('idle_output_timeout')
+        if idle_output_timeout and idle_time >= idle_output_timeout \
+                and sample['cpu_usage'] < self.STALL_CPU_THRESHOLD:
+            self._terminate_execution(task_id, execution_id, sampler.pid, ExitClassifier.STALLED,
+                                      f"No output for {idle_time:.0f}s with CPU usage at {sample['cpu_usage']:.2f}%")
+            return None
+
+        # 执行初期密集采样，随运行时长增加逐步降低采样频率，接近超时时提前醒来
+        interval = self.sampling_policy.interval(elapsed)
+        if timeout_seconds:
+            interval = max(min(interval, timeout_seconds - running_time), 0.1)
+        return interval
+
+    def _get_execution_timing(self, task_id, execution_id, elapsed):
+        """获取执行的有效运行时长和最近一次输出后经过的时间，均不含暂停时间
+
+        返回:
+            (运行秒数, 无输出秒数)
+        """
+        with self.lock:
+            execution = self.active_executions.get(task_id)
+            if not execution or execution['execution_id'] != execution_id:
+                return elapsed, 0.0
+            return elapsed - execution['paused_seconds'], time.monotonic() - execution['last_output_at']
+
+    def _terminate_execution(self, task_id, execution_id, pgid, reason, detail):
+        """由执行器主动终止执行（超出内存限制、超时或卡死）
+
+        记录终止原因和最后几行日志，然后终止整个进程组，最终状态由执行线程在进程退出后写入
+
+        参数:
+            task_id: 任务ID
+            execution_id: 执行ID
+            pgid: 进程组ID
+            reason: 终止原因，ExitClassifier中的状态
+            detail: 写入日志和exit_reason的说明
+        """
+        self.logger.warning(f"Task {task_id} terminated: {detail}")
+
+        with self.lock:
+            execution = self.active_executions.get(task_id)
+            if not execution or execution['execution_id'] != execution_id:
+                return
+            execution['termination_reason'] = reason
+            execution['termination_detail'] = detail
+            cgroup_path = execution.get('cgroup')
+
+        last_log_lines = self.history.read_execution_logs(task_id, execution_id, tail=self.LAST_LOG_LINES)
+        if last_log_lines is not None:
+            self.history.update_execution_record(task_id, execution_id,
+                                                 {'last_log_lines': last_log_lines['logs'].splitlines()})
+            self.history.append_to_execution_log(task_id, execution_id, f"\nTask terminated: {detail}")
 
-    def stop_task(self, task_id):
+        # 终止整个进程组，宽限期后仍未退出时在后台升级为SIGKILL
+        self._terminate_process_group(pgid, self.stop_grace_period, cgroup_path, task_id, execution_id)
+
+    def _reclaim_paused_memory(self, task_id, execution_id):
+        """主机内存紧张时回收已暂停执行的内存，让运行中的任务可以使用这部分内存
+
+        只处理位于独立控制组中的执行，每次暂停最多回收一次，恢复时允许内存重新增长
+
+        参数:
+            task_id: 任务ID
+            execution_id: 执行ID
+        """
+        with self.lock:
+            execution = self.active_executions.get(task_id)
+            if not execution or execution['execution_id'] != execution_id or execution['status'] != 'paused' \
+                    or not execution.get('cgroup') or execution.get('memory_reclaimed'):
+                return
+            cgroup_path = execution['cgroup']
+
+        if not self.memory_pressure.is_high():
+            return
+
+        refault_baseline = self.cgroups.read_refault_bytes(cgroup_path)
+        reclaimed = self.cgroups.reclaim_memory(cgroup_path)
+        if reclaimed is None:
+            return
+
+        with self.lock:
+            execution = self.active_executions.get(task_id)
+            if not execution or execution['execution_id'] != execution_id:
+                return
+            execution['memory_reclaimed'] = True
+            execution['memory_reclaimed_bytes'] += reclaimed
+            if execution['refault_baseline'] is None:
+                execution['refault_baseline'] = refault_baseline
+            total_reclaimed = execution['memory_reclaimed_bytes']
+
+        self.logger.info(f"Reclaimed {reclaimed / (1024 * 1024):.2f}MB from paused task {task_id} under memory pressure")
+        self.history.update_execution_record(task_id, execution_id, {'memory_reclaimed_bytes': total_reclaimed})
+        self.history.append_to_execution_log(
+            task_id, execution_id,
+            f"\nReclaimed {reclaimed / (1024 * 1024):.2f}MB from paused task under host memory pressure")
+
+    def _get_memory_reclaim_summary(self, execution, cgroup_path):
+        """生成暂停期间内存回收的汇总，没有发生回收时返回空字典"""
+        if not execution or not execution.get('memory_reclaimed_bytes'):
+            return {}
+        summary = {'memory_reclaimed_bytes': execution['memory_reclaimed_bytes'], 'memory_refaulted_bytes': None}
+        refault_bytes = self.cgroups.read_refault_bytes(cgroup_path) if cgroup_path else None
+        if refault_bytes is not None and execution.get('refault_baseline') is not None:
+            summary['memory_refaulted_bytes'] = max(refault_bytes - execution['refault_baseline'], 0)
+        return summary
+
+    def stop_task(self, task_id, grace_period=None):
         """停止正在运行的任务
-        
+
+        向执行所在的整个进程组发送SIGTERM后立即返回，宽限期内未退出时在后台升级为SIGKILL，
+        执行记录的stopped状态由执行线程在进程退出后写入，进程组是否确实已全部退出写入termination_confirmed
+
         参数:
             task_id: 任务ID
-            
+            grace_period: SIGTERM后等待进程退出的秒数，为None时使用默认宽限期
+
         返回:
             包含操作结果的字典
         """
-        # 首先不持有锁的情况下获取任务，避免长时间持有锁
-        task = None
-        task_status = None
-        process_pid = None
-        last_execution_id = None
-
         with self.lock:
             task = self._get_task(task_id)
             if not task:
                 return {"success": False, "message": f"Task with ID {task_id} not found"}
 
             # 记录我们需要的信息，然后尽快释放锁
-            task_status = task.get('status')
-            process_pid = task.get('process_pid')
-            last_execution_id = task.get('last_execution_id')
-
-        # 检查任务状态
-        if task_status != 'running':
-            return {
-                "success": False,
-                "message": "Task is not in a running state",
-                "error": f"Cannot stop a task with status: '{task_status}'",
-                "current_status": task_status
-            }
+            execution = self.active_executions.get(task_id)
+            if execution and execution['status'] == 'pending':
+                # 还在计算输入指纹，不再启动进程
+                execution['termination_reason'] = ExitClassifier.STOPPED
+                return {"success": True, "message": "Task stopped before the process was started"}
+            if not execution or not execution.get('pgid'):
+                task_status = task.get('status')
+                return {
+                    "success": False,
+                    "message": "Task is not in a running state",
+                    "error": f"Cannot stop a task with status: '{task_status}'",
+                    "current_status": task_status
+                }
 
-        # 如果任务正在运行，尝试终止它
-        result = {"success": False, "message": "Failed to stop task"}
+            execution['termination_reason'] = ExitClassifier.STOPPED
+            pgid = execution['pgid']
+            cgroup_path = execution.get('cgroup')
+            memory_reclaimed = execution.get('memory_reclaimed')
+            last_execution_id = execution['execution_id']
 
-        if process_pid:
-            try:
-                # 尝试获取进程
-                process = psutil.Process(process_pid)
-
-                # 获取所有子进程
-                child_processes = self._get_child_processes(process_pid)
-
-                # 先终止子进程
-                for pid in child_processes:
-                    try:
-                        child_process = psutil.Process(pid)
-                        child_process.terminate()
-                        self.logger.info(f"Terminated child process {pid}")
-                    except (ProcessLookupError, psutil.NoSuchProcess, psutil.AccessDenied) as e:
-                        self.logger.warning(f"Failed to terminate child process {pid}: {str(e)}")
-
-                # 终止主进程
-                process.terminate()
-                self.logger.info(f"Terminated main process {process_pid}")
-
-                # 更新状态 - 现在再获取锁
-                with self.lock:
-                    task = self._get_task(task_id)
-                    if task:  # 再次检查任务是否存在
-                        task['status'] = 'stopped'
-                        if 'process_pid' in task:
-                            del task['process_pid']
-
-                # 更新执行记录
-                if last_execution_id:
-                    record = self.history.get_execution_record(task_id, last_execution_id)
-                    if record:
-                        updates = {
-                            'status':
-                            'stopped',
-                            'end_time':
-                            datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                            'duration': (datetime.now() -
-                                         datetime.strptime(record['start_time'], '%Y-%m-%d %H:%M:%S')).total_seconds(),
-                            'logs':
-                            record['logs'] + "\nTask was manually stopped"
-                        }
-                        self.history.update_execution_record(task_id, last_execution_id, updates)
-
-                result = {"success": True, "message": "Task stopped successfully"}
-
-            except (ProcessLookupError, psutil.NoSuchProcess) as e:
-                self.logger.warning(f"Process {process_pid} not found: {str(e)}")
-
-                # 进程已不存在，更新任务状态
-                with self.lock:
-                    task = self._get_task(task_id)
-                    if task:
-                        task['status'] = 'stopped'
-                        if 'process_pid' in task:
-                            del task['process_pid']
-
-                result = {"success": True, "message": "Process was already terminated, task status updated"}
+        if grace_period is None:
+            grace_period = self.stop_grace_period
 
-            except Exception as e:
-                self.logger.error(f"Error stopping task {task_id}: {str(e)}")
-                result = {"success": False, "message": f"Error stopping task: {str(e)}"}
+        # 先写日志，实时日志的订阅者在执行结束前能收到这条说明
+        self.history.append_to_execution_log(task_id, last_execution_id, "\nTask was manually stopped")
+
+        # 暂停期间回收过内存的执行需要先取消memory.high限制，否则无法及时处理SIGTERM
+        if memory_reclaimed and cgroup_path:
+            self.cgroups.restore_memory_high(cgroup_path)
+
+        try:
+            self._terminate_process_group(pgid, grace_period, cgroup_path, task_id, last_execution_id)
+        except Exception as e:
+            self.logger.error(f"Error stopping task {task_id}: {str(e)}")
+            return {"success": False, "message": f"Error stopping task: {str(e)}"}
 
         # 清理暂停事件
-        if task_id in self.pause_events:
-            self.pause_events[task_id].set()  # 确保没有被阻塞的线程
-            del self.pause_events[task_id]
+        with self.lock:
+            if task_id in self.pause_events:
+                self.pause_events[task_id].set()  # 确保没有被阻塞的线程
+                del self.pause_events[task_id]
+
+        return {"success": True, "message": "Stop signal sent", "grace_period": grace_period}
 
-        return result
+    def _terminate_process_group(self, pgid, grace_period, cgroup_path=None, task_id=None, execution_id=None):
+        """结束整个进程组：发送SIGTERM后立即返回，宽限期后仍未退出时在后台升级为SIGKILL
+
+        参数:
+            pgid: 进程组ID（即任务主进程PID）
+            grace_period: SIGTERM后等待的秒数
+            cgroup_path: 执行所在的控制组，用于结束脱离了进程组的进程
+            task_id: 任务ID，升级为SIGKILL时写入执行日志
+            execution_id: 执行ID
+
+        返回:
+            布尔值，是否发送了SIGTERM，进程组已不存在时返回False
+        """
+        if not self._signal_process_group(pgid, signal.SIGTERM):
+            self._record_termination(task_id, execution_id, confirmed=True, escalated=False)
+            return False
+        # 已暂停的进程需要先恢复才能处理SIGTERM
+        if cgroup_path:
+            self.cgroups.set_frozen(cgroup_path, False)
+        self._signal_process_group(pgid, signal.SIGCONT)
+        self.logger.info(f"Sent SIGTERM to process group {pgid}")
+
+        self._schedule_escalation(grace_period, pgid, cgroup_path, task_id, execution_id)
+        return True
+
+    def _schedule_escalation(self, grace_period, pgid, cgroup_path, task_id, execution_id):
+        """在后台线程中等待宽限期，进程组仍未退出时发送SIGKILL"""
+
+        def escalate():
+            self._wait_process_group_exit(pgid, grace_period)
+            self._kill_process_group(pgid, grace_period, cgroup_path, task_id, execution_id)
+
+        threading.Thread(target=escalate, name=f"fidlter-terminate-{pgid}", daemon=True).start()
+
+    def _kill_process_group(self, pgid, grace_period, cgroup_path, task_id, execution_id):
+        """宽限期结束后仍未退出的进程组发送SIGKILL，并在执行记录中写入进程组是否已全部退出"""
+        if not self._is_process_group_alive(pgid):
+            self._record_termination(task_id, execution_id, confirmed=True, escalated=False)
+            return
+
+        self.logger.warning(f"Process group {pgid} did not exit within {grace_period}s, sending SIGKILL")
+        self._signal_process_group(pgid, signal.SIGKILL)
+        if cgroup_path:
+            # 调用setsid脱离进程组的进程仍在控制组中
+            self.cgroups.kill_all(cgroup_path)
+        if task_id is not None and execution_id:
+            self.history.append_to_execution_log(
+                task_id, execution_id,
+                f"\nProcess group did not exit within {grace_period}s after SIGTERM, sent SIGKILL")
+
+        confirmed = self._wait_process_group_exit(pgid, self.KILL_WAIT_TIMEOUT)
+        if not confirmed:
+            self.logger.warning(f"Process group {pgid} of task {task_id} is still alive after SIGKILL")
+            if task_id is not None and execution_id:
+                self.history.append_to_execution_log(task_id, execution_id,
+                                                     f"\nProcess group {pgid} is still alive after SIGKILL")
+        self._record_termination(task_id, execution_id, confirmed=confirmed, escalated=True)
+
+    def _record_termination(self, task_id, execution_id, confirmed, escalated):
+        """在执行记录中写入终止结果：termination_confirmed表示进程组是否已全部退出，
+        termination_escalated表示是否升级为SIGKILL"""
+        if task_id is None or not execution_id:
+            return
+        self.history.update_execution_record(task_id, execution_id, {
+            'termination_confirmed': confirmed,
+            'termination_escalated': escalated
+        })
+
+    def _signal_process_group(self, pgid, sig):
+        """向进程组发送信号
+
+        返回:
+            布尔值，进程组不存在时返回False
+        """
+        try:
+            os.killpg(pgid, sig)
+            return True
+        except ProcessLookupError:
+            return False
+        except PermissionError as e:
+            self.logger.warning(f"Failed to send {signal.Signals(sig).name} to process group {pgid}: {str(e)}")
+            return True
+
+    def _is_process_group_alive(self, pgid):
+        """检查进程组中是否还有进程"""
+        try:
+            os.killpg(pgid, 0)
+            return True
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            return True
+
+    def _wait_process_group_exit(self, pgid, timeout):
+        """等待进程组中的所有进程退出
+
+        返回:
+            布尔值，超时前进程组是否已经全部退出
+        """
+        deadline = time.monotonic() + timeout
+        while self._is_process_group_alive(pgid):
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.1)
+        return True
 
     def set_task_provider(self, provider_func):
         """设置任务提供函数，用于获取任务对象
@@ -383,8 +942,19 @@ class TaskExecutor:
         """
         self._get_task = provider_func
 
+    def set_completion_callback(self, callback):
+        """设置执行结束回调
+
+        参数:
+            callback: 函数，接受task_id和execution_id参数，在执行记录写入最终状态后调用
+        """
+        self._completion_callback = callback
+
     def pause_task(self, task_id):
-        """暂停正在运行的任务，使用系统信号真正暂停进程执行
+        """暂停正在运行的任务
+
+        执行位于独立控制组时通过cgroup.freeze一次性冻结整个进程树，
+        否则向整个进程组发送SIGSTOP暂停进程执行
         
         参数:
             task_id: 任务ID
@@ -393,24 +963,21 @@ class TaskExecutor:
             包含操作结果的字典
         """
         # 首先在锁内获取需要的信息，然后尽快释放锁
-        task = None
-        process_pid = None
-        previous_status = None
-        execution_id = None
-
         with self.lock:
             # 获取任务对象
             task = self._get_task(task_id)
             if not task:
                 return {"success": False, "message": f"Task with ID {task_id} not found"}
 
-            # 检查任务状态
-            if task['status'] != 'running':
+            # 检查执行状态
+            execution = self.active_executions.get(task_id)
+            current_status = execution['status'] if execution else task['status']
+            if current_status != 'running':
                 return {
                     "success": False,
                     "message": "Task cannot be paused",
-                    "error": f"Cannot pause a task with status: '{task['status']}'",
-                    "current_status": task['status']
+                    "error": f"Cannot pause a task with status: '{current_status}'",
+                    "current_status": current_status
                 }
 
             # 检查暂停事件是否存在
@@ -421,8 +988,8 @@ class TaskExecutor:
                     "error": "Cannot pause task: execution thread not found"
                 }
 
-            # 检查是否有进程PID
-            if 'process_pid' not in task:
+            # 检查是否有进程组
+            if not execution.get('pgid'):
                 return {
                     "success": False,
                     "message": "Process PID not found",
@@ -430,49 +997,41 @@ class TaskExecutor:
                 }
 
             # 记录我们需要的信息
-            process_pid = task['process_pid']
-            previous_status = task['status']
-            execution_id = task.get('last_execution_id')
+            pgid = execution['pgid']
+            cgroup_path = execution.get('cgroup')
+            previous_status = current_status
+            execution_id = execution['execution_id']
 
-            # 更新任务状态
-            task['status'] = 'paused'
+            # 更新执行状态
+            execution['status'] = 'paused'
+            execution['paused_at'] = time.monotonic()
 
             # 暂停任务线程 - 必须在锁内完成，因为涉及到共享的事件对象
             self.pause_events[task_id].clear()  # 清除事件，阻塞线程
 
-        # 锁外执行可能耗时的系统调用
-        try:
-            # 获取所有子进程 - 在锁外执行
-            child_processes = self._get_child_processes(process_pid)
-
-            # 暂停所有子进程和主进程
-            for pid in child_processes:
-                try:
-                    os.kill(pid, signal.SIGSTOP)
-                    self.logger.info(f"Sent SIGSTOP to child process {pid}")
-                except (ProcessLookupError, PermissionError) as e:
-                    self.logger.warning(f"Failed to send SIGSTOP to child process {pid}: {str(e)}")
-
-            # 暂停主进程
-            try:
-                os.kill(process_pid, signal.SIGSTOP)
-                self.logger.info(f"Sent SIGSTOP to main process {process_pid}")
-            except (ProcessLookupError, PermissionError) as e:
-                self.logger.warning(f"Failed to send SIGSTOP to main process {process_pid}: {str(e)}")
+        # 锁外执行系统调用，优先使用冻结器，信号方式作为回退
+        if cgroup_path and self.cgroups.set_frozen(cgroup_path, True):
+            pause_method = 'freezer'
+            self.logger.info(f"Froze cgroup {cgroup_path}")
+        else:
+            pause_method = 'signal'
+            if self._signal_process_group(pgid, signal.SIGSTOP):
+                self.logger.info(f"Sent SIGSTOP to process group {pgid}")
+            else:
+                # 即使进程暂停失败，我们也保持任务状态为paused，因为线程已经被暂停
+                self.logger.warning(f"Failed to send SIGSTOP to process group {pgid}: process group not found")
 
-        except Exception as e:
-            self.logger.error(f"Error pausing process: {str(e)}")
-            # 即使进程暂停失败，我们也保持任务状态为paused，因为线程已经被暂停
+        with self.lock:
+            if task_id in self.active_executions:
+                self.active_executions[task_id]['pause_method'] = pause_method
 
         # 更新执行记录 - 锁外执行
-        if execution_id:
-            record = self.history.get_execution_record(task_id, execution_id)
-            if record:
-                updates = {
-                    'status': 'paused',
-                    'logs': record['logs'] + "\nTask was paused manually. Process execution suspended."
-                }
-                self.history.update_execution_record(task_id, execution_id, updates)
+        record = self.history.get_execution_summary(task_id, execution_id)
+        if record:
+            updates = {'status': 'paused', 'pause_method': pause_method}
+            self.history.update_execution_record(task_id, execution_id, updates)
+            self.history.append_to_execution_log(task_id, execution_id,
+                                                 "\nTask was paused manually. Process execution suspended.")
 
         self.logger.info(f"Task {task_id} paused successfully")
 
@@ -488,7 +1047,9 @@ class TaskExecutor:
         }
 
     def resume_task(self, task_id):
-        """恢复已暂停的任务，使用系统信号真正恢复进程执行
+        """恢复已暂停的任务
+
+        按暂停时使用的方式解冻控制组，或向整个进程组发送SIGCONT恢复进程执行
         
         参数:
             task_id: 任务ID
@@ -497,24 +1058,21 @@ class TaskExecutor:
             包含操作结果的字典
         """
         # 首先在锁内获取需要的信息，然后尽快释放锁
-        task = None
-        process_pid = None
-        previous_status = None
-        execution_id = None
-
         with self.lock:
             # 获取任务对象
             task = self._get_task(task_id)
             if not task:
                 return {"success": False, "message": f"Task with ID {task_id} not found"}
 
-            # 检查任务状态
-            if task['status'] != 'paused':
+            # 检查执行状态
+            execution = self.active_executions.get(task_id)
+            current_status = execution['status'] if execution else task['status']
+            if current_status != 'paused':
                 return {
                     "success": False,
                     "message": "Task is not paused",
-                    "error": f"Cannot resume a task with status: '{task['status']}'",
-                    "current_status": task['status']
+                    "error": f"Cannot resume a task with status: '{current_status}'",
+                    "current_status": current_status
                 }
 
             # 检查暂停事件是否存在
@@ -525,8 +1083,8 @@ class TaskExecutor:
                     "error": "Cannot resume task: execution thread not found"
                 }
 
-            # 检查是否有进程PID
-            if 'process_pid' not in task:
+            # 检查是否有进程组
+            if not execution.get('pgid'):
                 return {
                     "success": False,
                     "message": "Process PID not found",
@@ -534,36 +1092,32 @@ class TaskExecutor:
                 }
 
             # 记录我们需要的信息
-            process_pid = task['process_pid']
-            previous_status = task['status']
-            execution_id = task.get('last_execution_id')
-
-            # 更新任务状态
-            task['status'] = 'running'
-
-        # 锁外执行可能耗时的系统调用
-        try:
-            # 获取所有子进程 - 在锁外执行
-            child_processes = self._get_child_processes(process_pid)
-
-            # 恢复所有子进程
-            for pid in child_processes:
-                try:
-                    os.kill(pid, signal.SIGCONT)
-                    self.logger.info(f"Sent SIGCONT to child process {pid}")
-                except (ProcessLookupError, PermissionError) as e:
-                    self.logger.warning(f"Failed to send SIGCONT to child process {pid}: {str(e)}")
-
-            # 恢复主进程
-            try:
-                os.kill(process_pid, signal.SIGCONT)
-                self.logger.info(f"Sent SIGCONT to main process {process_pid}")
-            except (ProcessLookupError, PermissionError) as e:
-                self.logger.warning(f"Failed to send SIGCONT to main process {process_pid}: {str(e)}")
-
-        except Exception as e:
-            self.logger.error(f"Error resuming process: {str(e)}")
+            pgid = execution['pgid']
+            cgroup_path = execution.get('cgroup')
+            pause_method = execution.get('pause_method')
+            previous_status = current_status
+            execution_id = execution['execution_id']
+
+            # 更新执行状态，暂停时间不计入超时和无输出时间
+            execution['status'] = 'running'
+            execution['pause_method'] = None
+            if execution.get('paused_at') is not None:
+                execution['paused_seconds'] += time.monotonic() - execution['paused_at']
+                execution['paused_at'] = None
+            execution['last_output_at'] = time.monotonic()
+            memory_reclaimed = execution.get('memory_reclaimed')
+            execution['memory_reclaimed'] = False
+
+        # 锁外执行系统调用，暂停期间回收过内存时先允许内存重新增长
+        if memory_reclaimed and cgroup_path:
+            self.cgroups.restore_memory_high(cgroup_path)
+        if pause_method == 'freezer' and self.cgroups.set_frozen(cgroup_path, False):
+            self.logger.info(f"Thawed cgroup {cgroup_path}")
+        elif self._signal_process_group(pgid, signal.SIGCONT):
+            self.logger.info(f"Sent SIGCONT to process group {pgid}")
+        else:
             # 即使进程恢复失败，我们也继续恢复线程
+            self.logger.warning(f"Failed to send SIGCONT to process group {pgid}: process group not found")
 
         # 恢复任务线程 - 必须在锁外单独获取锁，因为涉及到共享的事件对象
         with self.lock:
@@ -571,14 +1125,11 @@ class TaskExecutor:
                 self.pause_events[task_id].set()  # 设置事件，解除线程阻塞
 
         # 更新执行记录 - 锁外执行
-        if execution_id:
-            record = self.history.get_execution_record(task_id, execution_id)
-            if record:
-                updates = {
-                    'status': 'running',
-                    'logs': record['logs'] + "\nTask was resumed manually. Process execution continued."
-                }
-                self.history.update_execution_record(task_id, execution_id, updates)
+        record = self.history.get_execution_summary(task_id, execution_id)
+        if record:
+            self.history.update_execution_record(task_id, execution_id, {'status': 'running'})
+            self.history.append_to_execution_log(task_id, execution_id,
+                                                 "\nTask was resumed manually. Process execution continued.")
 
         self.logger.info(f"Task {task_id} resumed successfully")
 
@@ -593,21 +1144,28 @@ class TaskExecutor:
             }
         }
 
-    def _get_child_processes(self, parent_pid):
-        """获取一个进程的所有子进程PID
-        
+    def shutdown(self):
+        """停止子进程回收器、指纹线程池和数据缓存的淘汰线程，输出读取和资源监控线程都是守护线程，无需额外清理"""
+        with self.lock:
+            reaper, self._reaper = self._reaper, None
+            fingerprint_pool, self._fingerprint_pool = self._fingerprint_pool, None
+        if reaper:
+            reaper.stop()
+        if fingerprint_pool:
+            fingerprint_pool.shutdown(wait=False)
+        self.data_cache.shutdown()
+
+    def is_task_running(self, task_id):
+        """检查任务是否有正在运行（含已暂停）的执行
+
         参数:
-            parent_pid: 父进程PID
-            
+            task_id: 任务ID
+
         返回:
-            包含所有子进程PID的列表
+            布尔值，表示任务是否有活动的执行
         """
-        try:
-            parent = psutil.Process(parent_pid)
-            children = parent.children(recursive=True)
-            return [child.pid for child in children]
-        except (psutil.NoSuchProcess, psutil.AccessDenied):
-            return []
+        with self.lock:
+            return task_id in self.active_executions
 
     def is_task_paused(self, task_id):
         """检查任务是否处于暂停状态
@@ -636,10 +1194,9 @@ class TaskExecutor:
         返回:
             布尔值，表示执行是否仍在运行
         """
-        # 获取执行记录
-        execution_record = self.history.get_execution_record(task_id, execution_id)
-        if not execution_record:
-            return False
+        # 任务的当前执行，无需查找和复制记录
+        if self.history.get_active_execution(task_id) == execution_id:
+            return True
 
         # 检查执行状态是否为运行中或暂停
-        return execution_record.get('status') in ['running', 'paused']
+        return self.history.get_execution_status(task_id, execution_id) in self.history.ACTIVE_STATUSES
@@ -3,8 +3,28 @@
 This module contains helper classes for the tasks service
 """
 
+from .cgroup_manager import CgroupManager
+from .data_cache import DataCache
 from .environment_handler import EnvironmentHandler
+from .execution_summary import ExecutionSummary
+from .exit_classifier import ExitClassifier
+from .launch_gate import LaunchGate
+from .log_broadcaster import LogBroadcaster, LogSubscription
+from .log_filter import LogFilter
+from .log_index import LogSearchIndex
+from .log_store import LogStore
+from .memoization import InputFingerprint, MemoCache
+from .memory_pressure import MemoryPressure
+from .process_priority import ProcessPriority
+from .process_reaper import ProcessReaper
+from .resource_sampler import ResourceSampler
+from .retention_policy import RetentionPolicy
+from .retry_policy import RetryPolicy
+from .scratch_manager import ScratchManager
 from .schedule_calculator import ScheduleCalculator
 from .task_validator import TaskValidator
+from .time_series import ResourceSeries, SamplingPolicy
 
-__all__ = ['EnvironmentHandler', 'ScheduleCalculator', 'TaskValidator']
+__all__ = [
+    'CgroupManager', 'DataCache', 'EnvironmentHandler', 'ExecutionSummary', 'ExitClassifier', 'InputFingerprint', 'LaunchGate', 'LogBroadcaster', 'LogSubscription', 'LogFilter', 'LogSearchIndex', 'LogStore', 'MemoCache', 'MemoryPressure', 'ProcessPriority', 'ProcessReaper', 'ResourceSampler', 'RetentionPolicy', 'RetryPolicy', 'ScratchManager', 'ScheduleCalculator', 'TaskValidator', 'ResourceSeries', 'SamplingPolicy'
+]
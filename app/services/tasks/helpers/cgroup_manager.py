@@ -0,0 +1,467 @@
+import os
+import errno
+import time
+import logging
+import threading
+from typing import Dict, Any, Optional, Tuple
+
+try:
+    import resource
+    HAS_RESOURCE = True
+except ImportError:
+    HAS_RESOURCE = False
+
+
+class CgroupManager:
+    """负责为任务执行创建cgroup v2控制组并施加资源限制
+
+    每次执行放入受委派子树下独立的控制组中，由内核强制执行memory.max、cpu.max、
+    pids.max和io.max限制，资源统计直接读取控制组的统计文件。
+    当运行环境不支持cgroup v2或子树不可写时，回退到setrlimit对单个进程施加限制。
+    """
+
+    # 受委派子树的位置，可以通过环境变量覆盖
+    ROOT_ENV = "FIDLTER_CGROUP_ROOT"
+    DEFAULT_ROOT_NAME = "fidlter"
+
+    CONTROLLERS = ("memory", "cpu", "pids", "io")
+    CPU_PERIOD_USEC = 100000
+    PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+    def __init__(self, root: Optional[str] = None):
+        """初始化cgroup管理器
+
+        Args:
+            root: 受委派子树的绝对路径（可选），默认读取FIDLTER_CGROUP_ROOT环境变量，
+                  或使用cgroup2挂载点下的fidlter目录
+        """
+        self.logger = logging.getLogger("CgroupManager")
+        self.lock = threading.Lock()
+        self._configured_root = root or os.environ.get(self.ROOT_ENV)
+        self.root = None
+        self._available = None  # 延迟检测，None表示尚未检测
+
+    def is_available(self) -> bool:
+        """检查cgroup v2子树是否可用且可写"""
+        with self.lock:
+            if self._available is None:
+                self._available = self._setup_root()
+            return self._available
+
+    def _setup_root(self) -> bool:
+        """定位并初始化受委派子树，启用所需的控制器"""
+        try:
+            mount_point = self._find_cgroup2_mount()
+            if not mount_point:
+                self.logger.info("未检测到cgroup v2挂载点，将使用setrlimit限制资源")
+                return False
+
+            root = self._configured_root or os.path.join(mount_point, self.DEFAULT_ROOT_NAME)
+            created = not os.path.isdir(root)
+            os.makedirs(root, exist_ok=True)
+
+            # 子树根目录本身不放进程，启用子控制组可用的控制器
+            available = self._read_file(os.path.join(root, "cgroup.controllers")).split()
+            if not os.access(os.path.join(root, "cgroup.procs"), os.W_OK) or \
+                    not any(c in available for c in self.CONTROLLERS):
+                self.logger.info(f"cgroup子树 {root} 不可写或没有可委派的控制器，将使用setrlimit限制资源")
+                if created:
+                    os.rmdir(root)
+                return False
+            enable = " ".join(f"+{c}" for c in self.CONTROLLERS if c in available)
+            if enable:
+                self._write_file(os.path.join(root, "cgroup.subtree_control"), enable)
+
+            self.root = root
+            self.logger.info(f"使用cgroup v2子树 {root} 管理任务资源，可用控制器: {' '.join(available)}")
+            return True
+        except OSError as e:
+            self.logger.info(f"cgroup v2不可用 ({str(e)})，将使用setrlimit限制资源")
+            return False
+
+    @staticmethod
+    def _find_cgroup2_mount() -> Optional[str]:
+        """从mountinfo中查找cgroup2文件系统的挂载点"""
+        try:
+            with open("/proc/self/mountinfo", "r") as f:
+                for line in f:
+                    # 格式: ... mount_point options - fstype source super_options
+                    left, _, right = line.partition(" - ")
+                    if right.split(" ", 1)[0] == "cgroup2":
+                        return left.split(" ")[4]
+        except OSError:
+            pass
+        return None
+
+    def create_execution_cgroup(self, execution_id: str, limits: Dict[str, Any]) -> Optional[str]:
+        """为一次执行创建控制组并写入资源限制
+
+        Args:
+            execution_id: 执行ID
+            limits: 资源限制，可包含memory_limit(MB)、cpu_limit(核数)、pids_limit、
+                    io_read_bps和io_write_bps(字节/秒)
+
+        Returns:
+            Optional[str]: 控制组路径，cgroup不可用或创建失败时返回None
+        """
+        if not self.is_available():
+            return None
+
+        path = os.path.join(self.root, f"exec-{execution_id}")
+        try:
+            os.makedirs(path, exist_ok=True)
+            self._apply_limits(path, limits)
+            return path
+        except OSError as e:
+            self.logger.warning(f"创建执行 {execution_id} 的控制组失败: {str(e)}")
+            self.remove_cgroup(path)
+            return None
+
+    def _apply_limits(self, path: str, limits: Dict[str, Any]) -> None:
+        """将任务配置中的资源限制写入控制组接口文件"""
+        if limits.get('memory_limit'):
+            self._write_file(os.path.join(path, "memory.max"), str(int(limits['memory_limit'] * 1024 * 1024)))
+
+        if limits.get('cpu_limit'):
+            quota = max(int(float(limits['cpu_limit']) * self.CPU_PERIOD_USEC), 1000)
+            self._write_file(os.path.join(path, "cpu.max"), f"{quota} {self.CPU_PERIOD_USEC}")
+
+        if limits.get('pids_limit'):
+            self._write_file(os.path.join(path, "pids.max"), str(int(limits['pids_limit'])))
+
+        io_settings = []
+        if limits.get('io_read_bps'):
+            io_settings.append(f"rbps={int(limits['io_read_bps'])}")
+        if limits.get('io_write_bps'):
+            io_settings.append(f"wbps={int(limits['io_write_bps'])}")
+        if io_settings:
+            device = self._block_device(limits.get('io_path') or "/")
+            if device:
+                self._write_file(os.path.join(path, "io.max"), f"{device} {' '.join(io_settings)}")
+            else:
+                self.logger.warning(f"无法确定 {limits.get('io_path') or '/'} 所在的块设备，跳过io.max限制")
+
+    def apply_weights(self, cgroup_path: str, cpu_weight: Optional[int], io_weight: Optional[int]) -> Dict[str, Any]:
+        """写入控制组的cpu.weight和io.weight，按权重在竞争的执行之间分配CPU时间和磁盘带宽
+
+        io.weight依赖块设备的I/O调度器（如BFQ）或io.cost，不支持时跳过
+
+        Args:
+            cgroup_path: 控制组路径
+            cpu_weight: CPU权重（1-10000，默认100）
+            io_weight: I/O权重（1-10000，默认100）
+
+        Returns:
+            Dict[str, Any]: 实际生效的cpu_weight和io_weight，未能写入的项为None
+        """
+        effective = {'cpu_weight': None, 'io_weight': None}
+        for key, file_name, value in (('cpu_weight', "cpu.weight", cpu_weight),
+                                      ('io_weight', "io.weight", io_weight)):
+            if value is None:
+                continue
+            file_path = os.path.join(cgroup_path, file_name)
+            try:
+                # io.weight的格式为"default 100"
+                self._write_file(file_path, f"default {value}" if key == 'io_weight' else str(value))
+            except OSError as e:
+                self.logger.debug(f"写入 {file_path} 失败: {str(e)}")
+                continue
+            content = self._read_file(file_path).split()
+            if content:
+                effective[key] = int(content[-1]) if content[-1].isdigit() else None
+        return effective
+
+    @staticmethod
+    def _block_device(path: str) -> Optional[str]:
+        """获取路径所在块设备的"主设备号:次设备号"，分区会映射到整块磁盘"""
+        try:
+            dev = os.stat(path).st_dev
+            major, minor = os.major(dev), os.minor(dev)
+            # io.max只接受整块设备，通过sysfs从分区找到所属磁盘
+            sys_path = os.path.realpath(f"/sys/dev/block/{major}:{minor}")
+            if os.path.exists(os.path.join(sys_path, "partition")):
+                with open(os.path.join(os.path.dirname(sys_path), "dev"), "r") as f:
+                    return f.read().strip()
+            if os.path.exists(sys_path):
+                return f"{major}:{minor}"
+        except OSError:
+            pass
+        return None
+
+    def attach(self, cgroup_path: str, pid: int) -> bool:
+        """将已启动的进程移入控制组，之后派生的所有进程都会留在组内
+
+        由父进程在子进程执行任务命令之前调用（见LaunchGate），不在preexec_fn中写入cgroup.procs
+
+        Returns:
+            bool: 是否成功，失败时调用方应回退到rlimit
+        """
+        try:
+            self._write_file(os.path.join(cgroup_path, "cgroup.procs"), str(pid))
+            return True
+        except OSError as e:
+            self.logger.warning(f"将进程 {pid} 加入控制组 {cgroup_path} 失败，回退到rlimit: {str(e)}")
+            return False
+
+    def apply_rlimits(self, pid: int, limits: Dict[str, Any]) -> bool:
+        """使用prlimit对已启动的进程施加可以映射的限制，之后派生的进程会继承
+
+        Returns:
+            bool: 是否施加了任何限制
+        """
+        rlimits = self.get_rlimits(limits)
+        if not rlimits or not hasattr(resource, 'prlimit'):
+            return False
+        applied = False
+        for limit, value in rlimits:
+            try:
+                resource.prlimit(pid, limit, (value, value))
+                applied = True
+            except (ValueError, OSError) as e:
+                # 超过硬限制等情况下保持原有限制
+                self.logger.debug(f"为进程 {pid} 设置rlimit失败: {str(e)}")
+        return applied
+
+    @staticmethod
+    def get_rlimits(limits: Dict[str, Any]):
+        """将资源限制映射为setrlimit参数列表
+
+        cpu.max和io.max是速率限制，没有对应的rlimit，回退模式下不施加。pids_limit也不映射：
+        RLIMIT_NPROC按用户统计进程数，会把服务用户的全部进程都计算在内
+
+        Returns:
+            List[Tuple[int, int]]: (rlimit常量, 限制值)列表
+        """
+        if not HAS_RESOURCE:
+            return []
+        rlimits = []
+        if limits.get('memory_limit'):
+            rlimits.append((resource.RLIMIT_DATA, int(limits['memory_limit'] * 1024 * 1024)))
+        return rlimits
+
+    def read_stats(self, cgroup_path: str) -> Dict[str, Any]:
+        """读取控制组的资源统计
+
+        Returns:
+            Dict[str, Any]: 包含memory_current(字节)、cpu_usage_usec、io_read_bytes、
+                            io_write_bytes、pids_current和pids列表，读取失败的项不包含在结果中
+        """
+        stats = {}
+
+        current = self._read_int(os.path.join(cgroup_path, "memory.current"))
+        if current is not None:
+            stats['memory_current'] = current
+
+        cpu_stat = self.read_keyed_file(os.path.join(cgroup_path, "cpu.stat"))
+        if 'usage_usec' in cpu_stat:
+            stats['cpu_usage_usec'] = cpu_stat['usage_usec']
+
+        io_stat = self._read_io_stat(os.path.join(cgroup_path, "io.stat"))
+        if io_stat is not None:
+            stats['io_read_bytes'], stats['io_write_bytes'] = io_stat
+
+        pids_current = self._read_int(os.path.join(cgroup_path, "pids.current"))
+        if pids_current is not None:
+            stats['pids_current'] = pids_current
+
+        stats['pids'] = self.get_pids(cgroup_path)
+        return stats
+
+    def get_pids(self, cgroup_path: str):
+        """获取控制组（含子控制组）中的所有进程PID"""
+        pids = []
+        for dirpath, _, _ in os.walk(cgroup_path):
+            try:
+                pids.extend(int(pid) for pid in self._read_file(os.path.join(dirpath, "cgroup.procs")).split())
+            except (OSError, ValueError):
+                continue
+        return pids
+
+    def read_keyed_file(self, file_path: str) -> Dict[str, int]:
+        """读取"键 值"格式的统计文件，如cpu.stat、memory.events、memory.stat"""
+        result = {}
+        try:
+            for line in self._read_file(file_path).splitlines():
+                parts = line.split()
+                if len(parts) == 2:
+                    try:
+                        result[parts[0]] = int(parts[1])
+                    except ValueError:
+                        continue
+        except OSError:
+            pass
+        return result
+
+    def _read_io_stat(self, file_path: str):
+        """汇总io.stat中所有设备的读写字节数"""
+        try:
+            content = self._read_file(file_path)
+        except OSError:
+            return None
+        read_bytes = 0
+        write_bytes = 0
+        for line in content.splitlines():
+            for item in line.split()[1:]:
+                key, _, value = item.partition("=")
+                if key == "rbytes":
+                    read_bytes += int(value)
+                elif key == "wbytes":
+                    write_bytes += int(value)
+        return read_bytes, write_bytes
+
+    def set_frozen(self, cgroup_path: str, frozen: bool, timeout: float = 5.0) -> bool:
+        """通过cgroup.freeze冻结或解冻控制组中的整个进程树
+
+        冻结是对整个控制组（含子控制组）的单次操作，冻结期间新派生的进程同样处于冻结状态，
+        写入后轮询cgroup.events，直到内核确认所有进程都已进入目标状态
+
+        Args:
+            cgroup_path: 控制组路径
+            frozen: True为冻结，False为解冻
+            timeout: 等待状态生效的最长秒数
+
+        Returns:
+            bool: 是否在超时前确认进入目标状态，内核低于5.2时没有cgroup.freeze，返回False。
+                  冻结超时时会写回0撤销冻结，返回False后控制组一定不会保持冻结，调用方可以改用信号暂停
+        """
+        try:
+            self._write_file(os.path.join(cgroup_path, "cgroup.freeze"), "1" if frozen else "0")
+        except OSError as e:
+            self.logger.warning(f"写入 {cgroup_path} 的cgroup.freeze失败: {str(e)}")
+            return False
+
+        expected = 1 if frozen else 0
+        deadline = time.monotonic() + timeout
+        while True:
+            events = self.read_keyed_file(os.path.join(cgroup_path, "cgroup.events"))
+            if events.get('frozen') == expected:
+                return True
+            if time.monotonic() >= deadline:
+                self.logger.warning(f"控制组 {cgroup_path} 在 {timeout} 秒内未{'冻结' if frozen else '解冻'}")
+                if frozen:
+                    # 撤销冻结，否则按信号方式恢复时只发送SIGCONT，控制组会一直处于冻结状态
+                    try:
+                        self._write_file(os.path.join(cgroup_path, "cgroup.freeze"), "0")
+                    except OSError as e:
+                        self.logger.error(f"撤销 {cgroup_path} 的冻结失败: {str(e)}")
+                return False
+            time.sleep(0.05)
+
+    def reclaim_memory(self, cgroup_path: str) -> Optional[int]:
+        """将控制组的内存尽可能换出，用于在主机内存紧张时回收已暂停执行占用的内存
+
+        优先通过memory.reclaim（内核5.19+）主动回收当前全部用量；不支持时将memory.high
+        降低到0，写入memory.high会在写入方上下文中同步回收超出部分。
+        使用memory.high方式时，恢复执行前需要调用restore_memory_high()
+
+        Args:
+            cgroup_path: 控制组路径
+
+        Returns:
+            Optional[int]: 实际回收的字节数（按memory.current的差值计算），无法回收时返回None
+        """
+        before = self._read_int(os.path.join(cgroup_path, "memory.current"))
+        if before is None:
+            return None
+
+        try:
+            self._write_file(os.path.join(cgroup_path, "memory.reclaim"), str(before))
+        except OSError as e:
+            # EAGAIN表示未能回收全部请求量，部分回收已经生效
+            if e.errno != errno.EAGAIN:
+                try:
+                    self._write_file(os.path.join(cgroup_path, "memory.high"), "0")
+                except OSError as high_error:
+                    self.logger.warning(f"回收控制组 {cgroup_path} 的内存失败: {str(high_error)}")
+                    return None
+
+        after = self._read_int(os.path.join(cgroup_path, "memory.current"))
+        return max(before - (after if after is not None else before), 0)
+
+    def restore_memory_high(self, cgroup_path: str) -> None:
+        """取消reclaim_memory()设置的memory.high限制，允许内存重新增长"""
+        try:
+            self._write_file(os.path.join(cgroup_path, "memory.high"), "max")
+        except OSError as e:
+            self.logger.warning(f"恢复控制组 {cgroup_path} 的memory.high失败: {str(e)}")
+
+    def read_refault_bytes(self, cgroup_path: str) -> Optional[int]:
+        """读取控制组被回收后又重新缺页读回的累计字节数（memory.stat中的workingset_refault）"""
+        stat = self.read_keyed_file(os.path.join(cgroup_path, "memory.stat"))
+        if 'workingset_refault_anon' in stat or 'workingset_refault_file' in stat:
+            pages = stat.get('workingset_refault_anon', 0) + stat.get('workingset_refault_file', 0)
+        elif 'workingset_refault' in stat:
+            pages = stat['workingset_refault']  # 内核5.9之前只有一个合计值
+        else:
+            return None
+        return pages * self.PAGE_SIZE
+
+    def read_oom_events(self, cgroup_path: str) -> Tuple[int, Optional[int]]:
+        """读取控制组（含子控制组）memory.events中的OOM计数
+
+        oom_kill统计组内被任何OOM killer（包括系统整体内存不足时）终止的进程数，
+        oom只统计内存用量达到控制组自身memory.max、分配即将失败的次数
+
+        Returns:
+            Tuple[int, Optional[int]]: (oom_kill, oom)，内核没有oom计数时第二项为None
+        """
+        events = self.read_keyed_file(os.path.join(cgroup_path, "memory.events"))
+        return events.get('oom_kill', 0), events.get('oom')
+
+    def kill_all(self, cgroup_path: str) -> bool:
+        """通过cgroup.kill向控制组（含子控制组）中的所有进程发送SIGKILL
+
+        Returns:
+            bool: 是否成功写入cgroup.kill，内核低于5.14时没有该接口
+        """
+        try:
+            self._write_file(os.path.join(cgroup_path, "cgroup.kill"), "1")
+            return True
+        except OSError:
+            return False
+
+    def remove_cgroup(self, cgroup_path: Optional[str], timeout: float = 5.0) -> bool:
+        """删除执行的控制组，组内仍有残留进程时先通过cgroup.kill结束它们
+
+        Args:
+            cgroup_path: 控制组路径
+            timeout: 等待残留进程退出的最长秒数
+
+        Returns:
+            bool: 是否成功删除
+        """
+        if not cgroup_path or not os.path.isdir(cgroup_path):
+            return True
+
+        if self.get_pids(cgroup_path):
+            self.kill_all(cgroup_path)
+
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                # 先删除可能由任务自己创建的子控制组
+                for dirpath, _, _ in sorted(os.walk(cgroup_path), key=lambda item: -len(item[0])):
+                    os.rmdir(dirpath)
+                return True
+            except OSError as e:
+                if time.monotonic() >= deadline:
+                    self.logger.warning(f"删除控制组 {cgroup_path} 失败: {str(e)}")
+                    return False
+                time.sleep(0.1)
+
+    def _read_int(self, file_path: str) -> Optional[int]:
+        """读取只包含一个整数的接口文件，值为max时返回None"""
+        try:
+            return int(self._read_file(file_path).strip())
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _read_file(file_path: str) -> str:
+        with open(file_path, "r") as f:
+            return f.read()
+
+    @staticmethod
+    def _write_file(file_path: str, content: str) -> None:
+        with open(file_path, "w") as f:
+            f.write(content)
@@ -0,0 +1,454 @@
+import os
+import re
+import time
+import logging
+import threading
+from typing import Dict, Any, Optional, List, Tuple
+
+
+class DataCache:
+    """任务之间共享的数据缓存目录
+
+    每个任务默认使用独立的命名空间tasks/<task_id>，也可以指定共享命名空间shared/<name>，
+    命名空间目录通过FIDLTER_CACHE环境变量传给任务。后台线程定期统计缓存占用，
+    超出总预算时按文件的最近访问时间从旧到新淘汰，固定的命名空间或路径不会被淘汰。
+    文件系统通常以relatime或noatime挂载，atime不可靠，因此最近访问时间取文件的mtime与
+    所在命名空间最近一次被执行使用的时间中较新者。
+
+    缓存是否命中以执行为单位判断：执行开始时命名空间已有文件，且执行期间没有新增或修改文件，
+    视为命中；执行期间写入了文件（下载或重新生成数据）视为未命中。执行开始时不遍历命名空间，
+    结束时遍历一次，ctime不早于执行开始时间的文件即为执行期间写入的文件
+    """
+
+    ROOT_ENV = "FIDLTER_CACHE_ROOT"
+    BUDGET_ENV = "FIDLTER_CACHE_BUDGET_MB"
+    INTERVAL_ENV = "FIDLTER_CACHE_EVICT_INTERVAL"
+
+    DEFAULT_BUDGET_MB = 10240
+    DEFAULT_EVICT_INTERVAL = 60  # 秒
+
+    # 淘汰到预算的该比例为止，避免每次只低于预算一点又很快触发淘汰
+    LOW_WATERMARK = 0.9
+
+    # 最近该秒数内访问过的文件不淘汰，避免删除正在下载或读取的文件
+    MIN_EVICT_AGE = 300
+
+    SHARED_DIR = "shared"
+    TASKS_DIR = "tasks"
+    SHARED_NAME_PATTERN = re.compile(r'^[A-Za-z0-9][A-Za-z0-9._-]{0,63}$')
+
+    def __init__(self, persistence, root: Optional[str] = None, budget_mb: Optional[float] = None,
+                 evict_interval: Optional[float] = None):
+        """初始化数据缓存
+
+        Args:
+            persistence: DataPersistence实例，用于保存固定项和命中统计
+            root: 缓存根目录（可选），默认读取FIDLTER_CACHE_ROOT环境变量，或使用DataPersistence.CACHE_DIR
+            budget_mb: 缓存总预算(MB)，默认读取FIDLTER_CACHE_BUDGET_MB环境变量
+            evict_interval: 后台统计和淘汰的间隔（秒），默认读取FIDLTER_CACHE_EVICT_INTERVAL环境变量
+        """
+        self.logger = logging.getLogger("DataCache")
+        self.lock = threading.RLock()
+        self.persistence = persistence
+        self.root = root or os.environ.get(self.ROOT_ENV) or persistence.CACHE_DIR
+        self.budget_bytes = int(float(budget_mb if budget_mb is not None else
+                                      os.environ.get(self.BUDGET_ENV, self.DEFAULT_BUDGET_MB)) * 1024 * 1024)
+        self.evict_interval = float(evict_interval if evict_interval is not None else
+                                    os.environ.get(self.INTERVAL_ENV, self.DEFAULT_EVICT_INTERVAL))
+
+        state = persistence.load_cache_state() or {}
+        self._pins = {ns: set(paths) for ns, paths in state.get('pins', {}).items()}  # 命名空间 -> 固定的相对路径
+        self._stats = state.get('namespaces', {})  # 命名空间 -> {hits, misses, last_used}
+        self._sessions = {}  # 执行ID -> {namespace, path, started_ns, files_before}
+        self._index = {}  # 命名空间 -> 最近一次统计或执行结束时的文件相对路径集合
+        self._active = {}  # 命名空间 -> 正在使用的执行数
+        self._usage = None  # 最近一次统计结果
+        self._last_eviction = None
+
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="fidlter-cache-evictor", daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def is_valid_shared_name(cls, name: str) -> bool:
+        """检查共享命名空间名称是否合法"""
+        return bool(name) and bool(cls.SHARED_NAME_PATTERN.match(name))
+
+    @classmethod
+    def namespace_for(cls, task_id, shared_name: Optional[str] = None) -> str:
+        """获取任务使用的命名空间：指定共享名称时为shared/<name>，否则为tasks/<task_id>"""
+        if shared_name:
+            return f"{cls.SHARED_DIR}/{shared_name}"
+        return f"{cls.TASKS_DIR}/{task_id}"
+
+    def namespace_path(self, namespace: str) -> str:
+        """获取命名空间的目录"""
+        return os.path.join(self.root, namespace)
+
+    def is_known_namespace(self, namespace: str) -> bool:
+        """检查命名空间格式是否合法（tasks/<task_id>或shared/<name>）"""
+        scope, _, name = namespace.partition('/')
+        if scope == self.TASKS_DIR:
+            return name.isdigit()
+        return scope == self.SHARED_DIR and self.is_valid_shared_name(name)
+
+    # 执行期间的使用记录
+
+    def begin(self, execution_id: str, namespace: str) -> Optional[str]:
+        """执行开始时创建命名空间目录并记录开始时间
+
+        只在命名空间还没有文件索引（服务启动后首次使用且尚未统计）时遍历一次目录
+
+        Args:
+            execution_id: 执行ID
+            namespace: 命名空间
+
+        Returns:
+            Optional[str]: 命名空间目录，创建失败时返回None
+        """
+        path = self.namespace_path(namespace)
+        try:
+            os.makedirs(path, exist_ok=True)
+        except OSError as e:
+            self.logger.warning(f"创建缓存目录 {path} 失败: {str(e)}")
+            return None
+
+        with self.lock:
+            indexed = namespace in self._index
+        if not indexed:
+            files = {rel_path for rel_path, _ in self._walk(path)}
+            with self.lock:
+                self._index.setdefault(namespace, files)
+
+        started_ns = time.time_ns()
+        with self.lock:
+            self._sessions[execution_id] = {
+                'namespace': namespace,
+                'path': path,
+                'started_ns': started_ns,
+                'files_before': len(self._index[namespace])
+            }
+            self._active[namespace] = self._active.get(namespace, 0) + 1
+            self._touch(namespace, started_ns / 1e9)
+        return path
+
+    def get_path(self, execution_id: str) -> Optional[str]:
+        """获取执行使用的命名空间目录"""
+        with self.lock:
+            session = self._sessions.get(execution_id)
+            return session['path'] if session else None
+
+    def finish(self, execution_id: str) -> Optional[Dict[str, Any]]:
+        """执行结束时比较文件快照，判断是否命中并更新命名空间的统计
+
+        Returns:
+            Optional[Dict[str, Any]]: 写入执行记录的缓存使用情况，执行没有使用缓存时返回None
+        """
+        with self.lock:
+            session = self._sessions.get(execution_id)
+        if not session:
+            return None
+
+        # ctime不能由任务设置，解压或复制时保留原mtime的文件也能识别为执行期间写入
+        namespace = session['namespace']
+        with self.lock:
+            known = self._index.get(namespace, set())
+        files = set()
+        files_added = 0
+        files_modified = 0
+        bytes_written = 0
+        for rel_path, stat in self._walk(session['path']):
+            files.add(rel_path)
+            if stat.st_ctime_ns < session['started_ns']:
+                continue
+            if rel_path in known:
+                files_modified += 1
+            else:
+                files_added += 1
+            bytes_written += stat.st_size
+
+        if files_added or files_modified:
+            result = 'miss'
+        elif session['files_before']:
+            result = 'hit'
+        else:
+            result = 'unused'
+
+        with self.lock:
+            self._release(execution_id)
+            self._index[namespace] = files
+            stats = self._touch(namespace, time.time())
+            if result == 'hit':
+                stats['hits'] += 1
+            elif result == 'miss':
+                stats['misses'] += 1
+            stats['last_used'] = time.strftime('%Y-%m-%d %H:%M:%S')
+            self._save_state()
+
+        return {
+            'namespace': namespace,
+            'result': result,
+            'files_before': session['files_before'],
+            'files_added': files_added,
+            'files_modified': files_modified,
+            'bytes_written': bytes_written
+        }
+
+    def discard(self, execution_id: str) -> None:
+        """执行异常结束时释放命名空间，不更新统计"""
+        with self.lock:
+            self._release(execution_id)
+
+    def _release(self, execution_id: str) -> None:
+        session = self._sessions.pop(execution_id, None)
+        if session:
+            namespace = session['namespace']
+            self._active[namespace] -= 1
+            if self._active[namespace] <= 0:
+                del self._active[namespace]
+
+    def _touch(self, namespace: str, used_at: float) -> Dict[str, Any]:
+        """记录命名空间被执行使用的时间，作为其中文件的最近访问时间，调用方需持有锁"""
+        stats = self._stats.setdefault(namespace, {'hits': 0, 'misses': 0, 'last_used': None})
+        stats['last_used_at'] = max(stats.get('last_used_at') or 0.0, used_at)
+        return stats
+
+    def _last_used_at(self, namespace: str) -> float:
+        """命名空间最近一次被执行使用的时间戳，兼容只保存了last_used字符串的旧状态"""
+        stats = self._stats.get(namespace, {})
+        if stats.get('last_used_at'):
+            return stats['last_used_at']
+        if stats.get('last_used'):
+            try:
+                return time.mktime(time.strptime(stats['last_used'], '%Y-%m-%d %H:%M:%S'))
+            except ValueError:
+                pass
+        return 0.0
+
+    # 固定
+
+    def pin(self, namespace: str, path: str = '') -> None:
+        """固定命名空间或其中的路径，固定的文件不会被淘汰
+
+        Args:
+            namespace: 命名空间
+            path: 命名空间内的相对路径（文件或目录），为空时固定整个命名空间
+
+        Raises:
+            ValueError: 路径超出命名空间目录
+        """
+        path = self._normalize(path)
+        with self.lock:
+            self._pins.setdefault(namespace, set()).add(path)
+            self._save_state()
+
+    def unpin(self, namespace: str, path: str = '') -> bool:
+        """取消固定，返回是否存在该固定项
+
+        Raises:
+            ValueError: 路径超出命名空间目录
+        """
+        path = self._normalize(path)
+        with self.lock:
+            paths = self._pins.get(namespace)
+            if not paths or path not in paths:
+                return False
+            paths.discard(path)
+            if not paths:
+                del self._pins[namespace]
+            self._save_state()
+            return True
+
+    def _is_pinned(self, namespace: str, rel_path: str) -> bool:
+        for pinned in self._pins.get(namespace, ()):
+            if not pinned or rel_path == pinned or rel_path.startswith(pinned + '/'):
+                return True
+        return False
+
+    @staticmethod
+    def _normalize(path: str) -> str:
+        """规范化命名空间内的相对路径
+
+        Raises:
+            ValueError: 路径超出命名空间目录
+        """
+        path = os.path.normpath(path or '.').strip('/')
+        if path == '.':
+            return ''
+        if path == '..' or path.startswith('../'):
+            raise ValueError(f"Path must be inside the namespace: {path}")
+        return path
+
+    # 统计和淘汰
+
+    def get_usage(self, refresh: bool = False) -> Dict[str, Any]:
+        """获取缓存的使用情况
+
+        Args:
+            refresh: 是否立即重新统计，默认返回后台线程最近一次的统计结果
+
+        Returns:
+            Dict[str, Any]: 包含root、budget_bytes、total_bytes、scanned_at、namespaces和last_eviction
+        """
+        if refresh or self._usage is None:
+            self._scan()
+
+        with self.lock:
+            usage = self._usage
+            namespaces = []
+            names = set(usage['namespaces']) | set(self._stats) | set(self._pins)
+            for namespace in sorted(names):
+                scanned = usage['namespaces'].get(namespace, {'size_bytes': 0, 'files': 0, 'last_access': None})
+                stats = self._stats.get(namespace, {})
+                namespaces.append({
+                    'namespace': namespace,
+                    'size_bytes': scanned['size_bytes'],
+                    'files': scanned['files'],
+                    'last_access': scanned['last_access'],
+                    'last_used': stats.get('last_used'),
+                    'hits': stats.get('hits', 0),
+                    'misses': stats.get('misses', 0),
+                    'pinned': sorted(self._pins.get(namespace, ())),
+                    'in_use': self._active.get(namespace, 0)
+                })
+
+            return {
+                'root': self.root,
+                'budget_bytes': self.budget_bytes,
+                'total_bytes': usage['total_bytes'],
+                'scanned_at': usage['scanned_at'],
+                'namespaces': namespaces,
+                'last_eviction': self._last_eviction
+            }
+
+    def evict(self) -> Dict[str, Any]:
+        """统计缓存占用，超出预算时按最近访问时间淘汰文件
+
+        Returns:
+            Dict[str, Any]: 本次淘汰的文件数、字节数以及淘汰前后的总占用
+        """
+        files = self._scan()
+        total = self._usage['total_bytes']
+        result = {'at': time.strftime('%Y-%m-%d %H:%M:%S'), 'files': 0, 'bytes': 0, 'total_before': total}
+
+        if total > self.budget_bytes:
+            target = self.budget_bytes * self.LOW_WATERMARK
+            cutoff = time.time() - self.MIN_EVICT_AGE
+            with self.lock:
+                candidates = [
+                    entry for entry in files if entry[0] not in self._active and entry[3] < cutoff and
+                    not self._is_pinned(entry[0], entry[1])
+                ]
+            candidates.sort(key=lambda entry: entry[3])
+
+            for namespace, rel_path, size, _ in candidates:
+                if total <= target:
+                    break
+                try:
+                    os.remove(os.path.join(self.namespace_path(namespace), rel_path))
+                except OSError:
+                    continue
+                total -= size
+                result['files'] += 1
+                result['bytes'] += size
+
+            if result['files']:
+                self._remove_empty_dirs()
+                self._scan()
+                self.logger.info(f"数据缓存超出预算，淘汰了 {result['files']} 个文件，共 {result['bytes']} 字节")
+
+        result['total_after'] = self._usage['total_bytes']
+        with self.lock:
+            if result['files'] or self._last_eviction is None:
+                self._last_eviction = result
+        return result
+
+    def shutdown(self) -> None:
+        """停止后台淘汰线程"""
+        self._stop_event.set()
+
+    def _run(self) -> None:
+        """后台线程：定期统计缓存占用并按需淘汰"""
+        while not self._stop_event.wait(self.evict_interval):
+            try:
+                self.evict()
+            except Exception as e:
+                self.logger.error(f"数据缓存淘汰失败: {str(e)}")
+
+    def _scan(self) -> List[Tuple[str, str, int, float]]:
+        """统计所有命名空间的文件
+
+        Returns:
+            List[Tuple[str, str, int, float]]: (命名空间, 相对路径, 占用字节数, 最近访问时间)列表
+        """
+        files = []
+        namespaces = {}
+        index = {}
+        total = 0
+        for scope in (self.SHARED_DIR, self.TASKS_DIR):
+            scope_dir = os.path.join(self.root, scope)
+            try:
+                names = os.listdir(scope_dir)
+            except OSError:
+                continue
+            for name in names:
+                namespace = f"{scope}/{name}"
+                summary = {'size_bytes': 0, 'files': 0, 'last_access': None}
+                with self.lock:
+                    last_used_at = self._last_used_at(namespace)
+                latest = 0.0
+                index[namespace] = set()
+                for rel_path, stat in self._walk(os.path.join(scope_dir, name)):
+                    size = stat.st_blocks * 512
+                    accessed = max(stat.st_mtime, last_used_at)
+                    files.append((namespace, rel_path, size, accessed))
+                    index[namespace].add(rel_path)
+                    summary['size_bytes'] += size
+                    summary['files'] += 1
+                    latest = max(latest, accessed)
+                if latest:
+                    summary['last_access'] = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(latest))
+                namespaces[namespace] = summary
+                total += summary['size_bytes']
+
+        with self.lock:
+            self._index.update(index)
+            self._usage = {
+                'total_bytes': total,
+                'scanned_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+                'namespaces': namespaces
+            }
+        return files
+
+    def _remove_empty_dirs(self) -> None:
+        """删除淘汰后留下的空目录，保留命名空间目录本身"""
+        for scope in (self.SHARED_DIR, self.TASKS_DIR):
+            scope_dir = os.path.join(self.root, scope)
+            if not os.path.isdir(scope_dir):
+                continue
+            for name in os.listdir(scope_dir):
+                namespace_dir = os.path.join(scope_dir, name)
+                for root, _, _ in os.walk(namespace_dir, topdown=False):
+                    if root != namespace_dir and not os.listdir(root):
+                        try:
+                            os.rmdir(root)
+                        except OSError:
+                            pass
+
+    @staticmethod
+    def _walk(path: str):
+        """遍历目录下的所有普通文件，返回(相对路径, stat)"""
+        for root, dirs, files in os.walk(path):
+            for name in files:
+                full_path = os.path.join(root, name)
+                try:
+                    stat = os.lstat(full_path)
+                except OSError:
+                    continue
+                yield os.path.relpath(full_path, path), stat
+
+    def _save_state(self) -> None:
+        self.persistence.save_cache_state({
+            'pins': {namespace: sorted(paths) for namespace, paths in self._pins.items()},
+            'namespaces': self._stats
+        })
@@ -0,0 +1,53 @@
+from typing import Dict, Any, Tuple
+
+
+class ExecutionSummary:
+    """执行记录的摘要，只包含列表和统计需要的标量字段，常驻内存
+
+    执行记录的其余字段（资源时间序列、最后几行日志、资源限制和调度参数等）为执行详情，
+    执行结束后保存在单独的文件中，需要时再读取。摘要使用__slots__，不为每条记录创建字典
+    """
+
+    FIELDS = (
+        'execution_id', 'status', 'start_time', 'end_time', 'duration', 'exit_code', 'exit_reason', 'signal',
+        'attempt', 'retry_of', 'superseded_by', 'next_retry_at', 'cached_from', 'details_removed_at',
+        'peak_memory', 'avg_memory', 'peak_cpu', 'avg_cpu', 'cpu_time', 'io_read_bytes', 'io_write_bytes',
+        'peak_io_read_rate', 'avg_io_read_rate', 'peak_io_write_rate', 'avg_io_write_rate', 'peak_threads',
+        'avg_threads', 'peak_fds', 'avg_fds', 'peak_ctx_switch_rate', 'avg_ctx_switch_rate', 'ctx_switches_voluntary',
+        'ctx_switches_involuntary'
+    )
+    __slots__ = FIELDS
+
+    def __init__(self, record: Dict[str, Any]):
+        """从执行记录中取出摘要字段
+
+        Args:
+            record: 执行记录，可以包含详情字段，详情字段会被忽略
+        """
+        for field in self.FIELDS:
+            setattr(self, field, record.get(field))
+
+    @classmethod
+    def split(cls, record: Dict[str, Any]) -> Tuple['ExecutionSummary', Dict[str, Any]]:
+        """将执行记录拆分为摘要和详情
+
+        Returns:
+            Tuple[ExecutionSummary, Dict[str, Any]]: (摘要, 不属于摘要的字段)
+        """
+        details = {field: value for field, value in record.items() if field not in cls.__slots__}
+        return cls(record), details
+
+    def get(self, field: str, default=None):
+        """按字段名读取，与执行记录字典的get用法相同，未设置或不是摘要字段时返回default"""
+        value = getattr(self, field, None) if field in self.__slots__ else None
+        return default if value is None else value
+
+    def update(self, updates: Dict[str, Any]):
+        """更新摘要字段，忽略详情字段"""
+        for field, value in updates.items():
+            if field in self.__slots__:
+                setattr(self, field, value)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典，省略未设置的字段"""
+        return {field: getattr(self, field) for field in self.FIELDS if getattr(self, field) is not None}
@@ -0,0 +1,143 @@
+import signal
+from typing import Dict, Any, Optional
+
+
+class ExitClassifier:
+    """根据退出码、终止原因和控制组事件判断执行的结束状态
+
+    区分正常完成、普通失败、被信号终止、程序崩溃、内核OOM终止、超出内存限制被终止、
+    超时、卡死和手动停止，供执行记录和统计使用
+    """
+
+    COMPLETED = 'completed'
+    FAILED = 'failed'
+    KILLED = 'killed'
+    CRASHED = 'crashed'
+    OOM_KILLED = 'oom_killed'
+    MEMORY_LIMIT = 'memory_limit'
+    TIMEOUT = 'timeout'
+    STALLED = 'stalled'
+    STOPPED = 'stopped'
+    CACHED = 'cached'  # 开启记忆化的任务输入未变化，跳过了执行
+
+    # 执行器主动终止执行的原因，与终止时记录的termination_reason对应
+    TERMINATION_STATUSES = (STOPPED, MEMORY_LIMIT, TIMEOUT, STALLED)
+
+    # 非正常结束的状态（不含普通失败和手动停止）
+    ABNORMAL_STATUSES = (KILLED, CRASHED, OOM_KILLED, MEMORY_LIMIT, TIMEOUT, STALLED)
+
+    # 执行已经结束的所有状态
+    TERMINAL_STATUSES = (COMPLETED, FAILED, STOPPED, CACHED) + ABNORMAL_STATUSES
+
+    # 表示程序自身出错的信号
+    CRASH_SIGNALS = {'SIGSEGV', 'SIGBUS', 'SIGILL', 'SIGFPE', 'SIGABRT', 'SIGSYS', 'SIGTRAP'}
+
+    # shell在子进程被信号终止时以128+信号值退出，脚本也可能自己以这些退出码退出，
+    # 只有执行器终止了进程或控制组记录了OOM时才按信号解析
+    SHELL_SIGNAL_OFFSET = 128
+
+    # 没有memory.events的计数时，峰值内存达到限制的该比例视为达到了内存限制
+    OOM_HEURISTIC_RATIO = 0.95
+
+    # 日志尾部出现这些内容时视为内存分配失败（setrlimit回退模式）
+    MEMORY_ERROR_MARKERS = ('MemoryError', 'Cannot allocate memory', 'std::bad_alloc', 'Out of memory')
+
+    @classmethod
+    def classify(cls,
+                 exit_code: Optional[int],
+                 termination_reason: Optional[str] = None,
+                 termination_detail: Optional[str] = None,
+                 oom_kills: int = 0,
+                 limit_ooms: Optional[int] = None,
+                 memory_limit: Optional[float] = None,
+                 peak_memory: Optional[float] = None,
+                 log_tail: str = '') -> Dict[str, Any]:
+        """判断执行的结束状态
+
+        Args:
+            exit_code: 进程退出码，被信号终止时为负的信号值
+            termination_reason: 执行器主动终止执行的原因（stopped、memory_limit、timeout或stalled）
+            termination_detail: 执行器终止执行时记录的说明，提供时作为exit_reason
+            oom_kills: 执行期间控制组memory.events中oom_kill的增量
+            limit_ooms: 执行期间控制组memory.events中oom的增量，即内存用量达到memory.max的OOM次数，
+                        为None时（内核不提供）按峰值内存是否接近内存限制判断
+            memory_limit: 任务配置的内存限制(MB)
+            peak_memory: 执行期间的峰值内存(MB)
+            log_tail: 日志尾部内容，用于识别内存分配失败
+
+        Returns:
+            Dict[str, Any]: 包含status、exit_reason和signal（信号名，未被信号终止时为None）
+        """
+        # 执行器终止了进程或控制组中有进程被OOM终止时，确定进程是被信号终止的
+        signal_confirmed = termination_reason in cls.TERMINATION_STATUSES or bool(oom_kills)
+        signal_name = cls.signal_name(exit_code, decode_shell_codes=signal_confirmed)
+
+        if termination_reason in cls.TERMINATION_STATUSES:
+            reasons = {
+                cls.STOPPED: "Stopped manually",
+                cls.MEMORY_LIMIT: f"Terminated after exceeding memory limit of {memory_limit}MB",
+                cls.TIMEOUT: "Terminated after exceeding the execution time limit",
+                cls.STALLED: "Terminated after producing no output while idle"
+            }
+            return cls._result(termination_reason, termination_detail or reasons[termination_reason], signal_name)
+
+        if exit_code == 0:
+            return cls._result(cls.COMPLETED, "Exited normally", None)
+
+        if oom_kills:
+            # 控制组自身的memory.max触发的OOM是超出任务内存限制，其余是系统整体内存不足
+            if limit_ooms is None:
+                at_limit = cls._near_limit(memory_limit, peak_memory)
+            else:
+                at_limit = limit_ooms > 0
+            if at_limit and memory_limit:
+                return cls._result(
+                    cls.MEMORY_LIMIT, f"Killed by the kernel after reaching the memory limit of {memory_limit}MB "
+                    f"({oom_kills} process(es) in the cgroup)", signal_name)
+            return cls._result(cls.OOM_KILLED,
+                               f"Killed by the kernel OOM killer ({oom_kills} process(es) in the cgroup)", signal_name)
+
+        if signal_name == 'SIGKILL' and cls._near_limit(memory_limit, peak_memory):
+            return cls._result(cls.OOM_KILLED,
+                               f"Killed by SIGKILL with peak memory {peak_memory:.2f}MB near the {memory_limit}MB limit",
+                               signal_name)
+
+        if signal_name in cls.CRASH_SIGNALS:
+            return cls._result(cls.CRASHED, f"Crashed with {signal_name}", signal_name)
+
+        if signal_name:
+            return cls._result(cls.KILLED, f"Killed by {signal_name}", signal_name)
+
+        if memory_limit and any(marker in log_tail for marker in cls.MEMORY_ERROR_MARKERS):
+            return cls._result(cls.MEMORY_LIMIT, f"Memory allocation failed under the {memory_limit}MB limit", None)
+
+        return cls._result(cls.FAILED, f"Exited with code {exit_code}", None)
+
+    @classmethod
+    def signal_name(cls, exit_code: Optional[int], decode_shell_codes: bool = False) -> Optional[str]:
+        """从退出码中解析终止进程的信号名，未被信号终止时返回None
+
+        Popen返回的负退出码总是表示信号；shell返回的128+N退出码与脚本自己的退出码无法区分，
+        只在decode_shell_codes为True（已确认进程被信号终止）时解析
+        """
+        if exit_code is None:
+            return None
+        if exit_code < 0:
+            signum = -exit_code
+        elif decode_shell_codes and exit_code > cls.SHELL_SIGNAL_OFFSET:
+            signum = exit_code - cls.SHELL_SIGNAL_OFFSET
+        else:
+            return None
+        try:
+            return signal.Signals(signum).name
+        except ValueError:
+            return None
+
+    @classmethod
+    def _near_limit(cls, memory_limit: Optional[float], peak_memory: Optional[float]) -> bool:
+        """峰值内存是否达到内存限制的OOM_HEURISTIC_RATIO"""
+        return bool(memory_limit and peak_memory and peak_memory >= memory_limit * cls.OOM_HEURISTIC_RATIO)
+
+    @staticmethod
+    def _result(status: str, reason: str, signal_name: Optional[str]) -> Dict[str, Any]:
+        return {'status': status, 'exit_reason': reason, 'signal': signal_name}
@@ -0,0 +1,58 @@
+import os
+import shlex
+
+
+class LaunchGate:
+    """让子进程在执行任务命令之前等待父进程完成设置
+
+    子进程（/bin/sh）先从作为标准输入的管道读取一行，父进程在启动后把它移入控制组、设置rlimit和调度参数等，
+    再写入管道放行，任务命令和它派生的所有进程都在设置完成之后才开始运行。
+    这些设置都在父进程中完成，不需要在fork之后、exec之前的preexec_fn中执行Python代码。
+    父进程没有放行就关闭管道时，子进程读到EOF后直接退出，不会执行任务命令
+    """
+
+    # 未放行时子进程的退出码
+    ABORT_EXIT_CODE = 126
+
+    def __init__(self):
+        self._read_fd, self._write_fd = os.pipe()
+
+    @property
+    def stdin(self) -> int:
+        """子进程的标准输入，供subprocess的stdin参数使用"""
+        return self._read_fd
+
+    def wrap(self, command: str) -> str:
+        """在shell命令之前加上从标准输入等待放行的步骤，放行后标准输入改为/dev/null再执行任务命令
+
+        任务命令通过exec在同一个进程中执行，任务进程被信号终止时父进程得到负的退出码，
+        不会与脚本自己的128+N退出码混淆
+        """
+        return f"read -r _ || exit {self.ABORT_EXIT_CODE}; exec </dev/null; exec /bin/sh -c {shlex.quote(command)}"
+
+    def spawned(self):
+        """子进程已启动，关闭父进程中的读端"""
+        self._close('_read_fd')
+
+    def release(self):
+        """放行子进程，开始执行任务命令"""
+        if self._write_fd is not None:
+            try:
+                os.write(self._write_fd, b"\n")
+            finally:
+                self._close('_write_fd')
+
+    def abort(self):
+        """不放行，关闭全部管道，已启动的子进程会直接退出"""
+        self._close('_read_fd')
+        self._close('_write_fd')
+
+    def _close(self, name: str):
+        fd = getattr(self, name)
+        if fd is not None:
+            setattr(self, name, None)
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
@@ -0,0 +1,165 @@
+import threading
+import logging
+from collections import deque
+from typing import Optional, Tuple
+
+
+class LogSubscription:
+    """一个日志订阅者（如一个SSE连接）的待发送队列
+
+    队列按字节数限制大小，订阅者读取过慢导致积压超过上限时，队列被清空并标记为溢出，
+    订阅者随后需要从自己已收到的偏移量重新订阅
+    """
+
+    # 事件类型
+    DATA = 'data'
+    END = 'end'
+    OVERFLOW = 'overflow'
+
+    def __init__(self, execution_id: str, offset: int, max_pending_bytes: int):
+        self.execution_id = execution_id
+        self.offset = offset  # 订阅者已收到的日志末尾的字节偏移量
+        self.max_pending_bytes = max_pending_bytes
+        self.condition = threading.Condition()
+        self._events = deque()
+        self._pending_bytes = 0
+        self._closed = False
+
+    def _push(self, chunk: bytes, end_offset: int) -> bool:
+        """加入一段日志，积压超过上限时标记溢出并返回False"""
+        with self.condition:
+            if self._closed:
+                return False
+            if self._pending_bytes + len(chunk) > self.max_pending_bytes:
+                self._events.clear()
+                self._pending_bytes = 0
+                self._events.append((self.OVERFLOW, None, None))
+                self._closed = True
+                self.condition.notify()
+                return False
+            self._events.append((self.DATA, chunk, end_offset))
+            self._pending_bytes += len(chunk)
+            self.condition.notify()
+            return True
+
+    def _end(self):
+        """执行结束，通知订阅者不会再有新的日志"""
+        with self.condition:
+            if not self._closed:
+                self._events.append((self.END, None, None))
+                self._closed = True
+                self.condition.notify()
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Tuple[str, Optional[bytes], Optional[int]]]:
+        """等待下一个事件
+
+        连续的日志片段会合并为一个事件返回，减少SSE消息数量
+
+        Args:
+            timeout: 最长等待秒数
+
+        Returns:
+            Optional[Tuple[str, Optional[bytes], Optional[int]]]: (事件类型, 日志内容, 日志末尾的偏移量)，
+                                                                 超时返回None
+        """
+        with self.condition:
+            if not self._events and not self.condition.wait_for(lambda: self._events, timeout):
+                return None
+
+            kind, chunk, end_offset = self._events.popleft()
+            if kind != self.DATA:
+                return kind, None, None
+
+            chunks = [chunk]
+            while self._events and self._events[0][0] == self.DATA:
+                _, chunk, end_offset = self._events.popleft()
+                chunks.append(chunk)
+            data = b''.join(chunks)
+            self._pending_bytes -= len(data)
+            self.offset = end_offset
+            return kind, data, end_offset
+
+
+class LogBroadcaster:
+    """将执行的新日志推送给所有订阅者
+
+    每个运行中的执行对应一个频道，日志写入时由写入方（每个执行唯一的输出读取线程）调用publish，
+    publish只把日志片段放入各订阅者的有界队列，不会因为某个订阅者读取缓慢而阻塞。
+    偏移量为综合日志UTF-8编码后的字节偏移量，SSE事件ID即为该偏移量，客户端重连时据此续传
+    """
+
+    # 单个订阅者最多积压的字节数
+    MAX_PENDING_BYTES = 4 * 1024 * 1024
+
+    def __init__(self, max_pending_bytes: Optional[int] = None):
+        self.logger = logging.getLogger("LogBroadcaster")
+        self.lock = threading.Lock()
+        self.max_pending_bytes = max_pending_bytes or self.MAX_PENDING_BYTES
+        self._channels = {}  # 执行ID -> {'offset': 当前日志字节数, 'subscribers': set}
+
+    def open(self, execution_id: str, offset: int = 0):
+        """执行开始运行时打开频道
+
+        Args:
+            execution_id: 执行ID
+            offset: 当前已有日志的字节数
+        """
+        with self.lock:
+            if execution_id not in self._channels:
+                self._channels[execution_id] = {'offset': offset, 'subscribers': set()}
+
+    def is_open(self, execution_id: str) -> bool:
+        with self.lock:
+            return execution_id in self._channels
+
+    def publish(self, execution_id: str, text: str):
+        """发布追加的日志
+
+        Args:
+            execution_id: 执行ID
+            text: 追加的日志内容
+        """
+        chunk = text.encode('utf-8')
+        if not chunk:
+            return
+        with self.lock:
+            channel = self._channels.get(execution_id)
+            if channel is None:
+                return
+            channel['offset'] += len(chunk)
+            end_offset = channel['offset']
+            subscribers = list(channel['subscribers'])
+
+        for subscription in subscribers:
+            if not subscription._push(chunk, end_offset):
+                self.unsubscribe(subscription)
+                self.logger.debug(f"执行 {execution_id} 的日志订阅者积压过多，已断开")
+
+    def close(self, execution_id: str):
+        """执行结束时关闭频道，通知所有订阅者"""
+        with self.lock:
+            channel = self._channels.pop(execution_id, None)
+        if channel:
+            for subscription in channel['subscribers']:
+                subscription._end()
+
+    def subscribe(self, execution_id: str) -> Optional[LogSubscription]:
+        """订阅执行的新日志，执行没有运行时返回None
+
+        调用方需保证订阅时刻与读取已有日志之间没有新的日志发布（TaskHistory在持有记录锁时调用），
+        订阅者从频道当前的偏移量开始接收
+        """
+        with self.lock:
+            channel = self._channels.get(execution_id)
+            if channel is None:
+                return None
+            subscription = LogSubscription(execution_id, channel['offset'], self.max_pending_bytes)
+            channel['subscribers'].add(subscription)
+            return subscription
+
+    def unsubscribe(self, subscription: LogSubscription):
+        """取消订阅（SSE连接断开时调用）"""
+        with self.lock:
+            channel = self._channels.get(subscription.execution_id)
+            if channel:
+                channel['subscribers'].discard(subscription)
@@ -0,0 +1,177 @@
+import os
+from collections import deque
+from typing import Dict, Any, Optional
+
+
+class LogFilter:
+    """在写入日志之前压缩任务输出
+
+    - 回车覆盖：进度条（如tqdm）用\\r反复改写同一行，每行只保留最后的状态
+    - 重复行：连续相同的行只保留第一行，之后写入一行重复次数
+    - 大小上限：日志超过上限时保留开头和结尾，中间丢弃的字节数写入日志和执行记录
+
+    达到上限后，后续输出只保留在内存中最近的一段（结尾部分），执行结束时与丢弃说明一起写入，
+    因此运行期间占用的内存有界
+    """
+
+    MAX_BYTES_ENV = "FIDLTER_LOG_MAX_BYTES"
+    DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+    # 上限中留给结尾部分的比例
+    TAIL_RATIO = 0.25
+
+    # 一行最多缓存的字节数，超过时强制换行，避免没有换行符的输出占用过多内存
+    MAX_LINE_BYTES = 64 * 1024
+
+    def __init__(self, max_bytes: Optional[int] = None):
+        """初始化日志过滤器
+
+        Args:
+            max_bytes: 单次执行日志的字节数上限，默认读取FIDLTER_LOG_MAX_BYTES环境变量，0表示不限制
+        """
+        if max_bytes is None:
+            max_bytes = int(os.environ.get(self.MAX_BYTES_ENV, self.DEFAULT_MAX_BYTES))
+        self.max_bytes = max_bytes
+        self.tail_bytes = int(max_bytes * self.TAIL_RATIO)
+        self.head_bytes = max_bytes - self.tail_bytes
+
+        self._previous_segment = b''  # 当前行中最后一个被\r覆盖的非空片段
+        self._current_segment = bytearray()  # 当前行最后一个\r之后的内容
+        self._last_line = None
+        self._repeats = 0
+
+        self._written_bytes = 0
+        self._tail = deque()  # 达到上限后保留的结尾部分
+        self._tail_size = 0
+        self._truncated = False
+
+        self.stats = {
+            'input_bytes': 0,  # 任务输出的原始字节数
+            'written_bytes': 0,  # 写入日志的字节数
+            'collapsed_segments': 0,  # 被\r覆盖而丢弃的片段数
+            'repeated_lines': 0,  # 合并的重复行数
+            'dropped_bytes': 0,  # 超出大小上限被丢弃的字节数
+            'dropped_lines': 0
+        }
+
+    def feed(self, data: bytes) -> str:
+        """处理一段任务输出
+
+        Args:
+            data: 从管道读取的原始输出
+
+        Returns:
+            str: 需要立即写入日志的内容，可能为空字符串
+        """
+        self.stats['input_bytes'] += len(data)
+        output = []
+        start = 0
+        while True:
+            newline = data.find(b'\n', start)
+            if newline < 0:
+                self._add_segment_bytes(data[start:], output)
+                break
+            self._add_segment_bytes(data[start:newline], output)
+            self._end_line(output)
+            start = newline + 1
+        return ''.join(output)
+
+    def flush(self) -> str:
+        """输出结束时调用，返回剩余需要写入的内容：未换行的最后一行、重复次数和保留的结尾部分"""
+        output = []
+        if self._current_segment or self._previous_segment:
+            line = self._take_line()
+            if line == self._last_line:
+                self._repeats += 1
+                self.stats['repeated_lines'] += 1
+            else:
+                self._emit_repeats(output)
+                self._emit(line.decode('utf-8', errors='replace'), output)
+        self._emit_repeats(output)
+
+        if self._truncated:
+            marker = (f"\n[... {self.stats['dropped_bytes']} bytes ({self.stats['dropped_lines']} lines) of output "
+                      f"dropped, log size limit is {self.max_bytes} bytes ...]\n")
+            output.append(marker)
+            output.extend(self._tail)
+            self.stats['written_bytes'] += len(marker) + self._tail_size
+            self._tail.clear()
+            self._tail_size = 0
+        return ''.join(output)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取压缩统计，写入执行记录的log_stats字段"""
+        return {**self.stats, 'truncated': self._truncated, 'max_bytes': self.max_bytes or None}
+
+    def _add_segment_bytes(self, data: bytes, output):
+        """把一行中的一段（不含\\n）加入当前行，遇到\\r时丢弃之前的内容"""
+        start = 0
+        while True:
+            carriage_return = data.find(b'\r', start)
+            if carriage_return < 0:
+                self._current_segment += data[start:]
+                break
+            self._current_segment += data[start:carriage_return]
+            if self._current_segment:
+                if self._previous_segment:
+                    self.stats['collapsed_segments'] += 1
+                self._previous_segment = bytes(self._current_segment)
+                self._current_segment = bytearray()
+            start = carriage_return + 1
+
+        # 超长的行强制换行
+        if len(self._current_segment) >= self.MAX_LINE_BYTES:
+            self._end_line(output)
+
+    def _take_line(self) -> bytes:
+        """取出当前行的最终状态：最后一个\\r之后有内容时取该内容，否则取最后被覆盖的片段"""
+        if self._current_segment:
+            if self._previous_segment:
+                self.stats['collapsed_segments'] += 1
+            line = bytes(self._current_segment)
+        else:
+            line = self._previous_segment
+        self._previous_segment = b''
+        self._current_segment = bytearray()
+        return line
+
+    def _end_line(self, output):
+        line = self._take_line()
+        if line == self._last_line:
+            self._repeats += 1
+            self.stats['repeated_lines'] += 1
+            return
+        self._emit_repeats(output)
+        self._last_line = line
+        self._emit(line.decode('utf-8', errors='replace') + '\n', output)
+
+    def _emit_repeats(self, output):
+        if self._repeats:
+            self._emit(f"[previous line repeated {self._repeats} more times]\n", output)
+            self._repeats = 0
+
+    def _emit(self, text: str, output):
+        """写入一行，超过大小上限后改为保留在结尾缓冲区中"""
+        size = len(text.encode('utf-8'))
+        if not self.max_bytes or self._written_bytes + size <= self.head_bytes:
+            self._written_bytes += size
+            self.stats['written_bytes'] += size
+            output.append(text)
+            return
+
+        if not self._truncated:
+            self._truncated = True
+            notice = (f"[log size limit reached, only the last {self.tail_bytes} bytes of the remaining output "
+                      f"will be kept and written when the execution ends]\n")
+            self._written_bytes += len(notice)
+            self.stats['written_bytes'] += len(notice)
+            output.append(notice)
+
+        self._tail.append(text)
+        self._tail_size += size
+        while self._tail_size > self.tail_bytes and self._tail:
+            dropped = self._tail.popleft()
+            dropped_size = len(dropped.encode('utf-8'))
+            self._tail_size -= dropped_size
+            self.stats['dropped_bytes'] += dropped_size
+            self.stats['dropped_lines'] += 1
@@ -0,0 +1,271 @@
+import os
+import queue
+import sqlite3
+import logging
+import threading
+from typing import Dict, Any, List, Optional, Iterable, Tuple
+
+
+class LogSearchIndex:
+    """执行日志的全文索引，基于SQLite FTS5的trigram分词，支持任意子串搜索
+
+    执行结束后由后台线程把日志逐行写入索引，每行保存行号和在日志文件中的字节偏移量，
+    搜索结果可以直接定位到日志接口的对应区间。执行记录被清理时同步删除其索引
+    """
+
+    # 单次执行最多索引的日志字节数，超出部分不进入索引
+    MAX_INDEXED_BYTES_ENV = "FIDLTER_LOG_INDEX_MAX_BYTES"
+    DEFAULT_MAX_INDEXED_BYTES = 64 * 1024 * 1024
+
+    # 索引时每次读取的日志块大小
+    READ_CHUNK_SIZE = 1024 * 1024
+
+    # trigram分词只能匹配至少3个字符的查询
+    MIN_QUERY_LENGTH = 3
+
+    # 超过该长度的行只索引前面的部分
+    MAX_LINE_LENGTH = 4096
+
+    def __init__(self, db_path: str, log_store, max_indexed_bytes: Optional[int] = None):
+        """初始化日志索引
+
+        Args:
+            db_path: SQLite数据库文件路径
+            log_store: 读取日志文件的LogStore
+            max_indexed_bytes: 单次执行最多索引的字节数
+        """
+        self.logger = logging.getLogger("LogSearchIndex")
+        self.db_path = db_path
+        self.log_store = log_store
+        self.max_indexed_bytes = max_indexed_bytes or \
+            int(os.environ.get(self.MAX_INDEXED_BYTES_ENV, self.DEFAULT_MAX_INDEXED_BYTES))
+
+        self._queue = queue.Queue()
+        self._init_schema()
+
+        self._worker = threading.Thread(target=self._run, name="LogSearchIndex", daemon=True)
+        self._worker.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.db_path, timeout=30)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    def _init_schema(self):
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        with self._connect() as connection:
+            connection.executescript("""
+                CREATE TABLE IF NOT EXISTS executions (
+                    execution_id TEXT PRIMARY KEY,
+                    task_id TEXT NOT NULL,
+                    status TEXT,
+                    start_time TEXT,
+                    indexed_bytes INTEGER NOT NULL DEFAULT 0,
+                    line_count INTEGER NOT NULL DEFAULT 0
+                );
+                CREATE INDEX IF NOT EXISTS executions_start_time ON executions (start_time);
+                -- 每次写入的行在FTS表中占用一段连续的rowid，删除时按区间删除，无需扫描整个索引
+                CREATE TABLE IF NOT EXISTS segments (
+                    execution_id TEXT NOT NULL,
+                    first_rowid INTEGER NOT NULL,
+                    last_rowid INTEGER NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS segments_execution ON segments (execution_id);
+                CREATE VIRTUAL TABLE IF NOT EXISTS log_lines USING fts5(
+                    content,
+                    execution_id UNINDEXED,
+                    line_no UNINDEXED,
+                    byte_offset UNINDEXED,
+                    tokenize='trigram'
+                );
+            """)
+
+    def index_execution(self, task_id, execution_id: str, status: Optional[str], start_time: Optional[str]):
+        """将执行加入索引队列，由后台线程从上次索引的位置继续索引其日志"""
+        self._queue.put(('index', (task_id, execution_id, status, start_time)))
+
+    def remove_executions(self, execution_ids: Iterable[str]):
+        """从索引中删除执行（执行记录被清理时调用）"""
+        execution_ids = list(execution_ids)
+        if execution_ids:
+            self._queue.put(('remove', execution_ids))
+
+    def sync(self, executions: List[Tuple[Any, str, Optional[str], Optional[str]]]):
+        """根据当前的执行记录补全索引
+
+        索引尚未包含的已结束执行加入索引队列。不在列表中的执行不会被删除，
+        索引可能由多个历史记录实例共享，只有remove_executions才会删除执行的索引
+
+        Args:
+            executions: 已结束执行的 (task_id, execution_id, status, start_time) 列表
+        """
+        self._queue.put(('sync', executions))
+
+    def get_size(self) -> int:
+        """获取索引数据库（包括WAL文件）占用的字节数"""
+        size = 0
+        for suffix in ('', '-wal', '-shm'):
+            try:
+                size += os.path.getsize(self.db_path + suffix)
+            except OSError:
+                pass
+        return size
+
+    def shutdown(self):
+        """停止后台线程"""
+        self._queue.put(('stop', None))
+        self._worker.join(timeout=5)
+
+    def _run(self):
+        connection = self._connect()
+        try:
+            while True:
+                operation, payload = self._queue.get()
+                if operation == 'stop':
+                    return
+                try:
+                    if operation == 'index':
+                        self._index(connection, *payload)
+                    elif operation == 'remove':
+                        self._remove(connection, payload)
+                    elif operation == 'sync':
+                        self._sync(connection, payload)
+                except Exception as e:
+                    self.logger.error(f"日志索引操作 {operation} 失败: {str(e)}")
+        finally:
+            connection.close()
+
+    def _index(self, connection, task_id, execution_id, status, start_time):
+        """从上次索引的位置开始，把执行日志的新增行写入索引"""
+        row = connection.execute("SELECT indexed_bytes, line_count FROM executions WHERE execution_id = ?",
+                                 (execution_id, )).fetchone()
+        indexed_bytes, line_count = row if row else (0, 0)
+
+        size = min(self.log_store.get_size(task_id, execution_id), self.max_indexed_bytes)
+        with connection:
+            connection.execute(
+                """INSERT INTO executions (execution_id, task_id, status, start_time) VALUES (?, ?, ?, ?)
+                   ON CONFLICT(execution_id) DO UPDATE SET status = excluded.status""",
+                (execution_id, str(task_id), status, start_time))
+
+        # 只打开一次读取流，压缩的日志也只需解压一遍；块在换行处分割，不完整的行留到下一块
+        position = indexed_bytes
+        for data in self.log_store.iter_bytes(task_id, execution_id, position, size, self.READ_CHUNK_SIZE):
+            rows = []
+            offset = position
+            for line in data.split(b'\n'):
+                if offset - position >= len(data):
+                    break
+                content = line.rstrip(b'\r')[:self.MAX_LINE_LENGTH].decode('utf-8', errors='replace')
+                if content.strip():
+                    rows.append((content, execution_id, line_count, offset))
+                line_count += 1
+                offset += len(line) + 1
+            position += len(data)
+
+            with connection:
+                if rows:
+                    first_rowid = self._next_rowid(connection)
+                    connection.executemany(
+                        "INSERT INTO log_lines (rowid, content, execution_id, line_no, byte_offset) "
+                        "VALUES (?, ?, ?, ?, ?)", [(first_rowid + i, *row) for i, row in enumerate(rows)])
+                    connection.execute("INSERT INTO segments VALUES (?, ?, ?)",
+                                       (execution_id, first_rowid, first_rowid + len(rows) - 1))
+                connection.execute("UPDATE executions SET indexed_bytes = ?, line_count = ? WHERE execution_id = ?",
+                                   (position, line_count, execution_id))
+
+    @staticmethod
+    def _next_rowid(connection) -> int:
+        row = connection.execute("SELECT rowid FROM log_lines ORDER BY rowid DESC LIMIT 1").fetchone()
+        return (row[0] if row else 0) + 1
+
+    def _remove(self, connection, execution_ids):
+        with connection:
+            for execution_id in execution_ids:
+                segments = connection.execute("SELECT first_rowid, last_rowid FROM segments WHERE execution_id = ?",
+                                              (execution_id, )).fetchall()
+                for first_rowid, last_rowid in segments:
+                    connection.execute("DELETE FROM log_lines WHERE rowid BETWEEN ? AND ?", (first_rowid, last_rowid))
+                connection.execute("DELETE FROM segments WHERE execution_id = ?", (execution_id, ))
+                connection.execute("DELETE FROM executions WHERE execution_id = ?", (execution_id, ))
+
+    def _sync(self, connection, executions):
+        indexed = {row[0] for row in connection.execute("SELECT execution_id FROM executions")}
+        missing = [execution for execution in executions if execution[1] not in indexed]
+        for execution in missing:
+            self._index(connection, *execution)
+        if missing:
+            self.logger.info(f"补充索引了 {len(missing)} 个执行的日志")
+
+    def search(self,
+               query: str,
+               task_id=None,
+               since: Optional[str] = None,
+               statuses: Optional[List[str]] = None,
+               limit: int = 50,
+               max_matches: int = 5) -> List[Dict[str, Any]]:
+        """搜索日志
+
+        Args:
+            query: 要搜索的文本，按子串匹配，不区分大小写
+            task_id: 只搜索该任务的执行
+            since: 只搜索在该时间（YYYY-MM-DD或YYYY-MM-DD HH:MM:SS）之后开始的执行
+            statuses: 只搜索这些状态的执行
+            limit: 最多返回的执行数
+            max_matches: 每个执行最多返回的匹配行数
+
+        Returns:
+            List[Dict[str, Any]]: 按开始时间降序排列的执行，包含匹配行数和匹配行的行号、字节偏移量和片段
+
+        Raises:
+            ValueError: 查询少于3个字符
+        """
+        if len(query.strip()) < self.MIN_QUERY_LENGTH:
+            raise ValueError(f"query must be at least {self.MIN_QUERY_LENGTH} characters")
+
+        # 作为短语查询，避免FTS5把用户输入解析为查询语法
+        match = '"' + query.replace('"', '""') + '"'
+        conditions = ["log_lines MATCH ?"]
+        params = [match]
+        if task_id is not None:
+            conditions.append("e.task_id = ?")
+            params.append(str(task_id))
+        if since:
+            conditions.append("e.start_time >= ?")
+            params.append(since)
+        if statuses:
+            conditions.append(f"e.status IN ({', '.join('?' for _ in statuses)})")
+            params.extend(statuses)
+
+        connection = self._connect()
+        try:
+            executions = connection.execute(
+                f"""SELECT e.execution_id, e.task_id, e.status, e.start_time, count(*)
+                    FROM log_lines JOIN executions e ON e.execution_id = log_lines.execution_id
+                    WHERE {' AND '.join(conditions)}
+                    GROUP BY e.execution_id
+                    ORDER BY e.start_time DESC
+                    LIMIT ?""", (*params, limit)).fetchall()
+
+            results = []
+            for execution_id, execution_task_id, status, start_time, match_count in executions:
+                matches = connection.execute(
+                    """SELECT line_no, byte_offset, snippet(log_lines, 0, '[', ']', '...', 24)
+                       FROM log_lines WHERE log_lines MATCH ? AND execution_id = ?
+                       ORDER BY rowid LIMIT ?""", (match, execution_id, max_matches)).fetchall()
+                results.append({
+                    'execution_id': execution_id,
+                    'task_id': int(execution_task_id) if execution_task_id.isdigit() else execution_task_id,
+                    'status': status,
+                    'start_time': start_time,
+                    'match_count': match_count,
+                    'matches': [{
+                        'line': line_no,
+                        'offset': byte_offset,
+                        'snippet': snippet
+                    } for line_no, byte_offset, snippet in matches]
+                })
+            return results
+        finally:
+            connection.close()
@@ -0,0 +1,711 @@
+import os
+import gzip
+import mmap
+import time
+import queue
+import bisect
+import shutil
+import struct
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any, Optional, Iterator, Tuple, List
+
+try:
+    import zstandard
+    HAS_ZSTD = True
+except ImportError:
+    HAS_ZSTD = False
+
+
+class LogStore:
+    """以文件保存执行日志，每次执行一个只追加写入的日志文件
+
+    日志不再保存在执行记录中，执行记录的持久化不会随日志增长而变慢。
+    读取时按字节偏移量或行号定位，只读取需要的部分：顺序区间分块读取，
+    按行定位和从末尾向前查找使用mmap，不会把整个日志读入内存
+
+    执行结束后日志不再增长，由后台线程压缩为 <execution_id>.log.zst（安装了zstandard时）或 .log.gz。
+    读取压缩日志时流式解压，只在内存中保留需要返回的部分，偏移量和行号仍以解压后的内容计算
+
+    追加日志时在旁边的 <execution_id>.ts 中记录写入时刻（相对执行开始的单调时钟）和对应的字节偏移量，
+    日志内容本身不加时间戳，可按时间区间读取日志，或查询一段日志的写入时间
+    """
+
+    LOG_SUFFIX = ".log"
+
+    # 时间索引：每条记录为 (相对执行开始的毫秒数, 该时刻写入的日志块的起始字节偏移量)
+    TIME_INDEX_SUFFIX = ".ts"
+    TIME_ENTRY = struct.Struct('<IQ')
+    # 两条时间记录之间的最小间隔（毫秒），间隔内写入的日志块共用前一条记录
+    TIME_RESOLUTION_MS = 100
+
+    # 压缩算法 -> 压缩文件后缀
+    COMPRESSED_SUFFIXES = {'zstd': '.zst', 'gzip': '.gz'}
+
+    # 压缩算法：auto（有zstandard时使用zstd，否则gzip）、zstd、gzip或off
+    COMPRESSION_ENV = "FIDLTER_LOG_COMPRESSION"
+
+    # 执行结束后等待多少秒再压缩，期间全文索引和刚结束时的日志查看直接读取未压缩的文件
+    COMPRESS_DELAY = 30
+
+    ZSTD_LEVEL = 3
+    ZSTD_FRAME_HEADER_MAX_SIZE = 18
+    GZIP_LEVEL = 6
+
+    # gzip只在文件末尾记录原始大小对2^32取模的值，超过该大小的日志不使用gzip压缩
+    GZIP_MAX_SIZE = 2**32 - 1
+
+    # 统计换行符时每次读取的块大小
+    SCAN_CHUNK_SIZE = 1024 * 1024
+
+    def __init__(self, root: str):
+        """初始化日志存储
+
+        Args:
+            root: 日志根目录，日志文件位于 <root>/<task_id>/<execution_id>.log
+        """
+        self.logger = logging.getLogger("LogStore")
+        self.root = root
+        self.lock = threading.Lock()
+        self._fds = {}  # 执行ID -> 运行期间保持打开的文件描述符
+        self._timelines = {}  # 执行ID -> {'fd': 时间索引的文件描述符, 'start': 开始时刻, 'last_ms': 最后一条记录的毫秒数}
+        os.makedirs(self.root, exist_ok=True)
+
+        self.compression = self._select_compression()
+        self._compress_queue = queue.Queue()
+        self._compressor = None
+
+    def _select_compression(self) -> Optional[str]:
+        setting = os.environ.get(self.COMPRESSION_ENV, 'auto').lower()
+        if setting in ('off', 'none', 'false', '0'):
+            return None
+        if setting == 'gzip':
+            return 'gzip'
+        if setting == 'zstd' and not HAS_ZSTD:
+            self.logger.warning("未安装zstandard，日志改用gzip压缩")
+        return 'zstd' if HAS_ZSTD else 'gzip'
+
+    def get_path(self, task_id, execution_id: str) -> str:
+        """获取执行日志文件（未压缩）的路径"""
+        return os.path.join(self.root, str(task_id), f"{execution_id}{self.LOG_SUFFIX}")
+
+    def _get_variants(self, task_id, execution_id: str) -> List[Tuple[str, Optional[str]]]:
+        """日志文件可能的 (路径, 压缩算法)，按读取时的查找顺序排列
+
+        压缩时先写入压缩文件再删除原文件，按该顺序查找总能找到其中一个
+        """
+        path = self.get_path(task_id, execution_id)
+        return [(path, None)] + [(path + suffix, codec) for codec, suffix in self.COMPRESSED_SUFFIXES.items()]
+
+    def get_compression(self, task_id, execution_id: str) -> Optional[str]:
+        """获取日志的压缩算法，未压缩或日志不存在时返回None"""
+        for path, codec in self._get_variants(task_id, execution_id):
+            if os.path.exists(path):
+                return codec
+        return None
+
+    def get_time_index_path(self, task_id, execution_id: str) -> str:
+        """获取执行日志时间索引文件的路径"""
+        return os.path.join(self.root, str(task_id), f"{execution_id}{self.TIME_INDEX_SUFFIX}")
+
+    def start_timeline(self, task_id, execution_id: str):
+        """执行开始时调用，之后写入的日志以此刻为起点记录时间"""
+        with self.lock:
+            self._get_timeline(task_id, execution_id)
+
+    def _get_timeline(self, task_id, execution_id: str) -> Dict[str, Any]:
+        """获取执行的时间索引写入状态，调用方需持有锁
+
+        时间索引已存在时（如服务重启后继续追加），从最后一条记录的时间继续计时
+        """
+        timeline = self._timelines.get(execution_id)
+        if timeline is None:
+            path = self.get_time_index_path(task_id, execution_id)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd = os.open(path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+            size = os.fstat(fd).st_size
+            last_ms = None
+            if size >= self.TIME_ENTRY.size:
+                last_ms, _ = self.TIME_ENTRY.unpack(
+                    os.pread(fd, self.TIME_ENTRY.size, size - size % self.TIME_ENTRY.size - self.TIME_ENTRY.size))
+            start = time.monotonic() - (last_ms or 0) / 1000
+            timeline = {'fd': fd, 'start': start, 'last_ms': last_ms}
+            self._timelines[execution_id] = timeline
+        return timeline
+
+    def _record_time(self, task_id, execution_id: str, offset: int):
+        """记录从offset开始的日志块的写入时间，距上一条记录不足TIME_RESOLUTION_MS时不记录，调用方需持有锁"""
+        timeline = self._get_timeline(task_id, execution_id)
+        elapsed_ms = min(int((time.monotonic() - timeline['start']) * 1000), 2**32 - 1)
+        if timeline['last_ms'] is not None and elapsed_ms - timeline['last_ms'] < self.TIME_RESOLUTION_MS:
+            return
+        os.write(timeline['fd'], self.TIME_ENTRY.pack(elapsed_ms, offset))
+        timeline['last_ms'] = elapsed_ms
+
+    def append(self, task_id, execution_id: str, text: str, record_time: bool = True) -> int:
+        """向执行日志追加内容
+
+        运行中的执行保持文件打开，直接写入文件描述符，写入后立即对读取方可见
+
+        Args:
+            task_id: 任务ID
+            execution_id: 执行ID
+            text: 追加的日志内容
+            record_time: 是否在时间索引中记录写入时间，迁移旧日志时为False
+
+        Returns:
+            int: 追加后日志的字节数
+        """
+        data = text.encode('utf-8')
+        with self.lock:
+            fd = self._fds.get(execution_id)
+            if fd is None:
+                path = self.get_path(task_id, execution_id)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                # 已结束的执行再次追加日志时，先把压缩的日志还原
+                if not os.path.exists(path):
+                    self._decompress_to_plain(task_id, execution_id)
+                fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+                self._fds[execution_id] = fd
+            view = memoryview(data)
+            while view:
+                written = os.write(fd, view)
+                view = view[written:]
+            size = os.fstat(fd).st_size
+            if record_time and data:
+                self._record_time(task_id, execution_id, size - len(data))
+            return size
+
+    def close(self, execution_id: str):
+        """执行结束时关闭日志文件和时间索引，之后的追加会重新打开文件"""
+        with self.lock:
+            fd = self._fds.pop(execution_id, None)
+            timeline = self._timelines.pop(execution_id, None)
+        if fd is not None:
+            os.close(fd)
+        if timeline is not None:
+            os.close(timeline['fd'])
+
+    def _read_time_index(self, task_id, execution_id: str) -> Optional[Tuple[List[int], List[int]]]:
+        """读取时间索引，返回 (毫秒数列表, 偏移量列表)，没有时间索引时返回None"""
+        try:
+            with open(self.get_time_index_path(task_id, execution_id), 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        data = data[:len(data) - len(data) % self.TIME_ENTRY.size]
+        if not data:
+            return None
+        entries = list(self.TIME_ENTRY.iter_unpack(data))
+        return [entry[0] for entry in entries], [entry[1] for entry in entries]
+
+    @staticmethod
+    def _offset_at_time(times_ms: List[int], offsets: List[int], seconds: float, total: int) -> int:
+        """返回在seconds时刻及之后写入的第一个日志块的起始偏移量，之后没有写入时返回total"""
+        index = bisect.bisect_left(times_ms, seconds * 1000)
+        return min(offsets[index], total) if index < len(offsets) else total
+
+    @staticmethod
+    def _time_at_offset(times_ms: List[int], offsets: List[int], offset: int) -> Optional[float]:
+        """返回包含offset处字节的日志块的写入时间（秒），早于第一条记录时返回None"""
+        index = bisect.bisect_right(offsets, offset) - 1
+        return times_ms[index] / 1000 if index >= 0 else None
+
+    def get_size(self, task_id, execution_id: str) -> int:
+        """获取日志（解压后）的字节数，日志文件不存在时返回0"""
+        for path, codec in self._get_variants(task_id, execution_id):
+            try:
+                if codec is None:
+                    return os.path.getsize(path)
+                return self._get_original_size(path, codec)
+            except OSError:
+                continue
+        return 0
+
+    @staticmethod
+    def _get_original_size(path: str, codec: str) -> int:
+        """读取压缩文件中记录的原始大小：zstd帧头中的内容大小，gzip文件末尾的ISIZE"""
+        with open(path, 'rb') as f:
+            if codec == 'zstd':
+                if not HAS_ZSTD:
+                    raise RuntimeError(f"zstandard is required to read compressed log {path}")
+                return zstandard.frame_content_size(f.read(LogStore.ZSTD_FRAME_HEADER_MAX_SIZE))
+            f.seek(-4, os.SEEK_END)
+            return int.from_bytes(f.read(4), 'little')
+
+    def get_disk_usage(self, task_id, execution_id: str) -> int:
+        """获取日志文件（压缩后）和时间索引实际占用的字节数"""
+        usage = 0
+        paths = [path for path, _ in self._get_variants(task_id, execution_id)]
+        for path in paths + [self.get_time_index_path(task_id, execution_id)]:
+            try:
+                usage += os.path.getsize(path)
+            except OSError:
+                pass
+        return usage
+
+    def exists(self, task_id, execution_id: str) -> bool:
+        return any(os.path.exists(path) for path, _ in self._get_variants(task_id, execution_id))
+
+    @contextmanager
+    def _open_stream(self, task_id, execution_id: str, start: int = 0):
+        """打开日志的读取流并定位到start，压缩日志返回流式解压的读取流，日志不存在时返回None"""
+        for path, codec in self._get_variants(task_id, execution_id):
+            try:
+                f = open(path, 'rb')
+            except FileNotFoundError:
+                continue
+            break
+        else:
+            yield None
+            return
+
+        try:
+            if codec == 'zstd':
+                if not HAS_ZSTD:
+                    raise RuntimeError(f"zstandard is required to read compressed log {path}")
+                stream = zstandard.ZstdDecompressor().stream_reader(f, closefd=False)
+            elif codec == 'gzip':
+                stream = gzip.GzipFile(fileobj=f, mode='rb')
+            else:
+                stream = f
+            try:
+                if start:
+                    # 压缩流只支持向后定位，通过解压并丢弃前面的内容实现
+                    stream.seek(start)
+                yield stream
+            finally:
+                if stream is not f:
+                    stream.close()
+        finally:
+            f.close()
+
+    def read_bytes(self, task_id, execution_id: str, start: int = 0, end: Optional[int] = None) -> bytes:
+        """读取[start, end)区间的日志内容，end为None时读到文件末尾"""
+        with self._open_stream(task_id, execution_id, start) as stream:
+            if stream is None:
+                return b''
+            chunks = []
+            position = start
+            while end is None or position < end:
+                size = self.SCAN_CHUNK_SIZE if end is None else min(end - position, self.SCAN_CHUNK_SIZE)
+                chunk = stream.read(size)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+                position += len(chunk)
+            return b''.join(chunks)
+
+    def read_text(self, task_id, execution_id: str, start: int = 0, end: Optional[int] = None) -> str:
+        """读取[start, end)区间的日志内容并解码"""
+        return self.read_bytes(task_id, execution_id, start, end).decode('utf-8', errors='replace')
+
+    def iter_bytes(self, task_id, execution_id: str, start: int, end: int, chunk_size: int) -> Iterator[bytes]:
+        """分块读取[start, end)区间的日志，块尽量在换行处分割（最后一块除外），只打开一次读取流"""
+        with self._open_stream(task_id, execution_id, start) as stream:
+            if stream is None:
+                return
+            position = start
+            carry = b''  # 上一块最后一个换行符之后的内容
+            while position < end:
+                want = min(chunk_size - len(carry), end - position - len(carry))
+                new = stream.read(want) if want > 0 else b''
+                data = carry + new
+                if not data:
+                    break
+                carry = b''
+                if new and position + len(data) < end:
+                    newline = data.rfind(b'\n')
+                    if newline >= 0:
+                        data, carry = data[:newline + 1], data[newline + 1:]
+                position += len(data)
+                yield data
+
+    def iter_chunks(self, task_id, execution_id: str, start: int, end: int,
+                    chunk_size: int) -> Iterator[Tuple[str, int]]:
+        """分块读取[start, end)区间的日志，块尽量在换行处分割，避免截断多字节字符
+
+        Yields:
+            Tuple[str, int]: (日志内容, 该块末尾的字节偏移量)
+        """
+        position = start
+        for data in self.iter_bytes(task_id, execution_id, start, end, chunk_size):
+            position += len(data)
+            yield data.decode('utf-8', errors='replace'), position
+
+    def read_range(self,
+                   task_id,
+                   execution_id: str,
+                   offset: Optional[int] = None,
+                   limit: Optional[int] = None,
+                   unit: str = 'bytes',
+                   tail: Optional[int] = None,
+                   before: Optional[int] = None,
+                   start_seconds: Optional[float] = None,
+                   end_seconds: Optional[float] = None) -> Dict[str, Any]:
+        """按偏移量、末尾行数、向前翻页或时间区间读取日志的一部分
+
+        四种方式按优先级：
+        - tail: 读取最后tail行
+        - before: 读取before偏移量之前的limit字节或limit行，用于向前翻页
+        - start_seconds/end_seconds: 读取在该时间区间（相对执行开始的秒数）内写入的日志，
+          提供limit时只返回区间开头的limit字节或limit行
+        - offset: 从offset（字节偏移量或行号）开始读取limit字节或limit行
+
+        字节方式读取的区间会对齐到行边界（只有一行超过limit时除外），避免截断行和多字节字符
+
+        Args:
+            task_id: 任务ID
+            execution_id: 执行ID
+            offset: 起始位置，unit为lines时为行号（从0开始）
+            limit: 最多读取的字节数或行数，为None时读到末尾
+            unit: 'bytes'或'lines'
+            tail: 末尾行数
+            before: 向前翻页的结束字节偏移量
+            start_seconds: 时间区间的开始
+            end_seconds: 时间区间的结束
+
+        Returns:
+            Dict[str, Any]: 包含logs、start、end（本次内容在日志中的字节区间）、total_size，
+                            以及time_start、time_end（本次内容的写入时间，没有时间索引时为None）
+
+        Raises:
+            ValueError: 按时间区间读取，但该执行没有时间索引
+        """
+        total = self.get_size(task_id, execution_id)
+        time_index = self._read_time_index(task_id, execution_id)
+
+        if tail is None and before is None and (start_seconds is not None or end_seconds is not None):
+            if time_index is None:
+                raise ValueError("log timestamps are not available for this execution")
+            result = self._read_time_range(task_id, execution_id, total, time_index, start_seconds, end_seconds,
+                                           limit, unit)
+        elif total == 0:
+            result = {'logs': '', 'start': 0, 'end': 0, 'total_size': 0}
+        else:
+            result = None
+            if self.get_compression(task_id, execution_id) is None:
+                try:
+                    result = self._read_range_mmap(task_id, execution_id, total, offset, limit, unit, tail, before)
+                except FileNotFoundError:
+                    pass  # 日志刚被压缩
+            if result is None:
+                result = self._read_range_stream(task_id, execution_id, total, offset, limit, unit, tail, before)
+
+        result['time_start'] = result['time_end'] = None
+        if time_index is not None and result['end'] > result['start']:
+            result['time_start'] = self._time_at_offset(*time_index, result['start'])
+            result['time_end'] = self._time_at_offset(*time_index, result['end'] - 1)
+        return result
+
+    def _read_time_range(self, task_id, execution_id, total, time_index, start_seconds, end_seconds, limit,
+                         unit) -> Dict[str, Any]:
+        """读取在时间区间内写入的日志"""
+        start = self._offset_at_time(*time_index, start_seconds, total) if start_seconds is not None else 0
+        end = self._offset_at_time(*time_index, end_seconds, total) if end_seconds is not None else total
+        end = max(end, start)
+
+        if limit is None:
+            data = self.read_bytes(task_id, execution_id, start, end)
+        elif unit == 'lines':
+            buffer = bytearray()
+            newlines = 0
+            for chunk in self.iter_bytes(task_id, execution_id, start, end, self.SCAN_CHUNK_SIZE):
+                buffer += chunk
+                newlines += chunk.count(b'\n')
+                if newlines >= limit:
+                    break
+            del buffer[self._find_line_offset(buffer, len(buffer), limit):]
+            data = bytes(buffer)
+        else:
+            data = self.read_bytes(task_id, execution_id, start, min(start + limit, end))
+            data = data[:self._align_end(data, 0, len(data), end - start)]
+
+        return {
+            'logs': data.decode('utf-8', errors='replace'),
+            'start': start,
+            'end': start + len(data),
+            'total_size': total
+        }
+
+    def _read_range_mmap(self, task_id, execution_id, total, offset, limit, unit, tail, before) -> Dict[str, Any]:
+        """未压缩日志的区间读取，通过mmap定位"""
+        with open(self.get_path(task_id, execution_id), 'rb') as f, \
+                mmap.mmap(f.fileno(), total, access=mmap.ACCESS_READ) as mm:
+            if tail is not None:
+                start, end = self._find_lines_before(mm, total, tail), total
+            elif before is not None:
+                end = min(max(before, 0), total)
+                if unit == 'lines':
+                    start = self._find_lines_before(mm, end, limit) if limit is not None else 0
+                else:
+                    start = self._align_start(mm, end - limit, end) if limit is not None else 0
+            else:
+                if unit == 'lines':
+                    start = self._find_line_offset(mm, total, offset or 0)
+                    end = self._find_line_offset(mm, total, limit, start) if limit is not None else total
+                else:
+                    start = min(max(offset or 0, 0), total)
+                    end = self._align_end(mm, start, start + limit, total) if limit is not None else total
+            logs = mm[start:end].decode('utf-8', errors='replace')
+
+        return {'logs': logs, 'start': start, 'end': end, 'total_size': total}
+
+    def _read_range_stream(self, task_id, execution_id, total, offset, limit, unit, tail, before) -> Dict[str, Any]:
+        """压缩日志的区间读取，流式解压，与未压缩日志的定位规则相同"""
+        if tail is not None:
+            start, data = self._read_last_lines(task_id, execution_id, total, tail)
+        elif before is not None:
+            end = min(max(before, 0), total)
+            if limit is None:
+                start, data = 0, self.read_bytes(task_id, execution_id, 0, end)
+            elif unit == 'lines':
+                start, data = self._read_last_lines(task_id, execution_id, end, limit)
+            elif end - limit <= 0:
+                start, data = 0, self.read_bytes(task_id, execution_id, 0, end)
+            else:
+                # 多读一个字节，用于判断起始位置是否已在行首
+                window_start = end - limit - 1
+                window = self.read_bytes(task_id, execution_id, window_start, end)
+                start = window_start + self._align_start(window, 1, len(window))
+                data = window[start - window_start:]
+        elif unit == 'lines':
+            start, data = self._read_lines(task_id, execution_id, total, offset or 0, limit)
+        else:
+            start = min(max(offset or 0, 0), total)
+            data = self.read_bytes(task_id, execution_id, start, start + limit if limit is not None else total)
+            if limit is not None:
+                data = data[:self._align_end(data, 0, len(data), total - start)]
+
+        return {
+            'logs': data.decode('utf-8', errors='replace'),
+            'start': start,
+            'end': start + len(data),
+            'total_size': total
+        }
+
+    def _read_last_lines(self, task_id, execution_id, end: int, lines: int) -> Tuple[int, bytes]:
+        """流式读取end之前的最后lines行，只保留最近的若干行在内存中"""
+        buffer = bytearray()
+        base = 0
+        for chunk in self.iter_bytes(task_id, execution_id, 0, end, self.SCAN_CHUNK_SIZE):
+            buffer += chunk
+            if len(buffer) > 4 * self.SCAN_CHUNK_SIZE:
+                cut = self._find_lines_before(buffer, len(buffer), lines)
+                del buffer[:cut]
+                base += cut
+        cut = self._find_lines_before(buffer, len(buffer), lines)
+        return base + cut, bytes(buffer[cut:])
+
+    def _read_lines(self, task_id, execution_id, total: int, first_line: int,
+                    lines: Optional[int]) -> Tuple[int, bytes]:
+        """流式读取从第first_line行开始的lines行"""
+        start = None
+        position = 0
+        remaining = first_line
+        buffer = bytearray()
+        newlines = 0
+        for chunk in self.iter_bytes(task_id, execution_id, 0, total, self.SCAN_CHUNK_SIZE):
+            if start is None:
+                count = chunk.count(b'\n')
+                if count < remaining:
+                    remaining -= count
+                    position += len(chunk)
+                    continue
+                skip = self._find_line_offset(chunk, len(chunk), remaining)
+                start = position + skip
+                chunk = chunk[skip:]
+            buffer += chunk
+            if lines is not None:
+                newlines += chunk.count(b'\n')
+                if newlines >= lines:
+                    break
+
+        if start is None:
+            return total, b''
+        if lines is not None:
+            del buffer[self._find_line_offset(buffer, len(buffer), lines):]
+        return start, bytes(buffer)
+
+    def _find_line_offset(self, mm, total: int, lines: int, start: int = 0) -> int:
+        """从start开始向后跳过lines行，返回下一行开头的字节偏移量"""
+        position = start
+        remaining = lines
+        while remaining > 0 and position < total:
+            chunk_end = min(position + self.SCAN_CHUNK_SIZE, total)
+            count = mm[position:chunk_end].count(b'\n')
+            if count < remaining:
+                remaining -= count
+                position = chunk_end
+                continue
+            # 换行符在当前块中，逐个定位
+            while remaining > 0:
+                position = mm.find(b'\n', position, chunk_end) + 1
+                remaining -= 1
+        return min(position, total)
+
+    @staticmethod
+    def _find_lines_before(mm, end: int, lines: int) -> int:
+        """返回end之前lines行的起始字节偏移量"""
+        if lines <= 0:
+            return end
+        # end前的最后一个字符是换行符时，它属于最后一行
+        position = end - 1 if end > 0 and mm[end - 1:end] == b'\n' else end
+        for _ in range(lines):
+            newline = mm.rfind(b'\n', 0, position)
+            if newline < 0:
+                return 0
+            position = newline
+        return position + 1
+
+    @staticmethod
+    def _align_start(mm, start: int, end: int) -> int:
+        """将起始位置后移到行首，区间内没有换行符时保持不变"""
+        if start <= 0:
+            return 0
+        if mm[start - 1:start] == b'\n':
+            return start
+        newline = mm.find(b'\n', start, end)
+        return newline + 1 if newline >= 0 and newline + 1 < end else start
+
+    @staticmethod
+    def _align_end(mm, start: int, end: int, total: int) -> int:
+        """将结束位置前移到行尾，区间内没有换行符时保持不变"""
+        if end >= total:
+            return total
+        newline = mm.rfind(b'\n', start, end)
+        return newline + 1 if newline >= 0 else end
+
+    def schedule_compression(self, task_id, execution_id: str):
+        """执行结束后安排在后台压缩日志，未启用压缩时忽略"""
+        if self.compression is None:
+            return
+        with self.lock:
+            if self._compressor is None:
+                self._compressor = threading.Thread(target=self._run_compressor, name="LogCompressor", daemon=True)
+                self._compressor.start()
+        self._compress_queue.put((time.monotonic() + self.COMPRESS_DELAY, task_id, execution_id))
+
+    def get_pending_compressions(self) -> int:
+        return self._compress_queue.qsize()
+
+    def _run_compressor(self):
+        while True:
+            due, task_id, execution_id = self._compress_queue.get()
+            # 所有任务的延迟相同，队列按到期时间排列
+            delay = due - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            try:
+                self.compress(task_id, execution_id)
+            except Exception as e:
+                self.logger.error(f"压缩执行 {execution_id} 的日志失败: {str(e)}")
+
+    def compress(self, task_id, execution_id: str) -> bool:
+        """压缩已结束执行的日志
+
+        先写入临时文件，确认压缩期间日志没有被追加后替换为压缩文件，再删除原文件
+
+        Returns:
+            bool: 是否进行了压缩
+        """
+        codec = self.compression
+        path = self.get_path(task_id, execution_id)
+        with self.lock:
+            # 日志仍在写入
+            if codec is None or execution_id in self._fds:
+                return False
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return False  # 已压缩或没有日志
+        if codec == 'gzip' and size > self.GZIP_MAX_SIZE:
+            return False
+
+        target = path + self.COMPRESSED_SUFFIXES[codec]
+        temp_path = target + ".tmp"
+        try:
+            with open(path, 'rb') as source, open(temp_path, 'wb') as destination:
+                if codec == 'zstd':
+                    # 在帧头中写入原始大小，读取大小时无需解压
+                    zstandard.ZstdCompressor(level=self.ZSTD_LEVEL).copy_stream(source, destination, size=size)
+                else:
+                    with gzip.GzipFile(fileobj=destination, mode='wb', compresslevel=self.GZIP_LEVEL,
+                                       mtime=0) as compressed:
+                        shutil.copyfileobj(source, compressed, self.SCAN_CHUNK_SIZE)
+
+            with self.lock:
+                if execution_id in self._fds or os.path.getsize(path) != size:
+                    os.remove(temp_path)
+                    return False
+                os.replace(temp_path, target)
+                os.remove(path)
+        except OSError:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+        self.logger.debug(f"已压缩执行 {execution_id} 的日志: {size} -> {os.path.getsize(target)} 字节")
+        return True
+
+    def _decompress_to_plain(self, task_id, execution_id: str):
+        """将压缩的日志还原为未压缩的文件，调用方需持有锁"""
+        path = self.get_path(task_id, execution_id)
+        for compressed_path, codec in self._get_variants(task_id, execution_id)[1:]:
+            if not os.path.exists(compressed_path):
+                continue
+            temp_path = path + ".tmp"
+            with self._open_stream(task_id, execution_id) as stream, open(temp_path, 'wb') as destination:
+                shutil.copyfileobj(stream, destination, self.SCAN_CHUNK_SIZE)
+            os.replace(temp_path, path)
+            os.remove(compressed_path)
+            return
+
+    def get_storage_stats(self) -> Dict[str, Any]:
+        """统计日志占用的磁盘空间和压缩效果"""
+        stats = {
+            'compression': self.compression,
+            'log_count': 0,
+            'compressed_count': 0,
+            'uncompressed_count': 0,
+            'uncompressed_bytes': 0,  # 未压缩日志的大小
+            'original_bytes': 0,  # 已压缩日志压缩前的大小
+            'compressed_bytes': 0,  # 已压缩日志的大小
+            'pending_compressions': self.get_pending_compressions()
+        }
+        suffixes = {suffix: codec for codec, suffix in self.COMPRESSED_SUFFIXES.items()}
+        for task_entry in os.scandir(self.root):
+            if not task_entry.is_dir():
+                continue
+            for entry in os.scandir(task_entry.path):
+                try:
+                    name, suffix = os.path.splitext(entry.name)
+                    if suffix == self.LOG_SUFFIX:
+                        stats['uncompressed_count'] += 1
+                        stats['uncompressed_bytes'] += entry.stat().st_size
+                    elif suffix in suffixes and name.endswith(self.LOG_SUFFIX):
+                        stats['compressed_count'] += 1
+                        stats['compressed_bytes'] += entry.stat().st_size
+                        stats['original_bytes'] += self._get_original_size(entry.path, suffixes[suffix])
+                except (OSError, RuntimeError):
+                    continue  # 统计期间被删除或压缩
+
+        stats['log_count'] = stats['compressed_count'] + stats['uncompressed_count']
+        stats['bytes_saved'] = stats['original_bytes'] - stats['compressed_bytes']
+        stats['compression_ratio'] = round(stats['original_bytes'] / stats['compressed_bytes'], 2) \
+            if stats['compressed_bytes'] else None
+        stats['total_bytes'] = stats['uncompressed_bytes'] + stats['compressed_bytes']
+        return stats
+
+    def remove(self, task_id, execution_id: str):
+        """删除执行日志（包括压缩的日志）和时间索引"""
+        self.close(execution_id)
+        paths = [path for path, _ in self._get_variants(task_id, execution_id)]
+        for path in paths + [self.get_time_index_path(task_id, execution_id)]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                self.logger.warning(f"删除执行 {execution_id} 的日志失败: {str(e)}")
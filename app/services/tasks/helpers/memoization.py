@@ -0,0 +1,252 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import subprocess
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+
+class InputFingerprint:
+    """计算任务输入的指纹，用于判断任务的输入自上次成功执行以来是否发生变化
+
+    指纹覆盖脚本文件的内容、Conda环境已安装的包（conda-meta中的包记录）、
+    启动命令以及任务声明的额外输入文件或目录。脚本所在目录同时是任务的工作目录，
+    任务会在其中写入输出和日志，因此不整体计入指纹，其中的其他源文件需要在memoize_inputs中声明。
+    文件内容的摘要按(大小, 修改时间)缓存，未修改的文件不会重复读取
+    """
+
+    # 计算目录指纹时跳过的目录
+    IGNORED_DIRS = {'__pycache__', '.git', '.ipynb_checkpoints'}
+
+    # 文件摘要缓存的最大条目数
+    MAX_DIGEST_ENTRIES = 50000
+
+    # Conda环境路径缓存的有效期（秒）
+    ENV_PREFIX_TTL = 300
+
+    READ_CHUNK_SIZE = 1024 * 1024
+
+    def __init__(self):
+        self.logger = logging.getLogger("InputFingerprint")
+        self.lock = threading.Lock()
+        self._digests = OrderedDict()  # 文件路径 -> (大小, 修改时间, 摘要)
+        self._env_prefixes = {}  # 环境名称 -> 环境路径
+        self._env_prefixes_loaded_at = 0.0
+
+    def compute(self, task: Dict[str, Any], command: str) -> str:
+        """计算任务输入的指纹
+
+        Args:
+            task: 任务对象
+            command: 实际执行的命令
+
+        Returns:
+            str: 十六进制的SHA-256指纹
+        """
+        script_dir = os.path.dirname(task['script_path'])
+        hasher = hashlib.sha256()
+
+        hasher.update(b'command\0' + command.encode('utf-8') + b'\0')
+        hasher.update(b'env\0' + self._env_lock_digest(task['conda_env']).encode('utf-8') + b'\0')
+        hasher.update(b'script\0' + self._file_digest(task['script_path']).encode('utf-8') + b'\0')
+
+        for path in sorted(task.get('memoize_inputs') or []):
+            full_path = path if os.path.isabs(path) else os.path.join(script_dir, path)
+            hasher.update(b'input\0' + path.encode('utf-8') + b'\0' + self._path_digest(full_path).encode('utf-8') +
+                          b'\0')
+
+        return hasher.hexdigest()
+
+    def _path_digest(self, path: str) -> str:
+        """计算文件或目录内容的摘要，路径不存在时返回固定值"""
+        if os.path.isfile(path):
+            return self._file_digest(path)
+        if not os.path.isdir(path):
+            return 'missing'
+
+        hasher = hashlib.sha256()
+        for root, dirs, files in os.walk(path):
+            dirs[:] = sorted(d for d in dirs if d not in self.IGNORED_DIRS)
+            for name in sorted(files):
+                full_path = os.path.join(root, name)
+                rel_path = os.path.relpath(full_path, path)
+                hasher.update(rel_path.encode('utf-8', errors='surrogateescape') + b'\0')
+                hasher.update(self._file_digest(full_path).encode('utf-8') + b'\0')
+        return hasher.hexdigest()
+
+    def _file_digest(self, path: str) -> str:
+        """计算单个文件内容的摘要，文件大小和修改时间未变时直接使用缓存"""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return 'missing'
+
+        key = (stat.st_size, stat.st_mtime_ns)
+        with self.lock:
+            cached = self._digests.get(path)
+            if cached and cached[0] == key:
+                self._digests.move_to_end(path)
+                return cached[1]
+
+        hasher = hashlib.sha256()
+        try:
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(self.READ_CHUNK_SIZE), b''):
+                    hasher.update(chunk)
+        except OSError:
+            return 'unreadable'
+        digest = hasher.hexdigest()
+
+        with self.lock:
+            self._digests[path] = (key, digest)
+            self._digests.move_to_end(path)
+            while len(self._digests) > self.MAX_DIGEST_ENTRIES:
+                self._digests.popitem(last=False)
+        return digest
+
+    def _env_lock_digest(self, env_name: str) -> str:
+        """根据环境conda-meta目录中的包记录计算环境的摘要
+
+        conda-meta中每个已安装的包对应一个"名称-版本-构建号.json"文件，文件名集合即为环境的包锁定信息。
+        找不到环境路径时只使用环境名称
+        """
+        prefix = self._get_env_prefix(env_name)
+        meta_dir = os.path.join(prefix, 'conda-meta') if prefix else None
+        if not meta_dir or not os.path.isdir(meta_dir):
+            return f"name:{env_name}"
+
+        try:
+            packages = sorted(name for name in os.listdir(meta_dir) if name.endswith('.json'))
+        except OSError:
+            return f"name:{env_name}"
+        return hashlib.sha256('\n'.join(packages).encode('utf-8')).hexdigest()
+
+    def _get_env_prefix(self, env_name: str) -> Optional[str]:
+        """查找Conda环境的安装路径，结果缓存ENV_PREFIX_TTL秒"""
+        with self.lock:
+            expired = time.monotonic() - self._env_prefixes_loaded_at > self.ENV_PREFIX_TTL
+            if not expired and env_name in self._env_prefixes:
+                return self._env_prefixes[env_name]
+
+        prefixes = self._load_env_prefixes()
+        with self.lock:
+            if prefixes is not None:
+                self._env_prefixes = prefixes
+                self._env_prefixes_loaded_at = time.monotonic()
+            return self._env_prefixes.get(env_name)
+
+    def _load_env_prefixes(self) -> Optional[Dict[str, str]]:
+        """通过conda info --json读取所有环境的路径"""
+        try:
+            result = subprocess.run(["conda", "info", "--json"], capture_output=True, text=True, timeout=30)
+            if result.returncode != 0:
+                return None
+            info = json.loads(result.stdout)
+        except (OSError, subprocess.SubprocessError, ValueError) as e:
+            self.logger.warning(f"Failed to list conda environments: {str(e)}")
+            return None
+
+        prefixes = {os.path.basename(env): env for env in info.get('envs', [])}
+        if info.get('root_prefix'):
+            prefixes['base'] = info['root_prefix']
+        return prefixes
+
+
+class MemoCache:
+    """记录每个任务最近一次成功执行的输入指纹
+
+    只保留每个任务最近一次成功执行的指纹：任务的输出通常会被之后的执行覆盖，
+    匹配更早执行的指纹并不能说明当前的输出与输入一致。
+    条目超过有效期后失效，条目数超过上限时淘汰最久未使用的任务。
+    条目每次变化后通过DataPersistence保存，服务重启后仍然有效
+    """
+
+    TTL_ENV = "FIDLTER_MEMOIZE_TTL"
+    MAX_ENTRIES_ENV = "FIDLTER_MEMOIZE_MAX_ENTRIES"
+    DEFAULT_TTL = 86400  # 秒
+    DEFAULT_MAX_ENTRIES = 1024
+
+    def __init__(self, persistence=None, ttl: Optional[float] = None, max_entries: Optional[int] = None):
+        """初始化缓存
+
+        Args:
+            persistence: DataPersistence实例（可选），用于保存和加载指纹记录
+            ttl: 条目的默认有效期（秒）
+            max_entries: 最多保留的任务数
+        """
+        self.logger = logging.getLogger("MemoCache")
+        self.persistence = persistence
+        self.ttl = ttl if ttl is not None else float(os.environ.get(self.TTL_ENV, self.DEFAULT_TTL))
+        self.max_entries = max_entries if max_entries is not None else \
+            int(os.environ.get(self.MAX_ENTRIES_ENV, self.DEFAULT_MAX_ENTRIES))
+        self.lock = threading.Lock()
+        self._entries = OrderedDict()  # 任务ID -> {fingerprint, execution_id, stored_at}
+        self._load()
+
+    def lookup(self, task_id: str, fingerprint: str, ttl: Optional[float] = None) -> Optional[str]:
+        """查找指纹与任务最近一次成功执行相同的执行ID
+
+        Args:
+            task_id: 任务ID
+            fingerprint: 本次执行的输入指纹
+            ttl: 任务自定义的有效期（秒），为None时使用默认有效期
+
+        Returns:
+            Optional[str]: 命中时返回成功执行的ID，否则返回None
+        """
+        ttl = self.ttl if ttl is None else ttl
+        with self.lock:
+            entry = self._entries.get(task_id)
+            if not entry:
+                return None
+            if time.time() - entry['stored_at'] > ttl:
+                del self._entries[task_id]
+                self._save()
+                return None
+            if entry['fingerprint'] != fingerprint:
+                return None
+            self._entries.move_to_end(task_id)
+            return entry['execution_id']
+
+    def store(self, task_id: str, fingerprint: str, execution_id: str):
+        """记录任务最近一次成功执行的指纹"""
+        with self.lock:
+            self._entries[task_id] = {'fingerprint': fingerprint, 'execution_id': execution_id, 'stored_at': time.time()}
+            self._entries.move_to_end(task_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._save()
+
+    def invalidate(self, task_id: str):
+        """任务执行失败或被删除时清除记录"""
+        with self.lock:
+            if self._entries.pop(task_id, None) is not None:
+                self._save()
+
+    def _load(self):
+        """从持久化存储加载指纹记录，按最近使用的顺序恢复"""
+        if not self.persistence:
+            return
+        state = self.persistence.load_memo_cache() or {}
+        for entry in state.get('entries', []):
+            try:
+                self._entries[entry['task_id']] = {
+                    'fingerprint': entry['fingerprint'],
+                    'execution_id': entry['execution_id'],
+                    'stored_at': float(entry['stored_at'])
+                }
+            except (KeyError, TypeError, ValueError):
+                self.logger.warning(f"Ignoring invalid memoization entry: {entry}")
+
+    def _save(self):
+        """保存指纹记录，调用方需持有锁。任务ID保存在条目中，JSON的键只能是字符串"""
+        if not self.persistence:
+            return
+        self.persistence.save_memo_cache(
+            {'entries': [{
+                'task_id': task_id,
+                **entry
+            } for task_id, entry in self._entries.items()]})
@@ -0,0 +1,67 @@
+import os
+import logging
+from typing import Dict, Any, Optional
+
+import psutil
+
+
+class MemoryPressure:
+    """检测主机的内存压力
+
+    优先读取内核PSI接口(/proc/pressure/memory)中最近10秒内存在内存等待的时间占比，
+    不支持PSI时回退为根据可用内存占比判断
+    """
+
+    PSI_PATH = "/proc/pressure/memory"
+
+    # 阈值可以通过环境变量覆盖
+    PSI_THRESHOLD_ENV = "FIDLTER_MEMORY_PRESSURE_PSI"
+    AVAILABLE_THRESHOLD_ENV = "FIDLTER_MEMORY_PRESSURE_AVAILABLE"
+    DEFAULT_PSI_THRESHOLD = 10.0  # some avg10，百分比
+    DEFAULT_AVAILABLE_THRESHOLD = 10.0  # 可用内存占总内存的百分比
+
+    def __init__(self, psi_threshold: Optional[float] = None, available_threshold: Optional[float] = None):
+        """初始化内存压力检测
+
+        Args:
+            psi_threshold: PSI some avg10达到该百分比时视为高压力
+            available_threshold: 可用内存低于总内存的该百分比时视为高压力
+        """
+        self.logger = logging.getLogger("MemoryPressure")
+        self.psi_threshold = psi_threshold if psi_threshold is not None else \
+            float(os.environ.get(self.PSI_THRESHOLD_ENV, self.DEFAULT_PSI_THRESHOLD))
+        self.available_threshold = available_threshold if available_threshold is not None else \
+            float(os.environ.get(self.AVAILABLE_THRESHOLD_ENV, self.DEFAULT_AVAILABLE_THRESHOLD))
+
+    def read(self) -> Dict[str, Any]:
+        """读取当前的内存压力指标
+
+        Returns:
+            Dict[str, Any]: 包含some_avg10(不支持PSI时为None)和available_percent
+        """
+        memory = psutil.virtual_memory()
+        return {
+            'some_avg10': self._read_psi_avg10(),
+            'available_percent': memory.available / memory.total * 100 if memory.total else 100.0
+        }
+
+    def is_high(self) -> bool:
+        """判断主机当前是否处于内存压力之下"""
+        pressure = self.read()
+        if pressure['some_avg10'] is not None and pressure['some_avg10'] >= self.psi_threshold:
+            return True
+        return pressure['available_percent'] < self.available_threshold
+
+    def _read_psi_avg10(self) -> Optional[float]:
+        """读取PSI中some行的avg10值"""
+        try:
+            with open(self.PSI_PATH, "r") as f:
+                for line in f:
+                    if line.startswith("some "):
+                        for item in line.split()[1:]:
+                            key, _, value = item.partition("=")
+                            if key == "avg10":
+                                return float(value)
+        except (OSError, ValueError):
+            pass
+        return None
@@ -0,0 +1,166 @@
+import os
+import logging
+from typing import Dict, Any, Optional, List
+
+import psutil
+
+# 非Linux平台的psutil没有I/O调度类别常量
+IOPRIO_CLASS_BE = getattr(psutil, 'IOPRIO_CLASS_BE', None)
+
+
+class ProcessPriority:
+    """将任务优先级映射为操作系统的调度参数
+
+    子进程启动后、执行任务命令之前（见LaunchGate），由父进程为它设置nice值、I/O调度类别和oom_score_adj，
+    并按需绑定CPU，之后派生的所有进程都会继承这些设置；使用cgroup时再通过cpu.weight和io.weight
+    在控制组之间按比例分配CPU时间和磁盘带宽
+    """
+
+    # 优先级 -> 调度参数
+    # 提高优先级（负的nice值和oom_score_adj）需要CAP_SYS_NICE/CAP_SYS_RESOURCE权限，没有权限时保持默认值
+    PROFILES = {
+        'high': {
+            'nice': -5,
+            'ionice_class': IOPRIO_CLASS_BE,
+            'ionice_level': 0,
+            'oom_score_adj': -500,
+            'cpu_weight': 400,
+            'io_weight': 400
+        },
+        'normal': {
+            'nice': 0,
+            'ionice_class': IOPRIO_CLASS_BE,
+            'ionice_level': 4,
+            'oom_score_adj': 0,
+            'cpu_weight': 100,
+            'io_weight': 100
+        },
+        'low': {
+            'nice': 10,
+            'ionice_class': IOPRIO_CLASS_BE,
+            'ionice_level': 7,
+            'oom_score_adj': 500,
+            'cpu_weight': 25,
+            'io_weight': 25
+        }
+    }
+
+    # I/O调度类别的名称，用于执行记录
+    IONICE_CLASS_NAMES = {0: 'none', 1: 'realtime', 2: 'best-effort', 3: 'idle'}
+
+    def __init__(self):
+        self.logger = logging.getLogger("ProcessPriority")
+
+    def get_profile(self, priority: Optional[str]) -> Dict[str, Any]:
+        """获取优先级对应的调度参数，未知优先级按normal处理"""
+        return self.PROFILES.get(priority or 'normal', self.PROFILES['normal'])
+
+    def apply(self, pid: int, priority: Optional[str], cpu_affinity: Optional[List[int]]) -> None:
+        """由父进程为尚未执行任务命令的子进程设置调度参数
+
+        不在preexec_fn中设置，fork之后、exec之前不运行Python代码
+
+        Args:
+            pid: 子进程PID
+            priority: 任务优先级
+            cpu_affinity: 允许使用的CPU编号列表，为空时不限制
+        """
+        profile = self.get_profile(priority)
+
+        # 出错时保持默认值，不影响任务启动，实际生效的值由read_effective记录
+        if profile['nice']:
+            try:
+                os.setpriority(os.PRIO_PROCESS, pid, profile['nice'])
+            except OSError as e:
+                self.logger.debug(f"设置进程 {pid} 的nice值失败: {str(e)}")
+
+        if profile['ionice_class'] is not None:
+            try:
+                psutil.Process(pid).ionice(profile['ionice_class'], profile['ionice_level'])
+            except (OSError, ValueError, psutil.Error) as e:
+                self.logger.debug(f"设置进程 {pid} 的I/O调度类别失败: {str(e)}")
+
+        if profile['oom_score_adj']:
+            try:
+                with open(f"/proc/{pid}/oom_score_adj", "w") as f:
+                    f.write(str(profile['oom_score_adj']))
+            except OSError as e:
+                self.logger.debug(f"设置进程 {pid} 的oom_score_adj失败: {str(e)}")
+
+        if cpu_affinity and hasattr(os, 'sched_setaffinity'):
+            try:
+                os.sched_setaffinity(pid, cpu_affinity)
+            except OSError as e:
+                self.logger.debug(f"设置进程 {pid} 的CPU亲和性失败: {str(e)}")
+
+    def read_effective(self, pid: int, priority: Optional[str]) -> Dict[str, Any]:
+        """读取进程实际生效的调度参数
+
+        Args:
+            pid: 任务主进程PID
+            priority: 任务优先级
+
+        Returns:
+            Dict[str, Any]: 包含priority、nice、ionice_class、ionice_level、oom_score_adj和cpu_affinity，
+                            读取失败的项为None
+        """
+        effective = {
+            'priority': priority or 'normal',
+            'nice': None,
+            'ionice_class': None,
+            'ionice_level': None,
+            'oom_score_adj': None,
+            'cpu_affinity': None
+        }
+
+        try:
+            effective['nice'] = os.getpriority(os.PRIO_PROCESS, pid)
+        except OSError:
+            pass
+
+        try:
+            ionice = psutil.Process(pid).ionice()
+            effective['ionice_class'] = self.IONICE_CLASS_NAMES.get(int(ionice.ioclass), str(ionice.ioclass))
+            effective['ionice_level'] = ionice.value
+        except (AttributeError, psutil.Error, OSError):
+            pass
+
+        try:
+            with open(f"/proc/{pid}/oom_score_adj", "r") as f:
+                effective['oom_score_adj'] = int(f.read().strip())
+        except (OSError, ValueError):
+            pass
+
+        if hasattr(os, 'sched_getaffinity'):
+            try:
+                effective['cpu_affinity'] = sorted(os.sched_getaffinity(pid))
+            except OSError:
+                pass
+
+        return effective
+
+    @staticmethod
+    def parse_cpu_affinity(value: Optional[str]) -> Optional[List[int]]:
+        """解析CPU亲和性配置，支持逗号分隔的编号和范围
+
+        例如 "0,2,4-7" 解析为 [0, 2, 4, 5, 6, 7]
+
+        Raises:
+            ValueError: 格式无效
+        """
+        if not value or not value.strip():
+            return None
+        cpus = set()
+        for item in value.split(','):
+            item = item.strip()
+            if not item:
+                continue
+            start, sep, end = item.partition('-')
+            if sep:
+                first, last = int(start), int(end)
+                if first > last:
+                    raise ValueError(f"Invalid CPU range: {item}")
+                cpus.update(range(first, last + 1))
+            else:
+                cpus.add(int(item))
+        return sorted(cpus) or None
@@ -0,0 +1,154 @@
+import os
+import select
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Any, Optional
+
+
+class ProcessReaper:
+    """在单个线程中检测所有子进程的退出，并把退出码分发给回调
+
+    内核支持pidfd时为每个进程打开pidfd并注册到epoll，进程退出后pidfd变为可读；
+    不支持时回退为定时对已注册的进程逐个调用poll()。
+    进程退出后由Popen.poll()回收，保证Popen对象的returncode正确，
+    不使用waitpid(-1)，避免误回收其他组件（如subprocess.run）创建的子进程
+    """
+
+    # 回退模式下检查进程是否退出的间隔（秒）
+    POLL_INTERVAL = 0.2
+
+    # epoll等待的超时时间（秒），用于定期检查是否需要停止
+    EPOLL_TIMEOUT = 1.0
+
+    # 执行退出回调的线程数，回调中会等待输出读取完成并写入执行记录
+    CALLBACK_WORKERS = 4
+
+    def __init__(self):
+        self.logger = logging.getLogger("ProcessReaper")
+        self.lock = threading.Lock()
+        self._processes: Dict[int, Dict[str, Any]] = {}  # pid -> {process, callback, pidfd}
+        self._fd_to_pid: Dict[int, int] = {}
+        self._stopped = threading.Event()
+        self._epoll = self._create_epoll()
+        self._callbacks = ThreadPoolExecutor(max_workers=self.CALLBACK_WORKERS, thread_name_prefix="fidlter-reaper")
+        self._thread = threading.Thread(target=self._run, name="fidlter-reaper", daemon=True)
+        self._thread.start()
+
+    @property
+    def uses_pidfd(self) -> bool:
+        """是否使用pidfd检测进程退出"""
+        return self._epoll is not None
+
+    def _create_epoll(self):
+        """检查内核是否支持pidfd，支持时创建epoll实例，否则返回None"""
+        if not hasattr(os, 'pidfd_open') or not hasattr(select, 'epoll'):
+            self.logger.info("pidfd is not supported, falling back to polling for process exits")
+            return None
+        try:
+            os.close(os.pidfd_open(os.getpid()))
+        except OSError:
+            self.logger.info("pidfd is not supported, falling back to polling for process exits")
+            return None
+        return select.epoll()
+
+    def register(self, process, callback: Callable[[int], None]):
+        """注册一个子进程，进程退出后在回调线程池中调用callback(exit_code)
+
+        Args:
+            process: subprocess.Popen对象
+            callback: 进程退出后调用的函数，参数为退出码
+        """
+        pidfd = None
+        if self._epoll is not None:
+            try:
+                pidfd = os.pidfd_open(process.pid)
+            except OSError:
+                # 进程已退出并被回收时无法打开pidfd，交给轮询处理
+                pidfd = None
+
+        with self.lock:
+            self._processes[process.pid] = {'process': process, 'callback': callback, 'pidfd': pidfd}
+            if pidfd is not None:
+                self._fd_to_pid[pidfd] = process.pid
+                # epoll_wait阻塞期间也可以注册新的文件描述符
+                self._epoll.register(pidfd, select.EPOLLIN)
+
+    def stop(self):
+        """停止后台线程，已注册但尚未退出的进程不再触发回调"""
+        self._stopped.set()
+        self._thread.join(timeout=self.EPOLL_TIMEOUT * 2)
+        with self.lock:
+            for entry in self._processes.values():
+                self._close_pidfd(entry['pidfd'])
+            self._processes.clear()
+            self._fd_to_pid.clear()
+        if self._epoll is not None:
+            self._epoll.close()
+        self._callbacks.shutdown(wait=False)
+
+    def _run(self):
+        """后台线程的入口"""
+        while not self._stopped.is_set():
+            try:
+                if self._epoll is not None:
+                    self._wait_pidfds()
+                else:
+                    self._stopped.wait(self.POLL_INTERVAL)
+                # pidfd模式下也检查一遍没有pidfd的进程
+                self._poll_processes()
+            except Exception as e:
+                self.logger.error(f"Error while reaping child processes: {str(e)}")
+
+    def _wait_pidfds(self):
+        """等待pidfd可读，并回收对应的进程"""
+        for fd, _ in self._epoll.poll(self.EPOLL_TIMEOUT):
+            with self.lock:
+                pid = self._fd_to_pid.get(fd)
+            if pid is not None:
+                self._reap(pid)
+
+    def _poll_processes(self):
+        """检查没有pidfd的进程是否已经退出"""
+        with self.lock:
+            pids = [pid for pid, entry in self._processes.items() if entry['pidfd'] is None]
+        for pid in pids:
+            self._reap(pid)
+
+    def _reap(self, pid: int):
+        """进程已退出时回收进程并分发回调"""
+        with self.lock:
+            entry = self._processes.get(pid)
+        if entry is None:
+            return
+
+        exit_code = entry['process'].poll()
+        if exit_code is None:
+            return
+
+        with self.lock:
+            self._processes.pop(pid, None)
+            if entry['pidfd'] is not None:
+                self._fd_to_pid.pop(entry['pidfd'], None)
+                try:
+                    self._epoll.unregister(entry['pidfd'])
+                except (OSError, ValueError):
+                    pass
+        self._close_pidfd(entry['pidfd'])
+
+        self._callbacks.submit(self._dispatch, entry['callback'], exit_code, pid)
+
+    def _dispatch(self, callback: Callable[[int], None], exit_code: int, pid: int):
+        """调用退出回调，回调中的异常不影响其他进程"""
+        try:
+            callback(exit_code)
+        except Exception as e:
+            self.logger.error(f"Error in exit callback for process {pid}: {str(e)}")
+
+    @staticmethod
+    def _close_pidfd(pidfd: Optional[int]):
+        if pidfd is not None:
+            try:
+                os.close(pidfd)
+            except OSError:
+                pass
@@ -0,0 +1,224 @@
+import time
+import logging
+from typing import Dict, Any, Optional
+
+import psutil
+
+from .time_series import ResourceSeries
+
+
+class ResourceSampler:
+    """负责采集单次执行的进程树资源使用情况
+
+    每次采样覆盖主进程及其所有子进程，记录内存、CPU、I/O、线程数、文件描述符和上下文切换，
+    并在采样过程中增量维护各项指标的峰值和平均值，避免结束时再遍历全部样本。
+    执行位于独立cgroup中时，内存、CPU、I/O和线程数直接读取控制组统计文件，
+    进程列表来自cgroup.procs，不再递归遍历子进程
+    """
+
+    # 时间序列字段 -> 汇总字段后缀（peak_<后缀>、avg_<后缀>）
+    SERIES_FIELDS = {
+        'memory_usage': 'memory',  # MB
+        'cpu_usage': 'cpu',  # CPU百分比，多核时可超过100
+        'io_read_rate': 'io_read_rate',  # 字节/秒
+        'io_write_rate': 'io_write_rate',  # 字节/秒
+        'thread_usage': 'threads',
+        'fd_usage': 'fds',
+        'ctx_switch_rate': 'ctx_switch_rate'  # 次/秒
+    }
+
+    # 累计计数字段
+    COUNTER_FIELDS = ('cpu_time', 'io_read_bytes', 'io_write_bytes', 'ctx_switches_voluntary',
+                      'ctx_switches_involuntary')
+
+    def __init__(self, pid: int, cgroup_path: Optional[str] = None, cgroup_manager=None):
+        """初始化采样器
+
+        Args:
+            pid: 任务主进程PID
+            cgroup_path: 执行所在的控制组路径（可选）
+            cgroup_manager: CgroupManager实例，提供cgroup_path时必须提供
+        """
+        self.pid = pid
+        self.process = psutil.Process(pid)
+        self.cgroup_path = cgroup_path if cgroup_manager else None
+        self.cgroup_manager = cgroup_manager
+        self.logger = logging.getLogger("ResourceSampler")
+
+        # cgroup模式下缓存进程对象，避免每次采样都重新创建
+        self._processes = {pid: self.process}
+        self._cgroup_counters = {}
+
+        # 每个进程最近一次的累计计数，已退出的子进程保留最后的值，保证总量单调
+        self._process_counters = {}
+        self._last_totals = dict.fromkeys(self.COUNTER_FIELDS, 0)
+        self._last_time = time.monotonic()
+        self.started_at = self._last_time
+
+        # 增量统计：{后缀: [峰值, 总和, 样本数]}
+        self._stats = {suffix: [None, 0.0, 0] for suffix in self.SERIES_FIELDS.values()}
+
+    @classmethod
+    def empty_record_fields(cls, interval: float) -> Dict[str, Any]:
+        """返回执行记录中与资源采样相关的初始字段
+
+        Args:
+            interval: 初始采样间隔（秒），作为降采样序列的初始桶宽
+        """
+        fields = {'resource_series': ResourceSeries.create(cls.SERIES_FIELDS, interval)}
+        for suffix in cls.SERIES_FIELDS.values():
+            fields[f'peak_{suffix}'] = None
+            fields[f'avg_{suffix}'] = None
+        for counter in cls.COUNTER_FIELDS:
+            fields[counter] = None
+        return fields
+
+    def elapsed(self) -> float:
+        """采样器创建以来经过的秒数，近似为执行已运行的时长"""
+        return time.monotonic() - self.started_at
+
+    def is_running(self) -> bool:
+        """检查主进程是否仍在运行"""
+        try:
+            return self.process.is_running() and self.process.status() != psutil.STATUS_ZOMBIE
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            return False
+
+    def sample(self) -> Dict[str, float]:
+        """采集一次进程树的资源使用情况
+
+        Returns:
+            Dict[str, float]: 时间序列字段到本次采样值的映射
+
+        Raises:
+            psutil.NoSuchProcess: 主进程已经退出
+        """
+        cgroup_stats = None
+        if self.cgroup_path:
+            cgroup_stats = self.cgroup_manager.read_stats(self.cgroup_path)
+            processes = self._get_cgroup_processes(cgroup_stats.get('pids', []))
+        else:
+            processes = [self.process] + self.process.children(recursive=True)
+
+        rss = 0
+        threads = 0
+        fds = 0
+        for proc in processes:
+            try:
+                with proc.oneshot():
+                    if not cgroup_stats:
+                        rss += proc.memory_info().rss
+                        threads += proc.num_threads()
+                    fds += self._count_fds(proc)
+                    self._process_counters[proc.pid] = self._read_counters(proc)
+            except (psutil.NoSuchProcess, psutil.ZombieProcess, psutil.AccessDenied):
+                continue
+
+        if cgroup_stats:
+            # 控制组统计包含组内所有进程（含已退出的进程）的累计值
+            rss = cgroup_stats.get('memory_current', rss)
+            threads = cgroup_stats.get('pids_current', threads)
+            if 'cpu_usage_usec' in cgroup_stats:
+                self._cgroup_counters['cpu_time'] = cgroup_stats['cpu_usage_usec'] / 1000000
+            if 'io_read_bytes' in cgroup_stats:
+                self._cgroup_counters['io_read_bytes'] = cgroup_stats['io_read_bytes']
+                self._cgroup_counters['io_write_bytes'] = cgroup_stats['io_write_bytes']
+
+        now = time.monotonic()
+        elapsed = max(now - self._last_time, 1e-6)
+        totals = self.get_counters()
+
+        def rate(*fields):
+            return sum(totals[f] - self._last_totals[f] for f in fields) / elapsed
+
+        sample = {
+            'memory_usage': rss / (1024 * 1024),
+            'cpu_usage': rate('cpu_time') * 100,
+            'io_read_rate': rate('io_read_bytes'),
+            'io_write_rate': rate('io_write_bytes'),
+            'thread_usage': threads,
+            'fd_usage': fds,
+            'ctx_switch_rate': rate('ctx_switches_voluntary', 'ctx_switches_involuntary')
+        }
+
+        self._last_totals = totals
+        self._last_time = now
+
+        for series, value in sample.items():
+            stats = self._stats[self.SERIES_FIELDS[series]]
+            stats[0] = value if stats[0] is None else max(stats[0], value)
+            stats[1] += value
+            stats[2] += 1
+
+        return sample
+
+    def get_counters(self) -> Dict[str, float]:
+        """获取整个进程树的累计计数（CPU秒数、读写字节数、上下文切换次数）"""
+        totals = dict.fromkeys(self.COUNTER_FIELDS, 0)
+        for counters in self._process_counters.values():
+            for field, value in counters.items():
+                totals[field] += value
+        totals.update(self._cgroup_counters)
+        return totals
+
+    def _get_cgroup_processes(self, pids):
+        """根据cgroup.procs中的PID获取进程对象，复用已缓存的对象"""
+        processes = []
+        for pid in pids:
+            proc = self._processes.get(pid)
+            if proc is None:
+                try:
+                    proc = psutil.Process(pid)
+                except (psutil.NoSuchProcess, psutil.AccessDenied):
+                    continue
+                self._processes[pid] = proc
+            processes.append(proc)
+
+        # 清理已经离开控制组的进程
+        active = set(pids)
+        for pid in list(self._processes):
+            if pid not in active and pid != self.pid:
+                del self._processes[pid]
+        return processes
+
+    def summary(self) -> Dict[str, Any]:
+        """获取峰值、平均值和累计计数的汇总，用于更新执行记录"""
+        result = {}
+        for suffix, (peak, total, count) in self._stats.items():
+            if count:
+                result[f'peak_{suffix}'] = peak
+                result[f'avg_{suffix}'] = total / count
+        if any(stats[2] for stats in self._stats.values()):
+            result.update(self.get_counters())
+        return result
+
+    def _read_counters(self, proc: psutil.Process) -> Dict[str, float]:
+        """读取单个进程的累计计数，必须在oneshot上下文中调用"""
+        cpu = proc.cpu_times()
+        ctx = proc.num_ctx_switches()
+        counters = {
+            'cpu_time': cpu.user + cpu.system,
+            'ctx_switches_voluntary': ctx.voluntary,
+            'ctx_switches_involuntary': ctx.involuntary
+        }
+
+        # io_counters在部分平台上不可用，或需要额外权限
+        previous = self._process_counters.get(proc.pid, {})
+        try:
+            io = proc.io_counters()
+            counters['io_read_bytes'] = io.read_bytes
+            counters['io_write_bytes'] = io.write_bytes
+        except (AttributeError, psutil.AccessDenied, NotImplementedError):
+            counters['io_read_bytes'] = previous.get('io_read_bytes', 0)
+            counters['io_write_bytes'] = previous.get('io_write_bytes', 0)
+
+        return counters
+
+    @staticmethod
+    def _count_fds(proc: psutil.Process) -> int:
+        """获取进程打开的文件描述符数量（Windows下为句柄数）"""
+        if hasattr(proc, 'num_fds'):
+            return proc.num_fds()
+        if hasattr(proc, 'num_handles'):
+            return proc.num_handles()
+        return 0
@@ -0,0 +1,217 @@
+import os
+import copy
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Any, Optional, List, Set, Tuple
+
+
+class RetentionPolicy:
+    """执行历史的保留策略
+
+    每条策略可以限制执行记录的保留天数、条数和总字节数，并为执行详情（日志文件、资源时间序列等）
+    单独设置更短的限制：详情超出限制时只删除详情，保留执行记录本身。
+
+    - 全局策略作用于所有任务的执行合在一起的整体，例如max_count为所有任务合计最多保留的记录数
+    - 任务策略只作用于该任务的执行，任务策略中设置了的字段（包括设为None的字段）覆盖全局策略的同名字段，
+      该任务的执行不再受全局策略的这一字段限制，也不计入全局的条数和字节数；未设置的字段仍按全局策略
+
+    清理时从最旧的执行开始，运行中或暂停的执行不会被清理。策略保存在配置目录的retention.json中
+    """
+
+    INTERVAL_ENV = "FIDLTER_RETENTION_INTERVAL"
+    DEFAULT_INTERVAL = 3600  # 秒
+
+    # 策略字段，值为None表示不限制
+    FIELDS = ('max_age_days', 'max_count', 'max_total_bytes', 'details_max_age_days', 'details_max_count',
+              'details_max_total_bytes')
+    SIZE_FIELDS = ('max_total_bytes', 'details_max_total_bytes')
+
+    # 按每个执行自身判断的字段，其余字段限制的是一组执行的合计
+    AGE_FIELDS = ('max_age_days', 'details_max_age_days')
+
+    # 默认保留30天的执行记录，日志和资源时间序列随执行记录一起清理
+    DEFAULT_GLOBAL_POLICY = {
+        'max_age_days': 30,
+        'max_count': None,
+        'max_total_bytes': None,
+        'details_max_age_days': None,
+        'details_max_count': None,
+        'details_max_total_bytes': None
+    }
+
+    TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+    def __init__(self, persistence):
+        """初始化保留策略
+
+        Args:
+            persistence: DataPersistence实例，用于保存策略配置
+        """
+        self.logger = logging.getLogger("RetentionPolicy")
+        self.lock = threading.Lock()
+        self.persistence = persistence
+
+        config = persistence.load_retention_config() or {}
+        self.global_policy = dict(self.DEFAULT_GLOBAL_POLICY)
+        self.task_policies = {}  # 任务ID（字符串） -> 只包含设置了的字段的策略
+        try:
+            self.global_policy.update(self.validate(config.get('global') or {}))
+            for task_id, policy in (config.get('tasks') or {}).items():
+                self.task_policies[str(task_id)] = self.validate(policy)
+        except ValueError as e:
+            self.logger.error(f"保留策略配置无效，使用默认策略: {str(e)}")
+            self.global_policy = dict(self.DEFAULT_GLOBAL_POLICY)
+            self.task_policies = {}
+        self.interval = float(config.get('interval_seconds') or
+                              os.environ.get(self.INTERVAL_ENV, self.DEFAULT_INTERVAL))
+
+    @classmethod
+    def validate(cls, policy: Dict[str, Any]) -> Dict[str, Any]:
+        """检查策略字段，返回规范化后的副本
+
+        Raises:
+            ValueError: 包含未知字段，或字段值不是正数且不为None
+        """
+        if not isinstance(policy, dict):
+            raise ValueError("policy must be an object")
+        normalized = {}
+        for field, value in policy.items():
+            if field not in cls.FIELDS:
+                raise ValueError(f"unknown retention field: {field}")
+            if value is not None:
+                if isinstance(value, bool) or not isinstance(value, (int, float)) or value <= 0:
+                    raise ValueError(f"{field} must be a positive number or null")
+                if field != 'max_age_days' and field != 'details_max_age_days':
+                    value = int(value)
+            normalized[field] = value
+        return normalized
+
+    def get_config(self) -> Dict[str, Any]:
+        """获取当前的全局策略、任务策略和后台清理间隔"""
+        with self.lock:
+            return {
+                'global': dict(self.global_policy),
+                'tasks': copy.deepcopy(self.task_policies),
+                'interval_seconds': self.interval
+            }
+
+    def update(self, global_updates: Optional[Dict[str, Any]] = None, interval: Optional[float] = None):
+        """更新全局策略的部分字段或后台清理间隔并保存
+
+        Raises:
+            ValueError: 策略字段或间隔无效
+        """
+        normalized = self.validate(global_updates or {})
+        if interval is not None and (isinstance(interval, bool) or not isinstance(interval, (int, float))
+                                     or interval <= 0):
+            raise ValueError("interval_seconds must be a positive number")
+        with self.lock:
+            self.global_policy.update(normalized)
+            if interval is not None:
+                self.interval = float(interval)
+        self._save()
+
+    def set_task_policy(self, task_id, policy: Optional[Dict[str, Any]]):
+        """设置任务策略，policy为None时删除任务策略
+
+        Raises:
+            ValueError: 策略字段无效
+        """
+        normalized = self.validate(policy) if policy is not None else None
+        with self.lock:
+            if normalized:
+                self.task_policies[str(task_id)] = normalized
+            else:
+                self.task_policies.pop(str(task_id), None)
+        self._save()
+
+    def _save(self):
+        config = self.get_config()
+        if not self.persistence.save_retention_config(config):
+            self.logger.warning("保存保留策略失败")
+
+    def uses_sizes(self) -> bool:
+        """是否有策略限制了总字节数，没有时清理不需要统计记录和详情的大小"""
+        with self.lock:
+            policies = [self.global_policy] + list(self.task_policies.values())
+        return any(policy.get(field) is not None for policy in policies for field in self.SIZE_FIELDS)
+
+    def plan(self, executions: List[Dict[str, Any]], now: Optional[datetime] = None) -> Tuple[Set[str], Set[str]]:
+        """计算需要清理的执行
+
+        Args:
+            executions: 已结束执行的列表，每项包含task_id、execution_id、start_time、has_details、
+                        record_bytes（记录摘要的字节数）和details_bytes（日志文件和详情文件的字节数）
+            now: 当前时间
+
+        Returns:
+            Tuple[Set[str], Set[str]]: (需要删除记录的执行ID, 只需删除详情的执行ID)
+        """
+        now = now or datetime.now()
+        with self.lock:
+            global_policy = dict(self.global_policy)
+            task_policies = dict(self.task_policies)
+
+        by_task = {}
+        for execution in executions:
+            by_task.setdefault(str(execution['task_id']), []).append(execution)
+
+        remove_records = set()
+        remove_details = set()
+        # 任务的执行先按任务策略覆盖后的保留天数和任务自己的条数、字节数限制清理
+        for task_id, task_executions in by_task.items():
+            task_policy = task_policies.get(task_id) or {}
+            policy = {field: task_policy.get(field) for field in self.FIELDS if field not in self.AGE_FIELDS}
+            for field in self.AGE_FIELDS:
+                policy[field] = task_policy[field] if field in task_policy else global_policy.get(field)
+            self._apply(policy, task_executions, now, remove_records, remove_details)
+
+        # 全局的条数和字节数限制只统计没有在任务策略中覆盖该字段的任务的执行，先处理记录再处理详情
+        for field in self.FIELDS:
+            if field in self.AGE_FIELDS or global_policy.get(field) is None:
+                continue
+            covered = [
+                execution for execution in executions
+                if field not in (task_policies.get(str(execution['task_id'])) or {})
+            ]
+            self._apply({field: global_policy[field]}, covered, now, remove_records, remove_details)
+        return remove_records, remove_details - remove_records
+
+    def _apply(self, policy, executions, now, remove_records, remove_details):
+        """按一条策略选出需要清理的执行，已被其他策略清理的执行不计入限制"""
+        # 按开始时间从新到旧排列，超出条数或字节数限制的是较旧的执行
+        ordered = sorted(executions, key=lambda execution: execution.get('start_time') or '', reverse=True)
+
+        remove_records.update(
+            self._select(ordered, now, policy.get('max_age_days'), policy.get('max_count'),
+                         policy.get('max_total_bytes'),
+                         lambda execution: execution['record_bytes'] + execution['details_bytes'], remove_records))
+
+        with_details = [
+            execution for execution in ordered
+            if execution['has_details'] and execution['execution_id'] not in remove_records
+        ]
+        remove_details.update(
+            self._select(with_details, now, policy.get('details_max_age_days'), policy.get('details_max_count'),
+                         policy.get('details_max_total_bytes'), lambda execution: execution['details_bytes'],
+                         remove_details))
+
+    def _select(self, ordered, now, max_age_days, max_count, max_total_bytes, get_size, removed) -> List[str]:
+        """从新到旧累计条数和字节数，返回超出任一限制的执行ID"""
+        # 开始时间为YYYY-MM-DD HH:MM:SS格式，直接按字符串比较，不需要逐条解析
+        cutoff = (now - timedelta(days=max_age_days)).strftime(self.TIME_FORMAT) if max_age_days else None
+        selected = []
+        count = 0
+        total = 0
+        for execution in ordered:
+            execution_id = execution['execution_id']
+            if execution_id in removed:
+                continue
+            count += 1
+            total += get_size(execution)
+            if (cutoff and (execution.get('start_time') or '') < cutoff) or \
+                    (max_count is not None and count > max_count) or \
+                    (max_total_bytes is not None and total > max_total_bytes):
+                selected.append(execution_id)
+        return selected
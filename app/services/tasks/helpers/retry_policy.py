@@ -0,0 +1,86 @@
+import random
+from typing import Dict, Any, Optional, List, Union
+
+from .exit_classifier import ExitClassifier
+
+
+class RetryPolicy:
+    """任务失败后的重试策略：指数退避并加入随机抖动
+
+    第n次重试前的等待时间在 [d/2, d] 之间随机选取，其中 d = min(backoff_max, backoff_base * 2^(n-1))，
+    避免同时失败的多个任务在同一时刻重试
+    """
+
+    DEFAULT_BACKOFF_BASE = 10  # 秒
+    DEFAULT_BACKOFF_MAX = 600  # 秒
+
+    # 未配置retry_on时，除手动停止外的所有失败都会重试
+    DEFAULT_RETRY_ON = (ExitClassifier.FAILED, ) + ExitClassifier.ABNORMAL_STATUSES
+
+    def __init__(self,
+                 max_retries: int = 0,
+                 backoff_base: Optional[float] = None,
+                 backoff_max: Optional[float] = None,
+                 retry_on: Optional[List[Union[int, str]]] = None):
+        """初始化重试策略
+
+        Args:
+            max_retries: 最大重试次数，0表示不重试
+            backoff_base: 第一次重试前的基础等待秒数
+            backoff_max: 单次等待的上限秒数
+            retry_on: 需要重试的退出码（整数）或执行状态（字符串），为空时使用DEFAULT_RETRY_ON
+        """
+        self.max_retries = int(max_retries or 0)
+        self.backoff_base = float(backoff_base) if backoff_base is not None else self.DEFAULT_BACKOFF_BASE
+        self.backoff_max = float(backoff_max) if backoff_max is not None else self.DEFAULT_BACKOFF_MAX
+        retry_on = retry_on or self.DEFAULT_RETRY_ON
+        self.retry_exit_codes = {value for value in retry_on if isinstance(value, int)}
+        self.retry_statuses = {value for value in retry_on if isinstance(value, str)}
+
+    @classmethod
+    def from_task(cls, task: Dict[str, Any]) -> 'RetryPolicy':
+        """根据任务配置创建重试策略"""
+        return cls(task.get('max_retries'), task.get('backoff_base'), task.get('backoff_max'), task.get('retry_on'))
+
+    @staticmethod
+    def parse_retry_on(value: Optional[str]) -> Optional[List[Union[int, str]]]:
+        """解析逗号分隔的retry_on配置，数字解析为退出码，其余作为执行状态
+
+        例如 "1,2,timeout" 解析为 [1, 2, 'timeout']
+        """
+        if not value:
+            return None
+        items = []
+        for item in value.split(','):
+            item = item.strip()
+            if not item:
+                continue
+            try:
+                items.append(int(item))
+            except ValueError:
+                items.append(item)
+        return items or None
+
+    def should_retry(self, status: str, exit_code: Optional[int], attempt: int) -> bool:
+        """判断一次执行结束后是否需要重试
+
+        Args:
+            status: 执行的结束状态
+            exit_code: 进程退出码
+            attempt: 刚结束的是第几次尝试，从1开始
+
+        Returns:
+            bool: 是否需要重试
+        """
+        if attempt > self.max_retries:
+            return False
+        if status in (ExitClassifier.COMPLETED, ExitClassifier.STOPPED, ExitClassifier.CACHED):
+            return False
+        if exit_code is not None and exit_code in self.retry_exit_codes:
+            return True
+        return status in self.retry_statuses
+
+    def next_delay(self, attempt: int) -> float:
+        """计算第attempt次尝试结束后，下一次重试前的等待秒数"""
+        delay = min(self.backoff_max, self.backoff_base * (2**(attempt - 1)))
+        return random.uniform(delay / 2, delay)
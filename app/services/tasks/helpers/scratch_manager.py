@@ -0,0 +1,198 @@
+import os
+import shutil
+import logging
+import tempfile
+import threading
+import subprocess
+from typing import Dict, Any, Optional
+
+try:
+    import fcntl
+    HAS_FCNTL = True
+except ImportError:
+    HAS_FCNTL = False
+
+
+class ScratchManager:
+    """为每次执行创建临时工作目录（scratch目录），执行结束后统计占用并删除
+
+    目录通过FIDLTER_SCRATCH和TMPDIR环境变量传给任务，任务的临时文件不再写入脚本目录。
+    配置了tmpfs大小时，目录挂载为限定大小的tmpfs（需要挂载权限），否则使用普通目录
+
+    根目录可能被多个服务实例共享，每个实例使用自己的instance-<pid>子目录，并在运行期间持有其中锁文件的flock。
+    启动时只清理锁已释放（所属实例已退出）的实例目录
+    """
+
+    # scratch目录的根目录，可以通过环境变量覆盖
+    ROOT_ENV = "FIDLTER_SCRATCH_ROOT"
+    DEFAULT_ROOT_NAME = "fidlter-scratch"
+
+    DIR_PREFIX = "exec-"
+    INSTANCE_PREFIX = "instance-"
+    LOCK_FILE = ".lock"
+
+    def __init__(self, root: Optional[str] = None):
+        """初始化scratch目录管理器
+
+        Args:
+            root: scratch目录的根目录（可选），默认读取FIDLTER_SCRATCH_ROOT环境变量，
+                  或使用系统临时目录下的fidlter-scratch目录，本实例的目录创建在其下的instance-<pid>中
+        """
+        self.logger = logging.getLogger("ScratchManager")
+        self.lock = threading.Lock()
+        self.base_root = root or os.environ.get(self.ROOT_ENV) or \
+            os.path.join(tempfile.gettempdir(), self.DEFAULT_ROOT_NAME)
+        # 本实例的scratch目录都创建在自己的实例目录下
+        self.root = os.path.join(self.base_root, f"{self.INSTANCE_PREFIX}{os.getpid()}")
+        self._scratches = {}  # 执行ID -> scratch目录信息
+        self._cleanup_stale()
+        self._instance_lock = self._acquire_instance()
+
+    def create(self, execution_id: str, tmpfs_size_mb: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """为一次执行创建scratch目录
+
+        Args:
+            execution_id: 执行ID
+            tmpfs_size_mb: tmpfs的大小上限(MB)，为None时使用普通目录
+
+        Returns:
+            Optional[Dict[str, Any]]: 包含path、mode（tmpfs或directory）和size_limit_mb，创建失败时返回None
+        """
+        path = os.path.join(self.root, f"{self.DIR_PREFIX}{execution_id}")
+        try:
+            os.makedirs(path, mode=0o700, exist_ok=True)
+        except OSError as e:
+            self.logger.warning(f"创建执行 {execution_id} 的scratch目录失败: {str(e)}")
+            return None
+
+        mode = 'directory'
+        if tmpfs_size_mb:
+            if self._mount_tmpfs(path, tmpfs_size_mb):
+                mode = 'tmpfs'
+            else:
+                self.logger.warning(f"无法为执行 {execution_id} 挂载tmpfs，scratch目录使用普通目录，大小上限不生效")
+
+        scratch = {'path': path, 'mode': mode, 'size_limit_mb': tmpfs_size_mb if mode == 'tmpfs' else None}
+        with self.lock:
+            self._scratches[execution_id] = scratch
+        return scratch
+
+    def get(self, execution_id: str) -> Optional[Dict[str, Any]]:
+        """获取执行的scratch目录信息"""
+        with self.lock:
+            return self._scratches.get(execution_id)
+
+    def get_environment(self, execution_id: str) -> Dict[str, str]:
+        """获取指向scratch目录的环境变量，没有scratch目录时返回空字典"""
+        scratch = self.get(execution_id)
+        if not scratch:
+            return {}
+        return {'FIDLTER_SCRATCH': scratch['path'], 'TMPDIR': scratch['path'], 'TMP': scratch['path'],
+                'TEMP': scratch['path']}
+
+    def measure(self, execution_id: str) -> Optional[Dict[str, Any]]:
+        """统计scratch目录的占用，用于写入执行记录
+
+        Returns:
+            Optional[Dict[str, Any]]: scratch目录信息加上usage_bytes（实际占用的块大小）和files，
+                                      没有scratch目录时返回None
+        """
+        scratch = self.get(execution_id)
+        if not scratch:
+            return None
+
+        usage_bytes = 0
+        files = 0
+        for root, dirs, names in os.walk(scratch['path']):
+            for name in names:
+                try:
+                    stat = os.lstat(os.path.join(root, name))
+                except OSError:
+                    continue
+                usage_bytes += stat.st_blocks * 512
+                files += 1
+        return {**scratch, 'usage_bytes': usage_bytes, 'files': files}
+
+    def remove(self, execution_id: str) -> None:
+        """卸载并删除执行的scratch目录"""
+        with self.lock:
+            scratch = self._scratches.pop(execution_id, None)
+        if scratch:
+            self._remove_path(scratch['path'])
+
+    def _cleanup_stale(self) -> None:
+        """删除已退出的实例遗留的scratch目录（服务异常退出时未能清理），仍在运行的实例的目录不受影响"""
+        if not HAS_FCNTL:
+            return
+        try:
+            names = os.listdir(self.base_root)
+        except OSError:
+            return
+        for name in names:
+            instance_dir = os.path.join(self.base_root, name)
+            if not name.startswith(self.INSTANCE_PREFIX) or not os.path.isdir(instance_dir):
+                continue
+            lock_fd = self._lock_instance(instance_dir)
+            if lock_fd is None:
+                continue  # 所属实例仍在运行
+            try:
+                for scratch_name in os.listdir(instance_dir):
+                    if scratch_name.startswith(self.DIR_PREFIX):
+                        self._remove_path(os.path.join(instance_dir, scratch_name))
+                shutil.rmtree(instance_dir, ignore_errors=True)
+                self.logger.info(f"清理了已退出实例遗留的scratch目录 {instance_dir}")
+            except OSError as e:
+                self.logger.warning(f"清理遗留的scratch目录 {instance_dir} 失败: {str(e)}")
+            finally:
+                os.close(lock_fd)
+
+    def _acquire_instance(self) -> Optional[int]:
+        """创建本实例的目录并持有其锁文件，返回锁文件的描述符，进程退出时锁自动释放"""
+        try:
+            os.makedirs(self.root, mode=0o700, exist_ok=True)
+        except OSError as e:
+            self.logger.warning(f"创建scratch实例目录 {self.root} 失败: {str(e)}")
+            return None
+        if not HAS_FCNTL:
+            return None
+        lock_fd = self._lock_instance(self.root)
+        if lock_fd is None:
+            self.logger.warning(f"无法锁定scratch实例目录 {self.root}，其他实例启动时可能会清理它")
+        return lock_fd
+
+    def _lock_instance(self, instance_dir: str) -> Optional[int]:
+        """以非阻塞方式锁定实例目录的锁文件，锁被其他进程持有或无法打开时返回None"""
+        try:
+            lock_fd = os.open(os.path.join(instance_dir, self.LOCK_FILE), os.O_RDWR | os.O_CREAT, 0o600)
+        except OSError:
+            return None
+        try:
+            fcntl.flock(lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(lock_fd)
+            return None
+        return lock_fd
+
+    def _remove_path(self, path: str) -> None:
+        if os.path.ismount(path):
+            result = subprocess.run(["umount", path], capture_output=True)
+            if result.returncode != 0:
+                # 仍有进程占用时延迟卸载
+                subprocess.run(["umount", "-l", path], capture_output=True)
+        shutil.rmtree(path, ignore_errors=True)
+
+    def _mount_tmpfs(self, path: str, size_mb: int) -> bool:
+        """在path上挂载限定大小的tmpfs"""
+        try:
+            result = subprocess.run(
+                ["mount", "-t", "tmpfs", "-o", f"size={int(size_mb)}m,mode=0700,nosuid,nodev", "tmpfs", path],
+                capture_output=True,
+                text=True,
+                timeout=10)
+        except (OSError, subprocess.SubprocessError) as e:
+            self.logger.debug(f"挂载tmpfs失败: {str(e)}")
+            return False
+        if result.returncode != 0:
+            self.logger.debug(f"挂载tmpfs失败: {result.stderr.strip()}")
+            return False
+        return True
@@ -1,5 +1,9 @@
+import os
 import logging
-from typing import Dict, Any, Union, Optional
+from typing import Dict, Any, List, Union, Optional
+
+from .data_cache import DataCache
+from .exit_classifier import ExitClassifier
 
 
 class TaskValidator:
@@ -89,3 +93,203 @@ class TaskValidator:
             }
 
         return {"success": True}
+
+    def validate_resource_limits(self, cpu_limit: Optional[float], pids_limit: Optional[int],
+                                 io_read_bps: Optional[int], io_write_bps: Optional[int]) -> Dict[str, Any]:
+        """验证cgroup资源限制参数
+
+        Args:
+            cpu_limit: CPU限制（核数，可以是小数）
+            pids_limit: 进程/线程数上限
+            io_read_bps: 磁盘读取速率上限（字节/秒）
+            io_write_bps: 磁盘写入速率上限（字节/秒）
+
+        Returns:
+            Dict[str, Any]: 验证结果，包含success字段和错误信息（如果有）
+        """
+        numeric_limits = [("cpu_limit", cpu_limit, float), ("pids_limit", pids_limit, int),
+                          ("io_read_bps", io_read_bps, int), ("io_write_bps", io_write_bps, int)]
+        for name, value, cast in numeric_limits:
+            if value is None:
+                continue
+            try:
+                if cast(value) <= 0:
+                    return {
+                        "success": False,
+                        "error": f"{name} must be a positive number",
+                        "message": f"Please provide a valid {name} value"
+                    }
+            except (TypeError, ValueError):
+                return {
+                    "success": False,
+                    "error": f"Invalid {name} value",
+                    "message": f"{name} must be a valid number"
+                }
+
+        return {"success": True}
+
+    def validate_timeouts(self, timeout_seconds: Optional[float], idle_output_timeout: Optional[float]) -> Dict[str, Any]:
+        """验证执行超时和卡死检测参数
+
+        Args:
+            timeout_seconds: 单次执行的最长运行时间（秒）
+            idle_output_timeout: 无输出且CPU空闲的最长时间（秒）
+
+        Returns:
+            Dict[str, Any]: 验证结果，包含success字段和错误信息（如果有）
+        """
+        for name, value in (("timeout_seconds", timeout_seconds), ("idle_output_timeout", idle_output_timeout)):
+            if value is None:
+                continue
+            try:
+                if float(value) <= 0:
+                    return {
+                        "success": False,
+                        "error": f"{name} must be a positive number",
+                        "message": f"Please provide a valid {name} value"
+                    }
+            except (TypeError, ValueError):
+                return {
+                    "success": False,
+                    "error": f"Invalid {name} value",
+                    "message": f"{name} must be a valid number"
+                }
+
+        return {"success": True}
+
+    def validate_retry_policy(self, max_retries: Optional[int], backoff_base: Optional[float],
+                              backoff_max: Optional[float], retry_on: Optional[List[Union[int, str]]]) -> Dict[str, Any]:
+        """验证重试策略参数
+
+        Args:
+            max_retries: 最大重试次数
+            backoff_base: 重试退避的基础秒数
+            backoff_max: 重试退避的上限秒数
+            retry_on: 需要重试的退出码或执行状态列表
+
+        Returns:
+            Dict[str, Any]: 验证结果，包含success字段和错误信息（如果有）
+        """
+        for name, value in (("max_retries", max_retries), ("backoff_base", backoff_base), ("backoff_max", backoff_max)):
+            if value is not None and value < 0:
+                return {
+                    "success": False,
+                    "error": f"{name} must not be negative",
+                    "message": f"Please provide a valid {name} value"
+                }
+
+        if backoff_base is not None and backoff_max is not None and backoff_max < backoff_base:
+            return {
+                "success": False,
+                "error": "backoff_max must not be less than backoff_base",
+                "message": "Please provide a valid backoff range"
+            }
+
+        # 跳过的执行不会触发重试
+        retryable_statuses = tuple(status for status in ExitClassifier.TERMINAL_STATUSES
+                                   if status != ExitClassifier.CACHED)
+        invalid_statuses = [
+            item for item in (retry_on or []) if isinstance(item, str) and item not in retryable_statuses
+        ]
+        if invalid_statuses:
+            return {
+                "success": False,
+                "error": f"Invalid retry_on statuses: {', '.join(invalid_statuses)}",
+                "message": f"retry_on must contain exit codes or statuses: {', '.join(retryable_statuses)}"
+            }
+
+        return {"success": True}
+
+    def validate_memoize(self, memoize: bool, memoize_inputs: Optional[List[str]],
+                         memoize_ttl: Optional[float]) -> Dict[str, Any]:
+        """验证记忆化参数
+
+        Args:
+            memoize: 是否开启记忆化
+            memoize_inputs: 需要计入输入指纹的额外文件或目录
+            memoize_ttl: 成功执行的指纹的有效期（秒）
+
+        Returns:
+            Dict[str, Any]: 验证结果，包含success字段和错误信息（如果有）
+        """
+        if not memoize and (memoize_inputs or memoize_ttl is not None):
+            return {
+                "success": False,
+                "error": "memoize_inputs and memoize_ttl require memoize to be enabled",
+                "message": "Please enable memoize or remove the memoize options"
+            }
+
+        if memoize_ttl is not None and memoize_ttl <= 0:
+            return {
+                "success": False,
+                "error": "memoize_ttl must be greater than 0",
+                "message": "Please provide a valid memoize_ttl value"
+            }
+
+        return {"success": True}
+
+    def validate_cpu_affinity(self, cpu_affinity: Optional[List[int]]) -> Dict[str, Any]:
+        """验证CPU亲和性参数，CPU编号必须是当前进程可以使用的CPU
+
+        Args:
+            cpu_affinity: CPU编号列表
+
+        Returns:
+            Dict[str, Any]: 验证结果，包含success字段和错误信息（如果有）
+        """
+        if not cpu_affinity:
+            return {"success": True}
+
+        if not hasattr(os, 'sched_getaffinity'):
+            return {
+                "success": False,
+                "error": "CPU affinity is not supported on this platform",
+                "message": "Please remove the cpu_affinity option"
+            }
+
+        available = os.sched_getaffinity(0)
+        invalid = [cpu for cpu in cpu_affinity if cpu not in available]
+        if invalid:
+            return {
+                "success": False,
+                "error": f"Unavailable CPUs: {', '.join(str(cpu) for cpu in invalid)}",
+                "message": f"cpu_affinity must only contain available CPUs: {', '.join(str(cpu) for cpu in sorted(available))}"
+            }
+
+        return {"success": True}
+
+    def validate_scratch(self, scratch_tmpfs_mb: Optional[int]) -> Dict[str, Any]:
+        """验证scratch目录参数
+
+        Args:
+            scratch_tmpfs_mb: scratch目录挂载为tmpfs时的大小上限（MB）
+
+        Returns:
+            Dict[str, Any]: 验证结果，包含success字段和错误信息（如果有）
+        """
+        if scratch_tmpfs_mb is not None and scratch_tmpfs_mb <= 0:
+            return {
+                "success": False,
+                "error": "scratch_tmpfs_mb must be a positive number",
+                "message": "Please provide a valid scratch_tmpfs_mb value"
+            }
+
+        return {"success": True}
+
+    def validate_cache_namespace(self, cache_namespace: Optional[str]) -> Dict[str, Any]:
+        """验证共享数据缓存的命名空间名称
+
+        Args:
+            cache_namespace: 命名空间名称
+
+        Returns:
+            Dict[str, Any]: 验证结果，包含success字段和错误信息（如果有）
+        """
+        if cache_namespace is not None and not DataCache.is_valid_shared_name(cache_namespace):
+            return {
+                "success": False,
+                "error": f"Invalid cache namespace: {cache_namespace}",
+                "message": "cache_namespace may only contain letters, digits, '.', '_' and '-' (at most 64 characters)"
+            }
+
+        return {"success": True}
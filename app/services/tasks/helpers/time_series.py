@@ -0,0 +1,191 @@
+from typing import Dict, Any, Iterable, Iterator, Optional, Tuple
+
+
+class SamplingPolicy:
+    """自适应采样策略：执行初期密集采样，随运行时间增长逐步降低采样频率"""
+
+    # (运行时长上限(秒), 采样间隔(秒))，上限为None表示之后一直使用该间隔
+    DEFAULT_TIERS = ((60, 0.5), (600, 1.0), (3600, 5.0), (None, 15.0))
+
+    def __init__(self, tiers: Optional[Iterable[Tuple[Optional[float], float]]] = None):
+        """初始化采样策略
+
+        Args:
+            tiers: 分段采样间隔配置，按运行时长上限升序排列
+        """
+        self.tiers = tuple(tiers) if tiers else self.DEFAULT_TIERS
+
+    @property
+    def initial_interval(self) -> float:
+        """执行开始时的采样间隔"""
+        return self.tiers[0][1]
+
+    def interval(self, elapsed: float) -> float:
+        """根据已运行时长获取下一次采样的间隔
+
+        Args:
+            elapsed: 执行已运行的秒数
+
+        Returns:
+            float: 采样间隔（秒）
+        """
+        for limit, interval in self.tiers:
+            if limit is None or elapsed < limit:
+                return interval
+        return self.tiers[-1][1]
+
+
+class ResourceSeries:
+    """固定容量的分桶时间序列，对执行记录中的资源序列进行流式降采样
+
+    序列按执行开始后的时间切分为等宽的桶，每个桶保存区间内的最小值、最大值和平均值。
+    桶数量达到容量上限时，相邻两个桶合并、桶宽翻倍，因此无论执行运行多久，
+    每次执行占用的内存都是有界的，同时峰值不会在降采样中丢失。
+
+    序列数据直接保存在可JSON序列化的字典中，便于随执行记录一起持久化：
+    {
+        'interval': 桶宽(秒),
+        'capacity': 桶数量上限,
+        'counts': [每个桶的样本数],
+        'series': {字段: {'min': [...], 'max': [...], 'avg': [...]}}
+    }
+    """
+
+    DEFAULT_CAPACITY = 720
+
+    def __init__(self, data: Dict[str, Any]):
+        """包装已有的序列数据
+
+        Args:
+            data: 由create()创建或从执行记录中读取的序列数据
+        """
+        self.data = data
+
+    @classmethod
+    def create(cls, fields: Iterable[str], interval: float, capacity: int = DEFAULT_CAPACITY) -> Dict[str, Any]:
+        """创建空的序列数据
+
+        Args:
+            fields: 需要记录的字段名
+            interval: 初始桶宽（秒），通常等于初始采样间隔
+            capacity: 桶数量上限
+
+        Returns:
+            Dict[str, Any]: 序列数据
+        """
+        return {
+            'interval': interval,
+            'capacity': capacity,
+            'counts': [],
+            'series': {field: {'min': [], 'max': [], 'avg': []} for field in fields}
+        }
+
+    def add(self, elapsed: float, sample: Dict[str, float]) -> None:
+        """添加一次采样
+
+        Args:
+            elapsed: 采样时刻相对执行开始的秒数
+            sample: 字段到采样值的映射
+        """
+        data = self.data
+        index = int(max(elapsed, 0) // data['interval'])
+        while index >= data['capacity']:
+            self._compact()
+            index = int(max(elapsed, 0) // data['interval'])
+
+        counts = data['counts']
+        series = data['series']
+        while len(counts) <= index:
+            counts.append(0)
+            for buckets in series.values():
+                buckets['min'].append(None)
+                buckets['max'].append(None)
+                buckets['avg'].append(None)
+
+        counts[index] += 1
+        count = counts[index]
+        for field, value in sample.items():
+            buckets = series.get(field)
+            if buckets is None or value is None:
+                continue
+            if count == 1 or buckets['avg'][index] is None:
+                buckets['min'][index] = value
+                buckets['max'][index] = value
+                buckets['avg'][index] = value
+            else:
+                buckets['min'][index] = min(buckets['min'][index], value)
+                buckets['max'][index] = max(buckets['max'][index], value)
+                buckets['avg'][index] += (value - buckets['avg'][index]) / count
+
+    def _compact(self) -> None:
+        """将相邻两个桶合并为一个，桶宽翻倍"""
+        data = self.data
+        data['counts'], merged = self._merge(data['counts'], data['series'], 2)
+        for field, buckets in data['series'].items():
+            buckets.update(merged[field])
+        data['interval'] *= 2
+
+    @staticmethod
+    def _merge(counts, series, factor):
+        """将每factor个相邻的桶合并为一个：最小值取最小，最大值取最大，平均值按样本数加权
+
+        Returns:
+            Tuple[List[int], Dict[str, Dict[str, list]]]: 合并后的counts和series
+        """
+        new_counts = [sum(counts[i:i + factor]) for i in range(0, len(counts), factor)]
+        new_series = {}
+        for field, buckets in series.items():
+            merged = {'min': [], 'max': [], 'avg': []}
+            for i in range(0, len(counts), factor):
+                pairs = [(buckets['min'][j], buckets['max'][j], buckets['avg'][j], counts[j])
+                         for j in range(i, min(i + factor, len(counts))) if counts[j] and buckets['avg'][j] is not None]
+                if not pairs:
+                    merged['min'].append(None)
+                    merged['max'].append(None)
+                    merged['avg'].append(None)
+                    continue
+                total = sum(p[3] for p in pairs)
+                merged['min'].append(min(p[0] for p in pairs))
+                merged['max'].append(max(p[1] for p in pairs))
+                merged['avg'].append(sum(p[2] * p[3] for p in pairs) / total)
+            new_series[field] = merged
+        return new_counts, new_series
+
+    def downsample(self, points: int, fields: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """将序列降采样到最多points个桶，返回新的序列数据，不修改原序列
+
+        每ceil(桶数 / points)个相邻的桶合并为一个，保留区间内的最小值和最大值，峰值不会因降采样丢失
+
+        Args:
+            points: 最多返回的桶数
+            fields: 只返回这些字段，默认返回全部字段
+
+        Returns:
+            Dict[str, Any]: 与序列数据格式相同的字典（不含capacity），interval为降采样后的桶宽
+        """
+        data = self.data
+        series = {field: buckets for field, buckets in data['series'].items() if fields is None or field in fields}
+        factor = max(1, -(-len(data['counts']) // points))
+        counts, merged = self._merge(data['counts'], series, factor)
+        return {'interval': data['interval'] * factor, 'counts': counts, 'series': merged}
+
+    def points(self, field: str, stat: str = 'avg') -> Iterator[Tuple[float, float]]:
+        """遍历某个字段的非空数据点
+
+        Args:
+            field: 字段名
+            stat: 'min'、'max'或'avg'
+
+        Returns:
+            Iterator[Tuple[float, float]]: (相对执行开始的秒数, 值)
+        """
+        buckets = self.data['series'].get(field)
+        if not buckets:
+            return
+        interval = self.data['interval']
+        for index, value in enumerate(buckets[stat]):
+            if value is not None:
+                yield index * interval, value
+
+    def __len__(self) -> int:
+        return len(self.data['counts'])
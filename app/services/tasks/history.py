@@ -1,22 +1,60 @@
+import os
+import copy
+import json
 import threading
 import logging
-from datetime import datetime, timedelta
+from datetime import datetime
 
 from ...utils.persistence import DataPersistence
+from .helpers.execution_summary import ExecutionSummary
+from .helpers.log_broadcaster import LogBroadcaster
+from .helpers.log_index import LogSearchIndex
+from .helpers.log_store import LogStore
+from .helpers.retention_policy import RetentionPolicy
+from .helpers.time_series import ResourceSeries
 
 
 class TaskHistory:
-    """负责管理任务执行历史记录"""
+    """负责管理任务执行历史记录
+
+    内存中只保存执行记录的摘要（ExecutionSummary），运行中执行的详情也保存在内存中，
+    执行结束后详情写入单独的文件，读取完整记录时再加载
+    """
+
+    # 执行中的状态，处于这些状态的执行记录为任务的当前执行
+    ACTIVE_STATUSES = ('running', 'paused')
 
     def __init__(self):
-        self.task_history = {}  # 存储任务的历史执行记录 {task_id: [execution_records]}
+        self.task_history = {}  # 存储任务的执行记录摘要 {task_id: [ExecutionSummary]}
+        # 执行ID到摘要的索引，与task_history中的列表共享同一个摘要对象 {execution_id: (task_id, summary)}
+        self.records_by_id = {}
+        self.active_execution_ids = {}  # 任务当前执行的ID {task_id: execution_id}
+        self.active_details = {}  # 运行中或暂停的执行的详情 {execution_id: details}
+        # 串行化执行详情文件的读写，需要同时持有时先获取self.lock
+        self.details_lock = threading.Lock()
+        self.log_broadcaster = LogBroadcaster()  # 将运行中执行的新日志推送给实时日志的订阅者
+        # 运行中执行的日志锁，写日志文件和推送订阅者不占用全局锁 {execution_id: Lock}
+        self.log_locks = {}
         self.lock = threading.Lock()
         self.logger = logging.getLogger("TaskHistory")
         self.persistence = DataPersistence()
+        # 执行日志以文件保存，不再放在执行记录中
+        self.log_store = LogStore(os.path.join(DataPersistence.DATA_DIR, DataPersistence.LOGS_DIR))
+        # 执行结束后在后台建立日志的全文索引
+        self.log_index = LogSearchIndex(
+            os.path.join(DataPersistence.DATA_DIR, DataPersistence.LOGS_DIR, DataPersistence.LOG_INDEX_FILE),
+            self.log_store)
 
         # 从持久化存储加载历史记录
         self._load_from_persistence()
 
+        # 后台线程按保留策略定期清理执行历史，读取历史记录的接口不触发清理
+        self.retention = RetentionPolicy(self.persistence)
+        self.last_retention = None  # 最近一次清理的结果
+        self._retention_stop = threading.Event()
+        self._retention_thread = threading.Thread(target=self._run_retention, name="fidlter-retention", daemon=True)
+        self._retention_thread.start()
+
     def _load_from_persistence(self):
         """从持久化存储加载历史记录"""
         try:
@@ -25,22 +63,97 @@ class TaskHistory:
 
             # 只在更新共享数据时持有锁
             if all_histories:
+                migrated_task_ids = self._migrate_inline_logs(all_histories)
+                summaries, active_details, split_task_ids = self._split_records(all_histories)
                 with self.lock:
-                    self.task_history = all_histories
+                    self.task_history = summaries
+                    self.active_details = active_details
+                    self._rebuild_index()
                 self.logger.info(f"从持久化存储加载了 {len(all_histories)} 条任务历史记录")
+
+                for task_id in set(migrated_task_ids) | set(split_task_ids):
+                    self._save_to_persistence(task_id)
+                if migrated_task_ids:
+                    self.logger.info(f"已将 {len(migrated_task_ids)} 个任务执行记录中的日志迁移到日志文件")
+                if split_task_ids:
+                    self.logger.info(f"已将 {len(split_task_ids)} 个任务执行记录中的详情迁移到执行详情文件")
         except Exception as e:
             self.logger.error(f"从持久化存储加载任务历史记录失败: {str(e)}")
 
+        # 补全尚未索引的已结束执行并压缩尚未压缩的日志，已清理的执行的索引由保留策略清理时删除
+        with self.lock:
+            finished = [(task_id, summary.execution_id, summary.status, summary.start_time)
+                        for task_id, summaries in self.task_history.items() for summary in summaries
+                        if summary.execution_id and summary.status not in self.ACTIVE_STATUSES]
+        self.log_index.sync(finished)
+        for task_id, execution_id, _, _ in finished:
+            if self.log_store.get_compression(task_id, execution_id) is None and \
+                    self.log_store.exists(task_id, execution_id):
+                self.log_store.schedule_compression(task_id, execution_id)
+
+    def _migrate_inline_logs(self, all_histories):
+        """将旧版本保存在执行记录中的日志写入日志文件，并从记录中移除日志字段
+
+        返回:
+            记录被修改的任务ID列表
+        """
+        migrated_task_ids = []
+        for task_id, records in all_histories.items():
+            migrated = False
+            for record in records:
+                if not any(field in record for field in ('logs', 'stdout', 'stderr')):
+                    continue
+                logs = record.pop('logs', '')
+                record.pop('stdout', None)
+                record.pop('stderr', None)
+                execution_id = record.get('execution_id')
+                if logs and execution_id and not self.log_store.exists(task_id, execution_id):
+                    self.log_store.append(task_id, execution_id, logs, record_time=False)
+                    self.log_store.close(execution_id)
+                migrated = True
+            if migrated:
+                migrated_task_ids.append(task_id)
+        return migrated_task_ids
+
+    def _split_records(self, all_histories):
+        """将加载的执行记录拆分为摘要和详情
+
+        旧版本的记录包含详情字段，详情写入执行详情文件；运行中或暂停的执行的详情保留在内存中
+
+        返回:
+            (任务ID到摘要列表的映射, 执行ID到运行中执行详情的映射, 记录被拆分的任务ID列表)
+        """
+        summaries = {}
+        active_details = {}
+        split_task_ids = []
+        for task_id, records in all_histories.items():
+            summaries[task_id] = []
+            split = False
+            for record in records:
+                summary, details = ExecutionSummary.split(record)
+                summaries[task_id].append(summary)
+                execution_id = summary.execution_id
+                if execution_id is None:
+                    continue
+                if details:
+                    self.persistence.save_execution_details(task_id, execution_id, details)
+                    split = True
+                if summary.status in self.ACTIVE_STATUSES:
+                    active_details[execution_id] = details or \
+                        self.persistence.load_execution_details(task_id, execution_id) or {}
+            if split:
+                split_task_ids.append(task_id)
+        return summaries, active_details, split_task_ids
+
     def _save_to_persistence(self, task_id):
-        """将特定任务的历史记录保存到持久化存储"""
+        """将特定任务的执行记录摘要保存到持久化存储"""
         try:
             # 在锁内复制数据，在锁外执行I/O操作
             history_data = None
 
             with self.lock:
                 if task_id in self.task_history:
-                    # 创建深拷贝以避免在I/O操作期间发生变化
-                    history_data = [record.copy() for record in self.task_history[task_id]]
+                    history_data = [summary.to_dict() for summary in self.task_history[task_id]]
 
             # 锁外执行可能耗时的操作
             if history_data is not None:
@@ -52,139 +165,471 @@ class TaskHistory:
         except Exception as e:
             self.logger.error(f"保存任务 {task_id} 的历史记录时出错: {str(e)}")
 
+    def _rebuild_index(self):
+        """根据task_history重建执行ID索引和当前执行指针，调用方需持有锁"""
+        self.records_by_id = {}
+        self.active_execution_ids = {}
+        for task_id, summaries in self.task_history.items():
+            for summary in summaries:
+                self._index_record(task_id, summary)
+
+    def _index_record(self, task_id, summary):
+        """将摘要加入索引并更新任务的当前执行指针，调用方需持有锁"""
+        execution_id = summary.execution_id
+        if execution_id is None:
+            return
+        self.records_by_id[execution_id] = (task_id, summary)
+        self._update_active_execution(task_id, summary)
+
+    def _update_active_execution(self, task_id, summary):
+        """根据摘要中的状态设置或清除任务的当前执行指针，调用方需持有锁"""
+        execution_id = summary.execution_id
+        if summary.status in self.ACTIVE_STATUSES:
+            self.active_execution_ids[task_id] = execution_id
+            if not self.log_broadcaster.is_open(execution_id):
+                self.log_broadcaster.open(execution_id, self.log_store.get_size(task_id, execution_id))
+        else:
+            if self.active_execution_ids.get(task_id) == execution_id:
+                del self.active_execution_ids[task_id]
+            self.log_broadcaster.close(execution_id)
+            self.log_store.close(execution_id)
+
+    def _unindex_record(self, task_id, summary):
+        """将记录从索引中移除，调用方需持有锁"""
+        execution_id = summary.execution_id
+        self.records_by_id.pop(execution_id, None)
+        self.active_details.pop(execution_id, None)
+        self.log_locks.pop(execution_id, None)
+        if self.active_execution_ids.get(task_id) == execution_id:
+            del self.active_execution_ids[task_id]
+        self.log_broadcaster.close(execution_id)
+        self.log_store.close(execution_id)
+
+    def _find_record(self, task_id, execution_id):
+        """通过索引查找执行记录的摘要，记录不属于该任务时返回None，调用方需持有锁"""
+        entry = self.records_by_id.get(execution_id)
+        if entry is None or entry[0] != task_id:
+            return None
+        return entry[1]
+
+    @staticmethod
+    def _copy_record(record):
+        """复制执行详情，资源序列会在采样时原地更新，需要单独深拷贝"""
+        record_copy = record.copy()
+        if record_copy.get('resource_series'):
+            record_copy['resource_series'] = copy.deepcopy(record_copy['resource_series'])
+        return record_copy
+
+    def _write_details(self, task_id, execution_id, details=None, updates=None):
+        """保存执行详情，或将updates合并到已保存的详情中，调用方需持有details_lock"""
+        if details is None:
+            details = self.persistence.load_execution_details(task_id, execution_id) or {}
+            details.update(updates)
+        if not self.persistence.save_execution_details(task_id, execution_id, details):
+            self.logger.warning(f"执行 {execution_id} 的详情保存失败")
+
     def add_execution_record(self, task_id, execution_record):
-        """添加一条执行记录"""
+        """添加一条执行记录
+
+        记录中的logs字段作为日志的初始内容写入日志文件，不保存在记录中
+        """
         # 创建执行记录的副本以确保线程安全
         record_copy = execution_record.copy()
-
-        # 确保记录中包含logs、stdout和stderr字段
-        if 'logs' not in record_copy:
-            record_copy['logs'] = ''
-        if 'stdout' not in record_copy:
-            record_copy['stdout'] = ''
-        if 'stderr' not in record_copy:
-            record_copy['stderr'] = ''
+        initial_logs = record_copy.pop('logs', '')
+        summary, details = ExecutionSummary.split(record_copy)
+        execution_id = summary.execution_id
+        active = summary.status in self.ACTIVE_STATUSES
 
         with self.lock:
             if task_id not in self.task_history:
                 self.task_history[task_id] = []
-            self.task_history[task_id].append(record_copy)
+            self.task_history[task_id].append(summary)
+            if active:
+                # 运行中的详情保存在内存中，资源采样原地更新
+                self.active_details[execution_id] = details
+                details = self._copy_record(details)
+                # 日志时间以执行记录创建的时刻为起点
+                self.log_store.start_timeline(task_id, execution_id)
+            if initial_logs:
+                self.log_store.append(task_id, execution_id, initial_logs)
+            self._index_record(task_id, summary)
+            # 在锁内获取details_lock，保证详情文件按更新的顺序写入
+            if details:
+                self.details_lock.acquire()
+
+        if details:
+            try:
+                self._write_details(task_id, execution_id, details)
+            finally:
+                self.details_lock.release()
+
+        # 直接以结束状态写入的记录（如跳过执行）立即建立日志索引并安排压缩
+        if not active:
+            self.log_index.index_execution(task_id, execution_id, summary.status, summary.start_time)
+            self.log_store.schedule_compression(task_id, execution_id)
 
         # 保存到持久化存储（锁外执行）
         self._save_to_persistence(task_id)
 
     def update_execution_record(self, task_id, execution_id, updates):
-        """更新执行记录的特定字段"""
-        updated = False
+        """更新执行记录的特定字段
 
+        摘要字段在内存中更新；详情字段在执行运行中时更新内存中的详情，执行结束后合并到详情文件中。
+        执行结束时内存中的详情写入详情文件并从内存中移除
+        """
         # 创建更新字段的副本
         updates_copy = updates.copy()
+        detail_updates = {field: value for field, value in updates_copy.items()
+                          if field not in ExecutionSummary.FIELDS}
+        details_to_write = None
 
         with self.lock:
-            if task_id in self.task_history:
-                for record in self.task_history[task_id]:
-                    if record.get('execution_id') == execution_id:
-                        record.update(updates_copy)
-                        updated = True
-                        break
+            summary = self._find_record(task_id, execution_id)
+            if summary is None:
+                return
+            summary.update(updates_copy)
+            details = self.active_details.get(execution_id)
+            if details is not None:
+                details.update(detail_updates)
+                if summary.status not in self.ACTIVE_STATUSES:
+                    # 执行已结束，详情不再被采样修改
+                    details_to_write = self.active_details.pop(execution_id)
+                    self.log_locks.pop(execution_id, None)
+                elif detail_updates:
+                    details_to_write = self._copy_record(details)
+            if 'status' in updates_copy:
+                self._update_active_execution(task_id, summary)
+                # 执行结束后日志不再增长，建立日志索引并安排压缩
+                if summary.status not in self.ACTIVE_STATUSES:
+                    self.log_index.index_execution(task_id, execution_id, summary.status, summary.start_time)
+                    self.log_store.schedule_compression(task_id, execution_id)
+            # 在锁内获取details_lock，保证详情文件按更新的顺序写入
+            write_details = details_to_write is not None or (details is None and detail_updates)
+            if write_details:
+                self.details_lock.acquire()
+
+        if write_details:
+            try:
+                self._write_details(task_id, execution_id, details_to_write, detail_updates)
+            finally:
+                self.details_lock.release()
 
-        # 如果成功更新了记录，保存到持久化存储（锁外执行）
-        if updated:
-            self._save_to_persistence(task_id)
+        # 保存到持久化存储（锁外执行）
+        self._save_to_persistence(task_id)
 
     def get_execution_record(self, task_id, execution_id):
-        """获取特定执行记录"""
+        """获取完整的执行记录，执行已结束时从详情文件加载详情
+
+        只需要状态、时间和资源汇总等摘要字段时使用get_execution_summary，不读取文件
+        """
+        details = self.get_execution_details(task_id, execution_id)
+        if details is None:
+            return None
         with self.lock:
-            if task_id in self.task_history:
-                for record in self.task_history[task_id]:
-                    if record.get('execution_id') == execution_id:
-                        # 返回记录的副本以确保线程安全
-                        return record.copy()
-        return None
+            summary = self._find_record(task_id, execution_id)
+            if summary is None:
+                return None
+            return {**details, **summary.to_dict()}
+
+    def get_execution_summary(self, task_id, execution_id):
+        """获取执行记录的摘要，找不到记录时返回None"""
+        with self.lock:
+            summary = self._find_record(task_id, execution_id)
+            return summary.to_dict() if summary is not None else None
+
+    def get_execution_summaries(self, task_id, offset=0, limit=None, statuses=None):
+        """分页获取任务执行记录的摘要，最近的执行在前
+
+        参数:
+            task_id: 任务ID
+            offset: 跳过最近的多少条
+            limit: 最多返回的条数，None表示不限制
+            statuses: 只返回这些状态的执行（可选）
+
+        返回:
+            (符合条件的执行总数, 摘要列表)
+        """
+        with self.lock:
+            summaries = self.task_history.get(task_id, [])
+            if statuses:
+                summaries = [summary for summary in summaries if summary.status in statuses]
+            total = len(summaries)
+            # 摘要按执行的先后顺序保存，从列表末尾向前取一页
+            end = max(total - offset, 0)
+            start = max(end - limit, 0) if limit is not None else 0
+            return total, [summary.to_dict() for summary in reversed(summaries[start:end])]
+
+    def get_execution_details(self, task_id, execution_id):
+        """获取执行详情（执行记录中不属于摘要的字段）
+
+        返回:
+            详情字典，详情已被保留策略删除时为空字典，找不到记录时返回None
+        """
+        with self.lock:
+            summary = self._find_record(task_id, execution_id)
+            if summary is None:
+                return None
+            details = self.active_details.get(execution_id)
+            if details is not None:
+                return self._copy_record(details)
+            # 在锁内获取details_lock，不会读到执行结束时尚未写入的详情
+            self.details_lock.acquire()
+        try:
+            return self.persistence.load_execution_details(task_id, execution_id) or {}
+        finally:
+            self.details_lock.release()
+
+    def subscribe_logs(self, task_id, execution_id):
+        """获取当前日志的字节数，执行仍在运行时同时订阅之后的新日志
+
+        获取字节数和订阅在同一把锁内完成，调用方读取该字节数之前的已有日志，
+        之后的日志由订阅推送，两者之间不会遗漏或重复
 
-    def append_to_execution_log(self, task_id, execution_id, log_line, log_type='logs'):
-        """向执行记录的日志中添加行
-        
         参数:
             task_id: 任务ID
             execution_id: 执行ID
-            log_line: 要添加的日志行
-            log_type: 日志类型，可以是'logs'(默认)、'stdout'或'stderr'
+
+        返回:
+            字典，包含size（当前日志的字节数）和subscription（执行已结束时为None），找不到记录时返回None
         """
-        if not log_line:  # 跳过空日志行
-            return
+        with self.lock:
+            summary = self._find_record(task_id, execution_id)
+            if summary is None:
+                return None
 
-        updated = False
-        log_line_copy = log_line  # 字符串是不可变的，无需复制
+            subscription = None
+            if summary.status in self.ACTIVE_STATUSES:
+                subscription = self.log_broadcaster.subscribe(execution_id)
+            return {'size': self.log_store.get_size(task_id, execution_id), 'subscription': subscription}
 
+    def read_execution_logs(self, task_id, execution_id, **range_args):
+        """按区间读取执行日志
+
+        参数:
+            task_id: 任务ID
+            execution_id: 执行ID
+            range_args: 传给LogStore.read_range的offset、limit、unit、tail、before、start_seconds和end_seconds
+
+        返回:
+            字典，包含logs、start、end和total_size，找不到记录时返回None
+        """
         with self.lock:
-            record = None
-            if task_id in self.task_history:
-                for rec in self.task_history[task_id]:
-                    if rec.get('execution_id') == execution_id:
-                        record = rec
-                        # 确保所有日志字段都存在
-                        for field in ['logs', 'stdout', 'stderr']:
-                            if field not in record:
-                                record[field] = ''
+            if self._find_record(task_id, execution_id) is None:
+                return None
+        return self.log_store.read_range(task_id, execution_id, **range_args)
 
-                        # 添加到指定的日志类型
-                        record[log_type] += log_line_copy
+    def search_logs(self, query, task_id=None, since=None, statuses=None, limit=50):
+        """在已结束执行的日志中搜索文本
 
-                        # 如果是stdout或stderr，也添加到综合日志
-                        if log_type in ['stdout', 'stderr'] and log_type != 'logs':
-                            record['logs'] += log_line_copy
+        参数:
+            query: 要搜索的文本，按子串匹配，至少3个字符
+            task_id: 只搜索该任务的执行（可选）
+            since: 只搜索在该时间之后开始的执行（可选）
+            statuses: 只搜索这些状态的执行（可选）
+            limit: 最多返回的执行数
 
-                        updated = True
-                        break
+        返回:
+            匹配的执行列表，每项包含task_name和匹配行的行号、字节偏移量和片段
+        """
+        results = self.log_index.search(query, task_id=task_id, since=since, statuses=statuses, limit=limit)
+        for result in results:
+            name = self.get_task_name(result['task_id']) if hasattr(self, 'get_task_name') else None
+            result['task_name'] = name or f"Task-{result['task_id']}"
+        return results
+
+    def get_log_storage_stats(self):
+        """获取日志文件和全文索引占用的磁盘空间，以及日志压缩的效果"""
+        stats = self.log_store.get_storage_stats()
+        stats['index_bytes'] = self.log_index.get_size()
+        return stats
+
+    def get_log_tail(self, task_id, execution_id, max_bytes):
+        """读取日志末尾最多max_bytes字节"""
+        size = self.log_store.get_size(task_id, execution_id)
+        return self.log_store.read_text(task_id, execution_id, max(size - max_bytes, 0), size)
+
+    def get_execution_status(self, task_id, execution_id):
+        """获取执行记录的状态，不复制记录，找不到记录时返回None"""
+        with self.lock:
+            summary = self._find_record(task_id, execution_id)
+            return summary.status if summary is not None else None
 
-        # 日志内容更新较频繁，减少写入操作以提高性能
-        # 只有当日志行较长或包含重要内容时才写入
-        if updated and (len(log_line) > 100 or "error" in log_line.lower() or "exception" in log_line.lower()
-                        or "completed" in log_line.lower()):
-            self._save_to_persistence(task_id)
+    def get_active_execution(self, task_id):
+        """获取任务当前执行（运行中或暂停）的ID，没有时返回None"""
+        with self.lock:
+            return self.active_execution_ids.get(task_id)
 
-    def clean_old_records(self):
-        """清理超过一个月的任务执行记录"""
-        one_month_ago = datetime.now() - timedelta(days=30)
+    def append_to_execution_log(self, task_id, execution_id, log_line):
+        """向执行日志中添加内容
 
-        # 需要更新的任务ID列表
-        updated_task_ids = []
-        task_history_copy = {}
+        日志直接追加到日志文件，不修改执行记录，也不需要重新保存历史记录。
+        全局锁只用于查找记录，运行中执行的写文件和推送在该执行自己的锁内进行，
+        不会被保存历史记录、清理和统计等持有全局锁的操作阻塞，文件和订阅者收到的顺序仍然一致
+
+        参数:
+            task_id: 任务ID
+            execution_id: 执行ID
+            log_line: 要添加的日志行
+        """
+        if not log_line:  # 跳过空日志行
+            return
 
-        # 在锁内复制和过滤数据
         with self.lock:
-            # 遍历所有任务
-            for task_id in list(self.task_history.keys()):
-                original_length = len(self.task_history[task_id])
+            if self._find_record(task_id, execution_id) is None:
+                return
+            log_lock = self.log_locks.get(execution_id)
+            if log_lock is None and execution_id in self.active_details:
+                log_lock = self.log_locks[execution_id] = threading.Lock()
+            if log_lock is None:
+                # 已结束的执行偶尔还会追加说明（如停止时升级为SIGKILL），仍在全局锁内写入
+                self.log_store.append(task_id, execution_id, log_line)
+                self.log_broadcaster.publish(execution_id, log_line)
+                return
+
+        # 在同一把锁内写入和发布，保证订阅者收到的日志与文件中的顺序一致
+        with log_lock:
+            self.log_store.append(task_id, execution_id, log_line)
+            self.log_broadcaster.publish(execution_id, log_line)
+
+    def append_resource_sample(self, task_id, execution_id, elapsed, sample):
+        """向执行记录的资源时间序列中追加一次采样
+
+        序列按固定容量流式降采样，单次执行占用的内存有界。资源采样频率较高，
+        只更新内存中的记录，由执行结束时的记录更新统一持久化
 
-                # 过滤掉一个月前的记录
-                filtered_records = [
-                    execution for execution in self.task_history[task_id]
-                    if datetime.strptime(execution['start_time'], '%Y-%m-%d %H:%M:%S') >= one_month_ago
-                ]
+        参数:
+            task_id: 任务ID
+            execution_id: 执行ID
+            elapsed: 采样时刻相对执行开始的秒数
+            sample: 时间序列字段到采样值的映射，如 {'memory_usage': 12.5, 'cpu_usage': 80.0}
+        """
+        with self.lock:
+            details = self.active_details.get(execution_id)
+            if details is not None and self._find_record(task_id, execution_id) is not None:
+                if details.get('resource_series'):
+                    ResourceSeries(details['resource_series']).add(elapsed, sample)
+                return True
+        return False
+
+    def _run_retention(self):
+        """后台线程：启动时和之后每隔retention.interval秒按保留策略清理一次"""
+        while True:
+            try:
+                self.apply_retention()
+            except Exception as e:
+                self.logger.error(f"按保留策略清理执行历史失败: {str(e)}")
+            if self._retention_stop.wait(self.retention.interval):
+                return
+
+    def shutdown(self):
+        """停止后台清理线程"""
+        self._retention_stop.set()
+
+    @staticmethod
+    def _json_size(value):
+        """估算值保存为JSON后的字节数，值在统计期间被修改时返回0"""
+        if not value:
+            return 0
+        try:
+            return len(json.dumps(value, ensure_ascii=False, default=str).encode('utf-8'))
+        except (TypeError, ValueError, RuntimeError):
+            return 0
 
-                # 如果有记录被清理，记录下任务ID
-                if len(filtered_records) < original_length:
-                    self.task_history[task_id] = filtered_records
-                    updated_task_ids.append(task_id)
-                    task_history_copy[task_id] = filtered_records.copy()
+    def apply_retention(self):
+        """按保留策略清理已结束的执行
 
-        # 锁外保存已更新的任务历史记录
+        超出记录限制的执行删除摘要、详情文件、日志文件和日志索引；只超出详情限制的执行保留摘要，
+        删除详情文件、日志文件和日志索引，并在摘要中写入details_removed_at。
+        只在复制候选记录和删除记录时持有锁，统计大小和删除文件都在锁外进行
+
+        返回:
+            字典，包含records_removed、details_removed、bytes_freed和tasks_updated
+        """
+        # 没有策略限制字节数时不统计大小
+        uses_sizes = self.retention.uses_sizes()
+        with self.lock:
+            candidates = [(task_id, summary.execution_id, summary.start_time, summary.details_removed_at is None,
+                           self._json_size(summary.to_dict()) if uses_sizes else 0)
+                          for task_id, summaries in self.task_history.items() for summary in summaries
+                          if summary.execution_id and summary.status not in self.ACTIVE_STATUSES]
+
+        executions = []
+        sizes = {}
+        for task_id, execution_id, start_time, has_details, record_bytes in candidates:
+            details_file_bytes = self.persistence.get_execution_details_size(task_id, execution_id)
+            has_details = has_details and (details_file_bytes > 0 or self.log_store.exists(task_id, execution_id))
+            details_bytes = 0
+            if uses_sizes:
+                details_bytes = self.log_store.get_disk_usage(task_id, execution_id) + details_file_bytes
+            sizes[execution_id] = (record_bytes, details_bytes)
+            executions.append({
+                'task_id': task_id,
+                'execution_id': execution_id,
+                'start_time': start_time,
+                'has_details': has_details,
+                'record_bytes': record_bytes,
+                'details_bytes': details_bytes
+            })
+
+        remove_records, remove_details = self.retention.plan(executions)
+
+        updated_task_ids = []
+        removed_details = []  # 需要删除详情文件和日志文件的 (task_id, execution_id)
+        records_removed = details_removed = bytes_freed = 0
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        if remove_records or remove_details:
+            with self.lock:
+                for task_id, summaries in self.task_history.items():
+                    kept = []
+                    changed = False
+                    for summary in summaries:
+                        execution_id = summary.execution_id
+                        finished = summary.status not in self.ACTIVE_STATUSES
+                        if execution_id in remove_records and finished:
+                            self._unindex_record(task_id, summary)
+                            removed_details.append((task_id, execution_id))
+                            records_removed += 1
+                            bytes_freed += sum(sizes.get(execution_id, (0, 0)))
+                            changed = True
+                            continue
+                        if execution_id in remove_details and finished:
+                            summary.details_removed_at = now
+                            removed_details.append((task_id, execution_id))
+                            details_removed += 1
+                            bytes_freed += sizes.get(execution_id, (0, 0))[1]
+                            changed = True
+                        kept.append(summary)
+                    if changed:
+                        self.task_history[task_id] = kept
+                        updated_task_ids.append(task_id)
+
+        # 锁外保存已更新的任务历史记录并删除对应的详情文件、日志文件和索引
         for task_id in updated_task_ids:
             self._save_to_persistence(task_id)
-
+        with self.details_lock:
+            for task_id, execution_id in removed_details:
+                self.persistence.delete_execution_details(task_id, execution_id)
+        for task_id, execution_id in removed_details:
+            self.log_store.remove(task_id, execution_id)
+        self.log_index.remove_executions(execution_id for _, execution_id in removed_details)
+
+        result = {
+            'records_removed': records_removed,
+            'details_removed': details_removed,
+            'bytes_freed': bytes_freed if uses_sizes else None,
+            'tasks_updated': len(updated_task_ids),
+            'finished_at': now
+        }
+        self.last_retention = result
         if updated_task_ids:
-            self.logger.info(f"清理了 {len(updated_task_ids)} 个任务的旧记录")
+            self.logger.info(f"按保留策略清理了 {records_removed} 条执行记录和 {details_removed} 个执行的日志与详情")
+        return result
 
     def get_task_history(self):
-        """获取最近一个月的任务执行历史记录
-        
-        返回所有任务的执行历史记录，已按照最近一个月进行过滤
-        """
-        # 先清理旧记录，确保只返回最近一个月的数据
-        self.clean_old_records()
+        """获取所有任务的执行历史记录
 
+        返回保留策略清理后留下的记录（默认保留最近30天），清理由后台线程进行，此方法只读取
+        """
         history_records = []
 
         # 在锁内复制数据
@@ -211,6 +656,8 @@ class TaskHistory:
                         'peak_memory': execution.get('peak_memory'),
                         'avg_memory': execution.get('avg_memory'),
                         'exit_code': execution.get('exit_code'),
+                        'exit_reason': execution.get('exit_reason'),
+                        'signal': execution.get('signal'),
                         'execution_id': execution.get('execution_id')
                     }
                     history_records.append(history_record)
@@ -241,12 +688,6 @@ class TaskHistory:
             字典，包含logs，如果找不到记录则返回None
         """
         with self.lock:
-            if task_id in self.task_history:
-                for record in self.task_history[task_id]:
-                    if record.get('execution_id') == execution_id:
-                        # 确保logs字段存在
-                        if 'logs' not in record:
-                            record['logs'] = ''
-
-                        return {'logs': record.get('logs', '')}
-        return None
+            if self._find_record(task_id, execution_id) is None:
+                return None
+        return {'logs': self.log_store.read_text(task_id, execution_id)}
@@ -56,7 +56,23 @@ class TaskOperationManager:
                     delay_seconds=None,
                     priority="normal",
                     memory_limit=None,
-                    command=None):
+                    command=None,
+                    cpu_limit=None,
+                    pids_limit=None,
+                    io_read_bps=None,
+                    io_write_bps=None,
+                    timeout_seconds=None,
+                    idle_output_timeout=None,
+                    max_retries=None,
+                    backoff_base=None,
+                    backoff_max=None,
+                    retry_on=None,
+                    memoize=False,
+                    memoize_inputs=None,
+                    memoize_ttl=None,
+                    cpu_affinity=None,
+                    scratch_tmpfs_mb=None,
+                    cache_namespace=None):
         """
         创建新任务，处理文件上传和任务调度
         
@@ -71,6 +87,22 @@ class TaskOperationManager:
             priority: 任务优先级
             memory_limit: 内存限制
             command: 自定义启动命令
+            cpu_limit: CPU限制（核数）
+            pids_limit: 进程/线程数上限
+            io_read_bps: 磁盘读取速率上限（字节/秒）
+            io_write_bps: 磁盘写入速率上限（字节/秒）
+            timeout_seconds: 单次执行的最长运行时间（秒）
+            idle_output_timeout: 无输出且CPU空闲的最长时间（秒）
+            max_retries: 失败后的最大重试次数
+            backoff_base: 重试退避的基础秒数
+            backoff_max: 重试退避的上限秒数
+            retry_on: 需要重试的退出码或执行状态列表
+            memoize: 是否在输入未变化时跳过执行
+            memoize_inputs: 需要计入输入指纹的额外文件或目录
+            memoize_ttl: 成功执行的指纹的有效期（秒）
+            cpu_affinity: 任务进程允许使用的CPU编号列表
+            scratch_tmpfs_mb: scratch目录挂载为tmpfs时的大小上限（MB）
+            cache_namespace: 共享数据缓存的命名空间名称
             
         Returns:
             dict: 包含success和output/error字段的结果字典
@@ -115,7 +147,23 @@ class TaskOperationManager:
                                                             delay_seconds=delay_seconds,
                                                             priority=priority,
                                                             memory_limit=memory_limit,
-                                                            command=command)
+                                                            command=command,
+                                                            cpu_limit=cpu_limit,
+                                                            pids_limit=pids_limit,
+                                                            io_read_bps=io_read_bps,
+                                                            io_write_bps=io_write_bps,
+                                                            timeout_seconds=timeout_seconds,
+                                                            idle_output_timeout=idle_output_timeout,
+                                                            max_retries=max_retries,
+                                                            backoff_base=backoff_base,
+                                                            backoff_max=backoff_max,
+                                                            retry_on=retry_on,
+                                                            memoize=memoize,
+                                                            memoize_inputs=memoize_inputs,
+                                                            memoize_ttl=memoize_ttl,
+                                                            cpu_affinity=cpu_affinity,
+                                                            scratch_tmpfs_mb=scratch_tmpfs_mb,
+                                                            cache_namespace=cache_namespace)
 
             if task_result.get('success', False):
                 # 如果任务创建成功，将临时文件移动到任务目录中
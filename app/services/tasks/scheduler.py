@@ -2,18 +2,23 @@ import threading
 import logging
 import os
 import time
-from datetime import datetime
+from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional, Union
 
 from .task_repository import TaskRepository
 from .helpers.task_validator import TaskValidator
 from .helpers.schedule_calculator import ScheduleCalculator
 from .helpers.environment_handler import EnvironmentHandler
+from .helpers.retry_policy import RetryPolicy
+from .helpers.time_series import ResourceSeries
 
 
 class Scheduler:
     """负责任务的创建和调度"""
 
+    # 任务详情中返回的最近执行数
+    DEFAULT_HISTORY_LIMIT = 20
+
     def __init__(self, executor, history_manager):
         self.repository = TaskRepository()
         self.executor = executor
@@ -25,9 +30,11 @@ class Scheduler:
         self.conda_manager = None
         self.lock = threading.Lock()
         self.running = True
+        self.pending_retries = {}  # 任务ID -> 待执行的重试 {'run_at', 'attempt', 'retry_of'}
 
-        # 设置任务提供器
+        # 设置任务提供器和执行结束回调
         self.executor.set_task_provider(self.repository.get_task)
+        self.executor.set_completion_callback(self._handle_execution_finished)
 
         # 启动调度线程
         self.scheduler_thread = threading.Thread(target=self._scheduler_loop)
@@ -51,7 +58,23 @@ class Scheduler:
                       delay_seconds=None,
                       priority="normal",
                       memory_limit=None,
-                      command=None):
+                      command=None,
+                      cpu_limit=None,
+                      pids_limit=None,
+                      io_read_bps=None,
+                      io_write_bps=None,
+                      timeout_seconds=None,
+                      idle_output_timeout=None,
+                      max_retries=None,
+                      backoff_base=None,
+                      backoff_max=None,
+                      retry_on=None,
+                      memoize=False,
+                      memoize_inputs=None,
+                      memoize_ttl=None,
+                      cpu_affinity=None,
+                      scratch_tmpfs_mb=None,
+                      cache_namespace=None):
         """调度一个新任务
         
         参数:
@@ -65,6 +88,22 @@ class Scheduler:
             priority: 任务优先级，可以是"high"、"normal"或"low"，默认为"normal"
             memory_limit: 内存限制（MB），如果为None则不限制
             command: 自定义启动命令（可选，默认为None，会自动生成命令）
+            cpu_limit: CPU限制（核数），通过cgroup cpu.max强制执行，如果为None则不限制
+            pids_limit: 进程/线程数上限，通过cgroup pids.max强制执行，如果为None则不限制
+            io_read_bps: 磁盘读取速率上限（字节/秒），通过cgroup io.max强制执行
+            io_write_bps: 磁盘写入速率上限（字节/秒），通过cgroup io.max强制执行
+            timeout_seconds: 单次执行的最长运行时间（秒，不含暂停时间），超时后终止，如果为None则不限制
+            idle_output_timeout: 连续无输出且CPU接近空闲多少秒后视为卡死并终止，如果为None则不检测
+            max_retries: 执行失败后的最大重试次数，如果为None则不重试
+            backoff_base: 第一次重试前的基础等待秒数，之后每次翻倍并加入随机抖动
+            backoff_max: 重试等待的上限秒数
+            retry_on: 需要重试的退出码或执行状态列表，如果为None则除手动停止外的所有失败都重试
+            memoize: 是否开启记忆化，输入与上一次成功执行相同时跳过执行
+            memoize_inputs: 除脚本目录外需要计入输入指纹的文件或目录列表（相对路径相对于脚本目录）
+            memoize_ttl: 成功执行的指纹的有效期（秒），如果为None则使用默认有效期
+            cpu_affinity: 任务进程允许使用的CPU编号列表，如果为None则不限制
+            scratch_tmpfs_mb: scratch目录挂载为tmpfs时的大小上限（MB），如果为None则使用普通目录
+            cache_namespace: 共享数据缓存的命名空间名称，如果为None则使用任务独立的命名空间
             
         返回:
             创建的任务对象或错误信息
@@ -75,6 +114,34 @@ class Scheduler:
         if not validation_result["success"]:
             return validation_result
 
+        limits_result = self.validator.validate_resource_limits(cpu_limit, pids_limit, io_read_bps, io_write_bps)
+        if not limits_result["success"]:
+            return limits_result
+
+        timeouts_result = self.validator.validate_timeouts(timeout_seconds, idle_output_timeout)
+        if not timeouts_result["success"]:
+            return timeouts_result
+
+        retry_result = self.validator.validate_retry_policy(max_retries, backoff_base, backoff_max, retry_on)
+        if not retry_result["success"]:
+            return retry_result
+
+        memoize_result = self.validator.validate_memoize(memoize, memoize_inputs, memoize_ttl)
+        if not memoize_result["success"]:
+            return memoize_result
+
+        affinity_result = self.validator.validate_cpu_affinity(cpu_affinity)
+        if not affinity_result["success"]:
+            return affinity_result
+
+        scratch_result = self.validator.validate_scratch(scratch_tmpfs_mb)
+        if not scratch_result["success"]:
+            return scratch_result
+
+        cache_result = self.validator.validate_cache_namespace(cache_namespace)
+        if not cache_result["success"]:
+            return cache_result
+
         # 处理任务名称
         if not task_name:
             task_name = os.path.basename(script_path)
@@ -112,6 +179,22 @@ class Scheduler:
             'executions': [],  # 存储该任务的所有执行记录ID
             'priority': priority,
             'memory_limit': memory_limit,
+            'cpu_limit': cpu_limit,
+            'pids_limit': pids_limit,
+            'io_read_bps': io_read_bps,
+            'io_write_bps': io_write_bps,
+            'timeout_seconds': timeout_seconds,
+            'idle_output_timeout': idle_output_timeout,
+            'max_retries': max_retries,
+            'backoff_base': backoff_base,
+            'backoff_max': backoff_max,
+            'retry_on': retry_on,
+            'memoize': bool(memoize),
+            'memoize_inputs': memoize_inputs,
+            'memoize_ttl': memoize_ttl,
+            'cpu_affinity': cpu_affinity,
+            'scratch_tmpfs_mb': scratch_tmpfs_mb,
+            'cache_namespace': cache_namespace,
             'command': command
         }
 
@@ -156,6 +239,11 @@ class Scheduler:
                 if now >= next_run:
                     due_tasks.append(task)
 
+        # 收集到期的重试，与到期任务一起按优先级排序执行
+        due_retries = self._collect_due_retries(now)
+        due_tasks.extend(task for task, _ in due_retries)
+        retries = {id(task): retry for task, retry in due_retries}
+
         # 如果有多个任务到期，按优先级排序
         if len(due_tasks) > 1:
             # 优先级映射: high -> 3, normal -> 2, low -> 1
@@ -164,6 +252,14 @@ class Scheduler:
 
         # 执行排序后的任务
         for task in due_tasks:
+            retry = retries.get(id(task))
+            if retry:
+                # 重试不影响任务的调度时间
+                execution_id = self.executor.execute_task(task, attempt=retry['attempt'], retry_of=retry['retry_of'])
+                self.history.update_execution_record(task['task_id'], retry['retry_of'],
+                                                     {'superseded_by': execution_id})
+                continue
+
             # 创建新线程执行任务
             self.executor.execute_task(task)
 
@@ -176,6 +272,70 @@ class Scheduler:
                 # 如果是一次性任务，将next_run_time设为None
                 self.repository.update_task(task['task_id'], {'next_run_time': None})
 
+    def _handle_execution_finished(self, task_id, execution_id):
+        """执行结束回调，根据任务的重试策略决定是否安排重试
+
+        参数:
+            task_id: 任务ID
+            execution_id: 刚结束的执行ID
+        """
+        task = self.repository.get_task(task_id)
+        record = self.history.get_execution_summary(task_id, execution_id)
+        if not task or not record or task.get('status') != 'scheduled':
+            return  # 任务已被删除、停止或暂停时不再重试
+
+        policy = RetryPolicy.from_task(task)
+        attempt = record.get('attempt') or 1
+        if not policy.should_retry(record.get('status'), record.get('exit_code'), attempt):
+            return
+
+        delay = policy.next_delay(attempt)
+        run_at = datetime.now() + timedelta(seconds=delay)
+        with self.lock:
+            self.pending_retries[task_id] = {'run_at': run_at, 'attempt': attempt + 1, 'retry_of': execution_id}
+
+        self.logger.info(f"Task {task_id} attempt {attempt} ended with {record.get('status')}, "
+                         f"retry {attempt}/{policy.max_retries} in {delay:.1f}s")
+        self.history.update_execution_record(task_id, execution_id,
+                                             {'next_retry_at': run_at.strftime('%Y-%m-%d %H:%M:%S')})
+        self.history.append_to_execution_log(task_id, execution_id,
+                                             f"\nRetry {attempt}/{policy.max_retries} scheduled in {delay:.1f}s")
+
+    def _collect_due_retries(self, now):
+        """取出到期的重试
+
+        任务仍有执行在运行时保留到下一次检查，任务已被删除或不再处于调度状态时丢弃
+
+        返回:
+            (任务对象, 重试信息) 列表
+        """
+        due = []
+        dropped = []
+        with self.lock:
+            for task_id, retry in list(self.pending_retries.items()):
+                if retry['run_at'] > now:
+                    continue
+                task = self.repository.get_task(task_id)
+                if not task or task.get('status') != 'scheduled':
+                    del self.pending_retries[task_id]
+                    dropped.append((task_id, retry))
+                    continue
+                if self.executor.is_task_running(task_id):
+                    continue
+                del self.pending_retries[task_id]
+                due.append((task, retry))
+
+        for task_id, retry in dropped:
+            self.history.update_execution_record(task_id, retry['retry_of'], {'next_retry_at': None})
+        return due
+
+    def _cancel_pending_retry(self, task_id):
+        """取消任务尚未执行的重试"""
+        with self.lock:
+            retry = self.pending_retries.pop(task_id, None)
+        if retry:
+            self.history.update_execution_record(task_id, retry['retry_of'], {'next_retry_at': None})
+
     def get_tasks(self):
         """获取所有任务列表，包含执行信息"""
         tasks = self.repository.get_all_tasks()
@@ -204,58 +364,144 @@ class Scheduler:
 
         return tasks_with_details
 
-    def get_task_status(self, task_id):
-        """获取指定任务的状态和执行历史"""
+    def get_task_status(self, task_id, history_limit=DEFAULT_HISTORY_LIMIT):
+        """获取指定任务的状态和最近几次执行
+
+        只返回最近history_limit次执行的摘要和性能指标，更早的执行通过get_task_executions分页获取；
+        最近一次执行返回不含资源时间序列的完整记录，资源时间序列通过get_execution_metrics获取
+        """
         # 查找任务
         task = self.repository.get_task(task_id)
         if not task:
             return {"success": False, "message": f"Task with ID {task_id} not found"}
 
-        # 获取该任务的执行历史
-        execution_history = self.history.task_history.get(task_id, [])
+        # 获取最近几次执行的摘要，按执行的先后顺序排列
+        execution_count, recent = self.history.get_execution_summaries(task_id, limit=history_limit)
+        execution_history = recent[::-1]
 
         # 获取执行时长历史数据，用于绘制折线图
         performance_metrics = self._extract_performance_metrics(execution_history)
 
-        # 构建结果
+        # 构建结果，执行ID列表随执行次数增长，由execution_count代替
+        task.pop('executions', None)
         result = {
             "success": True,
             "task": task,
+            "execution_count": execution_count,
             "execution_history": execution_history,
             "performance_metrics": performance_metrics
         }
 
         # 如果存在最近一次执行，获取详细信息
         if task.get('last_execution_id'):
-            last_execution = next(
-                (e for e in execution_history if e.get('execution_id') == task.get('last_execution_id')), None)
+            last_execution = self.history.get_execution_record(task_id, task.get('last_execution_id'))
             if last_execution:
+                last_execution.pop('resource_series', None)
+                last_execution.pop('memory_usage', None)
                 result["latest_execution"] = last_execution
 
         return result
 
+    def get_task_executions(self, task_id, offset=0, limit=50, statuses=None):
+        """分页获取任务执行记录的摘要，最近的执行在前
+
+        参数:
+            task_id: 任务ID
+            offset: 跳过最近的多少条
+            limit: 最多返回的条数
+            statuses: 只返回这些状态的执行（可选）
+
+        返回:
+            包含total和executions的字典
+        """
+        if not self.repository.get_task(task_id):
+            return {"success": False, "message": f"Task with ID {task_id} not found"}
+
+        total, executions = self.history.get_execution_summaries(task_id, offset=offset, limit=limit,
+                                                                 statuses=statuses)
+        return {"success": True, "total": total, "offset": offset, "limit": limit, "executions": executions}
+
+    def get_execution_metrics(self, task_id, execution_id, points, fields=None):
+        """获取执行的资源时间序列，在服务端降采样到最多points个点
+
+        参数:
+            task_id: 任务ID
+            execution_id: 执行ID
+            points: 最多返回的点数
+            fields: 只返回这些字段（可选）
+
+        返回:
+            包含interval、counts和series的字典，格式同执行记录中的resource_series
+        """
+        if not self.repository.get_task(task_id):
+            return {"success": False, "message": f"Task with ID {task_id} not found"}
+        details = self.history.get_execution_details(task_id, execution_id)
+        if details is None:
+            return {"success": False, "message": f"Execution with ID {execution_id} not found for task {task_id}"}
+
+        series = details.get('resource_series') or self._legacy_memory_series(task_id, execution_id, details)
+        if series:
+            metrics = ResourceSeries(series).downsample(points, fields)
+            source_points = len(series['counts'])
+        else:
+            # 没有采样数据，或详情已被保留策略删除
+            metrics = {'interval': None, 'counts': [], 'series': {}}
+            source_points = 0
+        return {"success": True, "execution_id": execution_id, "source_points": source_points, **metrics}
+
+    def _legacy_memory_series(self, task_id, execution_id, details):
+        """将旧记录中memory_usage的原始样本列表转换为资源序列，假设样本在执行期间均匀分布"""
+        memory_usage = details.get('memory_usage')
+        summary = self.history.get_execution_summary(task_id, execution_id) or {}
+        duration = summary.get('duration') or 0
+        if not memory_usage or duration <= 0:
+            return None
+        interval = duration / len(memory_usage)
+        series = ResourceSeries.create(['memory_usage'], interval, capacity=len(memory_usage) + 1)
+        resource_series = ResourceSeries(series)
+        for i, memory_mb in enumerate(memory_usage):
+            resource_series.add(i * interval, {'memory_usage': memory_mb})
+        return series
+
     def _extract_performance_metrics(self, execution_history):
         """从执行历史中提取性能指标"""
         durations = []
         timestamps = []
-        peak_memories = []
-        avg_memories = []
 
+        # 指标名称 -> 执行记录中的字段
+        metric_fields = {
+            "peak_memories": "peak_memory",
+            "avg_memories": "avg_memory",
+            "peak_cpus": "peak_cpu",
+            "avg_cpus": "avg_cpu",
+            "cpu_times": "cpu_time",
+            "io_read_bytes": "io_read_bytes",
+            "io_write_bytes": "io_write_bytes",
+            "peak_io_read_rates": "peak_io_read_rate",
+            "avg_io_read_rates": "avg_io_read_rate",
+            "peak_io_write_rates": "peak_io_write_rate",
+            "avg_io_write_rates": "avg_io_write_rate",
+            "peak_threads": "peak_threads",
+            "avg_threads": "avg_threads",
+            "peak_fds": "peak_fds",
+            "avg_fds": "avg_fds",
+            "peak_ctx_switch_rates": "peak_ctx_switch_rate",
+            "avg_ctx_switch_rates": "avg_ctx_switch_rate",
+            "ctx_switches_voluntary": "ctx_switches_voluntary",
+            "ctx_switches_involuntary": "ctx_switches_involuntary"
+        }
+        metrics = {name: [] for name in metric_fields}
+
+        # 每个数组与timestamps一一对应，执行没有某项指标时该位置为None
         for record in execution_history:
-            if record.get('duration') is not None:
-                durations.append(record.get('duration'))
-                timestamps.append(record.get('start_time'))
-            if record.get('peak_memory') is not None:
-                peak_memories.append(record.get('peak_memory'))
-            if record.get('avg_memory') is not None:
-                avg_memories.append(record.get('avg_memory'))
+            if record.get('duration') is None:
+                continue
+            durations.append(record.get('duration'))
+            timestamps.append(record.get('start_time'))
+            for name, field in metric_fields.items():
+                metrics[name].append(record.get(field))
 
-        return {
-            "durations": durations,
-            "timestamps": timestamps,
-            "peak_memories": peak_memories,
-            "avg_memories": avg_memories
-        }
+        return {"durations": durations, "timestamps": timestamps, **metrics}
 
     def pause_task(self, task_id):
         """暂停任务调度或执行
@@ -271,8 +517,8 @@ class Scheduler:
         if not task:
             return {"success": False, "message": f"Task with ID {task_id} not found"}
 
-        # 检查任务状态
-        if task['status'] == 'running':
+        # 检查任务状态，执行状态由执行器维护
+        if self.executor.is_task_running(task_id):
             # 正在运行的任务，调用执行器的暂停方法
             return self.executor.pause_task(task_id)
         elif task['status'] == 'scheduled':
@@ -355,11 +601,12 @@ class Scheduler:
             }
         }
 
-    def stop_task(self, task_id):
+    def stop_task(self, task_id, grace_period=None):
         """停止任务，将任务状态设置为stopped
         
         参数:
             task_id: 任务ID
+            grace_period: 停止运行中的执行时SIGTERM后等待的秒数（可选）
             
         返回:
             包含操作结果的字典
@@ -372,13 +619,14 @@ class Scheduler:
         previous_status = task['status']
 
         # 如果任务正在运行，先停止执行
-        if task['status'] == 'running':
-            stop_result = self.executor.stop_task(task_id)
+        if self.executor.is_task_running(task_id):
+            stop_result = self.executor.stop_task(task_id, grace_period)
             if not stop_result.get("success", False):
                 return stop_result
 
-        # 更新任务状态
+        # 更新任务状态，取消尚未执行的重试
         self.repository.update_task(task_id, {'status': 'stopped', 'next_run_time': None})
+        self._cancel_pending_retry(task_id)
 
         return {
             "success": True,
@@ -406,16 +654,18 @@ class Scheduler:
             return {"success": False, "message": f"Task with ID {task_id} not found"}
 
         # 如果任务正在运行，不能删除
-        if task['status'] == 'running':
+        if self.executor.is_task_running(task_id):
             return {
                 "success": False,
                 "message": "Task cannot be deleted",
                 "error": "Cannot delete a task that is currently running",
-                "current_status": task['status']
+                "current_status": 'running'
             }
 
         # 删除任务
         self.repository.delete_task(task_id)
+        self._cancel_pending_retry(task_id)
+        self.executor.memo_cache.invalidate(task_id)
 
         return {"success": True, "message": "Task deleted successfully", "task_id": task_id}
 
@@ -439,13 +689,13 @@ class Scheduler:
         if not task:
             return {"success": False, "message": f"Task with ID {task_id} not found"}
 
-        # 检查任务状态
-        if task['status'] == 'running':
+        # 检查任务是否有正在运行的执行
+        if self.executor.is_task_running(task_id):
             return {
                 "success": False,
                 "message": "Task cannot be triggered",
-                "error": f"Cannot trigger a task with status: '{task['status']}'",
-                "current_status": task['status']
+                "error": "Cannot trigger a task with status: 'running'",
+                "current_status": 'running'
             }
 
         previous_status = task['status']
@@ -454,8 +704,8 @@ class Scheduler:
         if task['status'] in ['stopped', 'paused']:
             self.repository.update_task(task_id, {'status': 'scheduled'})
 
-        # 立即执行任务
-        execution_result = self.executor.execute_task(task)
+        # 立即执行任务，手动触发时不跳过输入未变化的执行
+        execution_result = self.executor.execute_task(task, use_cache=False)
 
         # 处理执行结果 - 防止字符串错误
         execution_id = None
@@ -2,6 +2,9 @@ from datetime import datetime, timedelta
 import random
 import logging
 
+from .helpers.exit_classifier import ExitClassifier
+from .helpers.time_series import ResourceSeries
+
 try:
     import psutil
     HAS_PSUTIL = True
@@ -140,14 +143,14 @@ class TaskStats:
                     start_time = datetime.strptime(start_time_str, '%Y-%m-%d %H:%M:%S')
                     start_date = start_time.strftime('%Y-%m-%d')
 
-                    # 如果在最近7天内
-                    if start_date in last_7_days:
+                    # 如果在最近7天内，已被重试取代的尝试不计入，只统计每组重试的最终结果
+                    if start_date in last_7_days and not execution.get('superseded_by'):
                         day_index = last_7_days.index(start_date)
                         status = execution.get('status')
 
-                        if status == 'completed':
+                        if status in ('completed', 'cached'):
                             success_counts[day_index] += 1
-                        elif status == 'failed':
+                        elif status == 'failed' or status in ExitClassifier.ABNORMAL_STATUSES:
                             failed_counts[day_index] += 1
                 except (ValueError, TypeError):
                     continue
@@ -214,6 +217,10 @@ class TaskStats:
             memory = psutil.virtual_memory()
             total_memory_mb = memory.total // (1024 * 1024)  # 转换为MB
 
+            # 在锁内取出与这24小时重叠的执行的时间段和平均内存，不读取执行详情文件
+            window_start = datetime.strptime(timestamps[0], '%Y-%m-%d %H:00:00')
+            spans = self._collect_execution_spans(window_start, current_hour + timedelta(hours=1), now)
+
             # 计算每小时的内存使用情况和任务执行数
             memory_usage = []
             task_counts = []
@@ -224,11 +231,11 @@ class TaskStats:
                 hour_end = hour_start + timedelta(hours=1)
 
                 # 获取这个小时内执行的任务数量
-                task_count = self._count_tasks_for_hour(hour_start, hour_end)
+                task_count = self._count_tasks_for_hour(hour_start, hour_end, spans)
                 task_counts.append(task_count)
 
                 # 从任务执行记录中获取这个小时的内存使用情况
-                hour_memory = self._get_memory_usage_for_hour(hour_start, hour_end)
+                hour_memory = self._get_memory_usage_for_hour(hour_start, hour_end, spans)
 
                 if hour_memory is not None:
                     memory_usage.append(hour_memory)
@@ -252,125 +259,133 @@ class TaskStats:
             self.logger.error(f"获取系统资源使用情况失败: {str(e)}")
             return None
 
-    def _count_tasks_for_hour(self, hour_start, hour_end):
+    def _count_tasks_for_hour(self, hour_start, hour_end, spans):
         """统计指定小时内执行的任务数量
-        
+
         Args:
             hour_start: 小时开始时间，datetime对象
             hour_end: 小时结束时间，datetime对象
-            
+            spans: _collect_execution_spans返回的执行时间段列表
+
         Returns:
-            int: 该小时内执行的任务数量
+            int: 该小时内开始执行的任务数量
         """
-        count = 0
+        return sum(1 for start_time, _, _ in spans if hour_start <= start_time < hour_end)
 
-        for task_id, executions in self.history.task_history.items():
-            for execution in executions:
-                start_time_str = execution.get('start_time')
-                if not start_time_str:
-                    continue
+    def _collect_execution_spans(self, window_start, window_end, now):
+        """在历史记录的锁内收集与时间窗口重叠的执行的时间段和平均内存
 
-                try:
-                    start_time = datetime.strptime(start_time_str, '%Y-%m-%d %H:%M:%S')
-                    if hour_start <= start_time < hour_end:
-                        count += 1
-                except (ValueError, TypeError):
-                    continue
+        已结束的执行使用摘要中的avg_memory，运行中的执行使用内存中的资源序列，都不读取执行详情文件
 
-        return count
+        Args:
+            window_start: 窗口开始时间，datetime对象
+            window_end: 窗口结束时间，datetime对象
+            now: 当前时间，作为未结束执行的结束时间
 
-    def _get_memory_usage_for_hour(self, hour_start, hour_end):
+        Returns:
+            List[Tuple[datetime, datetime, Optional[float]]]: (开始时间, 结束时间, 平均内存MB)，没有内存数据时为None
+        """
+        spans = []
+        with self.history.lock:
+            for task_id, executions in self.history.task_history.items():
+                for execution in executions:
+                    start_time_str = execution.get('start_time')
+                    if not start_time_str:
+                        continue
+
+                    try:
+                        start_time = datetime.strptime(start_time_str, '%Y-%m-%d %H:%M:%S')
+                        end_time_str = execution.get('end_time')
+                        # 如果任务尚未完成，使用当前时间作为结束时间
+                        end_time = datetime.strptime(end_time_str, '%Y-%m-%d %H:%M:%S') if end_time_str else now
+                    except (ValueError, TypeError):
+                        continue
+
+                    if start_time < window_end and end_time > window_start:
+                        avg_memory = execution.get('avg_memory')
+                        if avg_memory is None:
+                            avg_memory = self._average_active_memory(execution.get('execution_id'))
+                        spans.append((start_time, end_time, avg_memory))
+        return spans
+
+    def _average_active_memory(self, execution_id):
+        """计算运行中执行的平均内存，调用方需持有历史记录的锁"""
+        details = self.history.active_details.get(execution_id) or {}
+        if not details.get('resource_series'):
+            return None
+        values = [memory_mb for _, memory_mb in ResourceSeries(details['resource_series']).points('memory_usage')]
+        return sum(values) / len(values) if values else None
+
+    def _get_memory_usage_for_hour(self, hour_start, hour_end, spans):
         """获取指定小时内的内存使用情况，考虑同时执行的多个任务
-        
+
         计算方法：
-        1. 收集该小时内所有任务在每个时间点的内存使用记录
-        2. 对于同一时间点的多个任务，累加其内存使用量
-        3. 计算该小时内的平均内存使用量
-        
+        1. 选出与该小时重叠、有内存数据的执行
+        2. 以每个执行在该小时内运行的时长为权重，对其平均内存使用量加权平均
+
         Args:
             hour_start: 小时开始时间，datetime对象
             hour_end: 小时结束时间，datetime对象
-            
+            spans: _collect_execution_spans返回的执行时间段列表
+
         Returns:
             float: 该小时内的平均内存使用量(MB)，如果没有数据则返回None
         """
-        # 查找这个小时内有执行记录的任务
-        memory_samples = []
-
-        for task_id, executions in self.history.task_history.items():
-            for execution in executions:
-                start_time_str = execution.get('start_time')
-                end_time_str = execution.get('end_time')
-
-                if not start_time_str:
-                    continue
-
-                try:
-                    start_time = datetime.strptime(start_time_str, '%Y-%m-%d %H:%M:%S')
-
-                    # 确定结束时间
-                    if end_time_str:
-                        end_time = datetime.strptime(end_time_str, '%Y-%m-%d %H:%M:%S')
-                    else:
-                        # 如果任务尚未完成，使用当前时间作为结束时间
-                        end_time = datetime.now()
-
-                    # 检查任务的执行时间是否与目标小时有重叠
-                    if (start_time < hour_end and end_time > hour_start):
-                        # 获取内存使用记录
-                        memory_usage = execution.get('memory_usage', [])
-
-                        # 如果有内存使用记录，为这个小时添加数据点
-                        if memory_usage:
-                            # 我们可以假设内存样本是均匀分布的
-                            # 计算每个样本的时间点（近似）
-                            duration = (end_time - start_time).total_seconds()
-                            if duration > 0 and len(memory_usage) > 0:
-                                time_per_sample = duration / len(memory_usage)
-
-                                # 筛选出属于这个小时的内存样本
-                                for i, memory_mb in enumerate(memory_usage):
-                                    sample_time = start_time + timedelta(seconds=i * time_per_sample)
-                                    if hour_start <= sample_time < hour_end:
-                                        memory_samples.append(memory_mb)
-                except (ValueError, TypeError):
-                    continue
-
-        # 如果有内存样本，计算平均值
-        if memory_samples:
-            return sum(memory_samples) / len(memory_samples)
+        weighted_memory = 0.0
+        total_seconds = 0.0
+        for start_time, end_time, avg_memory in spans:
+            if avg_memory is None:
+                continue
+            overlap = (min(end_time, hour_end) - max(start_time, hour_start)).total_seconds()
+            if overlap > 0:
+                weighted_memory += avg_memory * overlap
+                total_seconds += overlap
 
         # 如果没有数据，返回None
-        return None
+        if total_seconds <= 0:
+            return None
+        return weighted_memory / total_seconds
 
     def _get_task_success_rate(self):
         """
         计算任务成功率分布
-        返回成功、失败、取消和异常终止的任务数量
+        返回成功、失败、取消和异常终止的任务数量，以及异常终止按原因的细分
+        输入未变化而跳过的执行计入成功，同时单独统计其数量
         """
         success_count = 0
+        cached_count = 0
         failed_count = 0
         cancelled_count = 0
         abnormal_count = 0
+        abnormal_breakdown = {status: 0 for status in ExitClassifier.ABNORMAL_STATUSES}
 
         # 遍历所有任务历史记录
         for task_id, executions in self.history.task_history.items():
             for execution in executions:
+                # 已被重试取代的尝试不计入，只统计每组重试的最终结果
+                if execution.get('superseded_by'):
+                    continue
                 status = execution.get('status', '')
                 if status == 'completed':
                     success_count += 1
+                elif status == 'cached':
+                    success_count += 1
+                    cached_count += 1
                 elif status == 'failed':
                     failed_count += 1
                 elif status == 'stopped':
                     cancelled_count += 1
-                elif status in ['crashed', 'killed', 'timeout']:
+                elif status in ExitClassifier.ABNORMAL_STATUSES:
                     abnormal_count += 1
+                    abnormal_breakdown[status] += 1
 
         return {
             'success': success_count,
+            'cached': cached_count,
             'failed': failed_count,
             'cancelled': cancelled_count,
-            'abnormal': abnormal_count
+            'abnormal': abnormal_count,
+            'abnormal_breakdown': abnormal_breakdown
         }
 
     def _get_upcoming_tasks(self, limit=10):
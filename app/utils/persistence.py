@@ -15,18 +15,25 @@ class DataPersistence:
     DATA_DIR = "/var/fidlter/data"
     CONFIG_DIR = "/var/fidlter/config"
     SCRIPTS_DIR = "/var/fidlter/scripts"  # 新增脚本存储路径
+    CACHE_DIR = "/var/fidlter/cache"  # 任务共享的数据缓存目录
 
     # 数据子目录
     TASK_HISTORY_DIR = "task_history"
     ENV_INFO_DIR = "env_info"
     STATS_DIR = "stats"
     GIT_SCRIPTS_DIR = "git_scripts"  # Git克隆的脚本子目录
+    LOGS_DIR = "logs"  # 执行日志文件
+    EXECUTION_DETAILS_DIR = "execution_details"  # 已结束执行的详情，按任务ID分目录保存
 
     # 文件名
     TASKS_CONFIG_FILE = "tasks.json"
     SYSTEM_CONFIG_FILE = "system_config.json"
     TASKS_STATS_FILE = "tasks_stats.json"
     CONDA_STATS_FILE = "conda_stats.json"
+    CACHE_STATE_FILE = "cache_state.json"  # 数据缓存的固定项和命中统计
+    MEMO_CACHE_FILE = "memo_cache.json"  # 开启记忆化的任务最近一次成功执行的输入指纹
+    LOG_INDEX_FILE = "log_index.db"  # 执行日志的全文索引（SQLite）
+    RETENTION_CONFIG_FILE = "retention.json"  # 执行历史的保留策略
 
     # 文件版本标记
     CURRENT_VERSION = "1.0.0"
@@ -51,6 +58,8 @@ class DataPersistence:
         os.makedirs(os.path.join(self.DATA_DIR, self.TASK_HISTORY_DIR), exist_ok=True)
         os.makedirs(os.path.join(self.DATA_DIR, self.ENV_INFO_DIR), exist_ok=True)
         os.makedirs(os.path.join(self.DATA_DIR, self.STATS_DIR), exist_ok=True)
+        os.makedirs(os.path.join(self.DATA_DIR, self.LOGS_DIR), exist_ok=True)
+        os.makedirs(os.path.join(self.DATA_DIR, self.EXECUTION_DETAILS_DIR), exist_ok=True)
 
         self.logger.info(f"数据目录初始化完成：{self.DATA_DIR}、{self.CONFIG_DIR} 和 {self.SCRIPTS_DIR}")
 
@@ -218,6 +227,57 @@ class DataPersistence:
 
             return result
 
+    # 执行详情相关方法
+    def _get_execution_details_path(self, task_id: str, execution_id: str) -> str:
+        return os.path.join(self.DATA_DIR, self.EXECUTION_DETAILS_DIR, str(task_id), f"{execution_id}.json")
+
+    def save_execution_details(self, task_id: str, execution_id: str, details: Dict[str, Any]) -> bool:
+        """保存执行详情（执行记录中不属于摘要的字段）
+
+        Args:
+            task_id: 任务ID
+            execution_id: 执行ID
+            details: 执行详情
+
+        Returns:
+            bool: 操作是否成功
+        """
+        with self.lock:
+            return self._atomic_write_json(self._get_execution_details_path(task_id, execution_id), details)
+
+    def load_execution_details(self, task_id: str, execution_id: str) -> Optional[Dict[str, Any]]:
+        """加载执行详情
+
+        Args:
+            task_id: 任务ID
+            execution_id: 执行ID
+
+        Returns:
+            Optional[Dict[str, Any]]: 执行详情，没有保存详情或读取失败时返回None
+        """
+        with self.lock:
+            file_path = self._get_execution_details_path(task_id, execution_id)
+            if not os.path.exists(file_path):
+                return None
+            return self._read_json(file_path)
+
+    def get_execution_details_size(self, task_id: str, execution_id: str) -> int:
+        """获取执行详情文件的字节数，没有保存详情时返回0"""
+        try:
+            return os.path.getsize(self._get_execution_details_path(task_id, execution_id))
+        except OSError:
+            return 0
+
+    def delete_execution_details(self, task_id: str, execution_id: str) -> None:
+        """删除执行详情文件"""
+        with self.lock:
+            try:
+                os.remove(self._get_execution_details_path(task_id, execution_id))
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                self.logger.error(f"删除执行 {execution_id} 的详情失败: {str(e)}")
+
     # 环境信息相关方法
     def save_env_info(self, env_name: str, env_data: Dict[str, Any]) -> bool:
         """保存环境信息
@@ -316,6 +376,75 @@ class DataPersistence:
             file_path = os.path.join(self.DATA_DIR, self.STATS_DIR, self.CONDA_STATS_FILE)
             return self._read_json(file_path)
 
+    def save_cache_state(self, state_data: Dict[str, Any]) -> bool:
+        """保存数据缓存的固定项和命中统计
+
+        Args:
+            state_data: 数据缓存状态
+
+        Returns:
+            bool: 操作是否成功
+        """
+        with self.lock:
+            file_path = os.path.join(self.DATA_DIR, self.STATS_DIR, self.CACHE_STATE_FILE)
+            return self._atomic_write_json(file_path, state_data)
+
+    def load_cache_state(self) -> Optional[Dict[str, Any]]:
+        """加载数据缓存的固定项和命中统计
+
+        Returns:
+            Optional[Dict[str, Any]]: 数据缓存状态，如果失败则返回None
+        """
+        with self.lock:
+            file_path = os.path.join(self.DATA_DIR, self.STATS_DIR, self.CACHE_STATE_FILE)
+            return self._read_json(file_path)
+
+    def save_memo_cache(self, cache_data: Dict[str, Any]) -> bool:
+        """保存开启记忆化的任务最近一次成功执行的输入指纹
+
+        Args:
+            cache_data: 指纹记录
+
+        Returns:
+            bool: 操作是否成功
+        """
+        with self.lock:
+            file_path = os.path.join(self.DATA_DIR, self.STATS_DIR, self.MEMO_CACHE_FILE)
+            return self._atomic_write_json(file_path, cache_data)
+
+    def load_memo_cache(self) -> Optional[Dict[str, Any]]:
+        """加载开启记忆化的任务最近一次成功执行的输入指纹
+
+        Returns:
+            Optional[Dict[str, Any]]: 指纹记录，如果失败则返回None
+        """
+        with self.lock:
+            file_path = os.path.join(self.DATA_DIR, self.STATS_DIR, self.MEMO_CACHE_FILE)
+            return self._read_json(file_path)
+
+    def save_retention_config(self, config_data: Dict[str, Any]) -> bool:
+        """保存执行历史的保留策略
+
+        Args:
+            config_data: 保留策略配置
+
+        Returns:
+            bool: 操作是否成功
+        """
+        with self.lock:
+            file_path = os.path.join(self.CONFIG_DIR, self.RETENTION_CONFIG_FILE)
+            return self._atomic_write_json(file_path, config_data)
+
+    def load_retention_config(self) -> Optional[Dict[str, Any]]:
+        """加载执行历史的保留策略
+
+        Returns:
+            Optional[Dict[str, Any]]: 保留策略配置，如果失败则返回None
+        """
+        with self.lock:
+            file_path = os.path.join(self.CONFIG_DIR, self.RETENTION_CONFIG_FILE)
+            return self._read_json(file_path)
+
     # 脚本文件管理相关方法
     def save_script_file(self,
                          file_content: Union[bytes, str],
@@ -525,7 +654,7 @@ class DataPersistence:
             shutil.copytree(self.CONFIG_DIR, config_backup)
 
             # 备份数据目录中的子目录
-            for subdir in [self.TASK_HISTORY_DIR, self.ENV_INFO_DIR, self.STATS_DIR]:
+            for subdir in [self.TASK_HISTORY_DIR, self.EXECUTION_DETAILS_DIR, self.ENV_INFO_DIR, self.STATS_DIR]:
                 src_dir = os.path.join(self.DATA_DIR, subdir)
                 if os.path.exists(src_dir):
                     dst_dir = os.path.join(backup_dir, subdir)
@@ -559,7 +688,7 @@ class DataPersistence:
                 shutil.copytree(config_backup, self.CONFIG_DIR)
 
             # 恢复数据目录中的子目录
-            for subdir in [self.TASK_HISTORY_DIR, self.ENV_INFO_DIR, self.STATS_DIR]:
+            for subdir in [self.TASK_HISTORY_DIR, self.EXECUTION_DETAILS_DIR, self.ENV_INFO_DIR, self.STATS_DIR]:
                 src_dir = os.path.join(backup_dir, subdir)
                 if os.path.exists(src_dir):
                     dst_dir = os.path.join(self.DATA_DIR, subdir)
@@ -0,0 +1,162 @@
+"""任务执行器并发基准测试
+
+对比线程执行器(TaskExecutor)和asyncio执行器(AsyncTaskExecutor)在大量并发执行时的
+线程数和CPU开销。每种执行器、每个并发数都在独立的子进程中运行，互不影响。
+
+为了只测量执行器本身的开销，基准测试使用临时的conda替身（直接执行conda run之后的命令）
+和不写磁盘的内存历史记录，每个任务是一个每秒输出一行的shell脚本。日志、执行详情、scratch目录
+和数据缓存等仍会写入的文件都放在临时目录中，不会触及真实的数据目录。
+
+用法:
+    python benchmarks/executor_concurrency.py [--concurrency 50 200 500] [--duration 20]
+"""
+import argparse
+import json
+import os
+import stat
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CONDA_SHIM = """#!/bin/sh
+# conda run --no-capture-output -n ENV cmd... -> cmd...
+shift; shift; shift; shift
+exec "$@"
+"""
+
+JOB_SCRIPT = """#!/bin/sh
+i=0
+while [ $i -lt {duration} ]; do
+    echo "tick $i"
+    i=$((i + 1))
+    sleep 1
+done
+"""
+
+
+def run_worker(mode, concurrency, duration, work_dir):
+    """在当前进程中启动指定数量的并发执行，输出测量结果(JSON)"""
+    sys.path.insert(0, ROOT_DIR)
+    import psutil
+    from app.utils.persistence import DataPersistence
+
+    # 在创建历史记录和执行器之前把所有持久化目录指向临时目录
+    DataPersistence.DATA_DIR = os.path.join(work_dir, 'data')
+    DataPersistence.CONFIG_DIR = os.path.join(work_dir, 'config')
+    DataPersistence.SCRIPTS_DIR = os.path.join(work_dir, 'scripts')
+    DataPersistence.CACHE_DIR = os.path.join(work_dir, 'cache')
+
+    from app.services.tasks.history import TaskHistory
+    from app.services.tasks.executor import TaskExecutor
+    from app.services.tasks.async_executor import AsyncTaskExecutor
+
+    class InMemoryHistory(TaskHistory):
+        """不读写持久化存储的历史记录，避免基准测试写入真实数据目录"""
+
+        def _load_from_persistence(self):
+            pass
+
+        def _save_to_persistence(self, task_id):
+            pass
+
+    history = InMemoryHistory()
+    executor_class = AsyncTaskExecutor if mode == 'async' else TaskExecutor
+    executor = executor_class(history)
+    tasks = {}
+    executor.set_task_provider(tasks.get)
+
+    process = psutil.Process()
+    cpu_before = process.cpu_times()
+    started = time.monotonic()
+
+    execution_ids = []
+    for task_id in range(1, concurrency + 1):
+        task = {
+            'task_id': task_id,
+            'conda_env': 'bench',
+            'script_path': os.path.join(work_dir, 'job.sh'),
+            'command': f"/bin/sh {os.path.join(work_dir, 'job.sh')}",
+            'executions': []
+        }
+        tasks[task_id] = task
+        execution_ids.append((task_id, executor.execute_task(task)))
+
+    peak_threads = 0
+    while True:
+        peak_threads = max(peak_threads, process.num_threads())
+        running = sum(1 for task_id, execution_id in execution_ids
+                      if history.get_execution_record(task_id, execution_id)['status'] in ('running', 'paused'))
+        if not running:
+            break
+        time.sleep(0.25)
+
+    elapsed = time.monotonic() - started
+    cpu_after = process.cpu_times()
+    cpu_seconds = (cpu_after.user - cpu_before.user) + (cpu_after.system - cpu_before.system)
+    completed = sum(1 for task_id, execution_id in execution_ids
+                    if history.get_execution_record(task_id, execution_id)['status'] == 'completed')
+
+    executor.shutdown()
+    print(
+        json.dumps({
+            'mode': mode,
+            'concurrency': concurrency,
+            'peak_threads': peak_threads,
+            'cpu_seconds': round(cpu_seconds, 2),
+            'cpu_percent': round(cpu_seconds / elapsed * 100, 1),
+            'wall_seconds': round(elapsed, 1),
+            'completed': completed
+        }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark thread-based and asyncio-based task executors")
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[50, 200, 500])
+    parser.add_argument('--duration', type=int, default=20, help="seconds each execution runs")
+    parser.add_argument('--modes', nargs='+', default=['thread', 'async'], choices=['thread', 'async'])
+    parser.add_argument('--worker', nargs=3, metavar=('MODE', 'CONCURRENCY', 'WORK_DIR'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        mode, concurrency, work_dir = args.worker
+        run_worker(mode, int(concurrency), args.duration, work_dir)
+        return
+
+    with tempfile.TemporaryDirectory(prefix="fidlter-bench-") as work_dir:
+        bin_dir = os.path.join(work_dir, 'bin')
+        os.makedirs(bin_dir)
+        conda_path = os.path.join(bin_dir, 'conda')
+        with open(conda_path, 'w') as f:
+            f.write(CONDA_SHIM)
+        os.chmod(conda_path, os.stat(conda_path).st_mode | stat.S_IEXEC)
+        with open(os.path.join(work_dir, 'job.sh'), 'w') as f:
+            f.write(JOB_SCRIPT.format(duration=args.duration))
+
+        env = dict(os.environ,
+                   PATH=f"{bin_dir}{os.pathsep}{os.environ.get('PATH', '')}",
+                   FIDLTER_SCRATCH_ROOT=os.path.join(work_dir, 'scratch'),
+                   FIDLTER_CACHE_ROOT=os.path.join(work_dir, 'cache'))
+        print(f"{'mode':<8}{'concurrency':>12}{'peak threads':>14}{'CPU s':>9}{'CPU %':>8}{'wall s':>8}{'completed':>11}")
+        for concurrency in args.concurrency:
+            for mode in args.modes:
+                output = subprocess.run([
+                    sys.executable,
+                    os.path.abspath(__file__), '--duration',
+                    str(args.duration), '--worker', mode,
+                    str(concurrency), work_dir
+                ],
+                                        env=env,
+                                        capture_output=True,
+                                        text=True,
+                                        check=True).stdout
+                result = json.loads(output.strip().splitlines()[-1])
+                print(f"{result['mode']:<8}{result['concurrency']:>12}{result['peak_threads']:>14}"
+                      f"{result['cpu_seconds']:>9}{result['cpu_percent']:>8}{result['wall_seconds']:>8}"
+                      f"{result['completed']:>11}")
+
+
+if __name__ == '__main__':
+    main()
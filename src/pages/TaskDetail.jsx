@@ -22,7 +22,9 @@ import {
     CNavItem,
     CNavLink,
     CTabContent,
-    CTabPane
+    CTabPane,
+    CPagination,
+    CPaginationItem
 } from '@coreui/react';
 import CIcon from '@coreui/icons-react';
 import {
@@ -47,6 +49,9 @@ import { CChart } from '@coreui/react-chartjs';
 import GitTaskUpdate from '../components/TaskScheduler/GitTaskUpdate';
 import TaskScriptUpdater from '../components/TaskScheduler/TaskScriptUpdater';
 
+// 执行历史每页显示的条数
+const EXECUTIONS_PAGE_SIZE = 20;
+
 const TaskDetail = () => {
     const { taskId } = useParams();
     const navigate = useNavigate();
@@ -61,6 +66,8 @@ const TaskDetail = () => {
     const [activeLogTab, setActiveLogTab] = useState('combined'); // 添加日志标签页切换状态
     const [logEventSource, setLogEventSource] = useState(null); // 存储日志流EventSource实例
     const [logAlreadyOpened, setLogAlreadyOpened] = useState(false); // 添加状态来追踪日志是否已打开
+    const [executionPage, setExecutionPage] = useState(0); // 执行历史的当前页（从0开始）
+    const [executionPageData, setExecutionPageData] = useState(null); // 当前页的执行记录 { total, executions }
 
     // 检查URL参数是否要求显示日志
     useEffect(() => {
@@ -107,6 +114,36 @@ const TaskDetail = () => {
         };
     }, [dispatch, taskId]);
 
+    // 切换任务时回到执行历史的第一页
+    useEffect(() => {
+        setExecutionPage(0);
+        setExecutionPageData(null);
+    }, [taskId]);
+
+    // 分页获取执行历史，任务详情刷新时同时刷新当前页
+    useEffect(() => {
+        if (!taskId || !currentTaskDetails) return;
+
+        let cancelled = false;
+        taskService.getTaskExecutions(parseInt(taskId), {
+            offset: executionPage * EXECUTIONS_PAGE_SIZE,
+            limit: EXECUTIONS_PAGE_SIZE
+        }).then(data => {
+            if (!cancelled && data.success) {
+                setExecutionPageData({ total: data.total, executions: data.executions });
+            }
+        }).catch(() => {
+            // 获取失败时显示任务详情中最近的执行记录
+            if (!cancelled) {
+                setExecutionPageData(null);
+            }
+        });
+
+        return () => {
+            cancelled = true;
+        };
+    }, [taskId, executionPage, currentTaskDetails]);
+
     // 手动刷新任务详情
     const refreshTaskDetails = () => {
         dispatch(fetchTaskDetailsRequest({ taskId: parseInt(taskId) }));
@@ -254,7 +291,7 @@ const TaskDetail = () => {
 
         const { peak_memories, avg_memories, timestamps } = currentTaskDetails.performance_metrics;
 
-        if (peak_memories.length === 0 || avg_memories.length === 0) return null;
+        if (timestamps.length === 0 || [...peak_memories, ...avg_memories].every(value => value == null)) return null;
 
         return {
             labels: timestamps.map(ts => {
@@ -282,16 +319,53 @@ const TaskDetail = () => {
         };
     };
 
+    // 准备CPU使用图表数据
+    const prepareCpuChartData = () => {
+        if (!currentTaskDetails?.performance_metrics?.peak_cpus) return null;
+
+        const { peak_cpus, avg_cpus, timestamps } = currentTaskDetails.performance_metrics;
+
+        if (timestamps.length === 0 || [...peak_cpus, ...avg_cpus].every(value => value == null)) return null;
+
+        return {
+            labels: timestamps.map(ts => {
+                const date = new Date(ts);
+                return date.toLocaleString('zh-CN', { month: '2-digit', day: '2-digit', hour: '2-digit', minute: '2-digit' });
+            }),
+            datasets: [
+                {
+                    label: '峰值CPU (%)',
+                    backgroundColor: 'rgba(248, 108, 107, 0.2)',
+                    borderColor: '#f86c6b',
+                    pointBackgroundColor: '#f86c6b',
+                    pointBorderColor: '#fff',
+                    data: peak_cpus
+                },
+                {
+                    label: '平均CPU (%)',
+                    backgroundColor: 'rgba(99, 194, 222, 0.2)',
+                    borderColor: '#63c2de',
+                    pointBackgroundColor: '#63c2de',
+                    pointBorderColor: '#fff',
+                    data: avg_cpus
+                }
+            ]
+        };
+    };
+
     if (loading && !currentTaskDetails) {
         return <div className="text-center mt-5"><CSpinner color="primary" /></div>;
     }
 
     // 获取所有日志内容
     const task = currentTaskDetails?.task;
-    const executionHistory = currentTaskDetails?.execution_history || [];
+    const executionHistory = executionPageData?.executions || currentTaskDetails?.execution_history || [];
+    const executionTotal = executionPageData?.total ?? executionHistory.length;
+    const executionPageCount = Math.max(1, Math.ceil(executionTotal / EXECUTIONS_PAGE_SIZE));
     const { logs, isComplete } = getCurrentLogs();
     const performanceChartData = preparePerformanceChartData();
     const memoryChartData = prepareMemoryChartData();
+    const cpuChartData = prepareCpuChartData();
 
     return (
         <div>
@@ -488,8 +562,9 @@ const TaskDetail = () => {
 
                                 <CCol md={6}>
                                     <CCard className="mb-4">
-                                        <CCardHeader>
+                                        <CCardHeader className="d-flex justify-content-between align-items-center">
                                             <h5 className="mb-0">执行历史</h5>
+                                            <small className="text-muted">共 {executionTotal} 次执行</small>
                                         </CCardHeader>
                                         <CCardBody>
                                             {executionHistory.length > 0 ? (
@@ -537,6 +612,27 @@ const TaskDetail = () => {
                                                     <p>暂无执行历史记录</p>
                                                 </div>
                                             )}
+                                            {executionPageCount > 1 && (
+                                                <CPagination className="mt-3 justify-content-center" aria-label="执行历史分页">
+                                                    <CPaginationItem
+                                                        disabled={executionPage === 0}
+                                                        onClick={() => setExecutionPage(executionPage - 1)}
+                                                        style={{ cursor: 'pointer' }}
+                                                    >
+                                                        上一页
+                                                    </CPaginationItem>
+                                                    <CPaginationItem disabled>
+                                                        {executionPage + 1} / {executionPageCount}
+                                                    </CPaginationItem>
+                                                    <CPaginationItem
+                                                        disabled={executionPage >= executionPageCount - 1}
+                                                        onClick={() => setExecutionPage(executionPage + 1)}
+                                                        style={{ cursor: 'pointer' }}
+                                                    >
+                                                        下一页
+                                                    </CPaginationItem>
+                                                </CPagination>
+                                            )}
                                         </CCardBody>
                                     </CCard>
 
@@ -597,6 +693,34 @@ const TaskDetail = () => {
                                                         />
                                                     </>
                                                 )}
+
+                                                {cpuChartData && (
+                                                    <>
+                                                        <h6 className="mt-4">CPU使用历史</h6>
+                                                        <CChart
+                                                            type="line"
+                                                            data={cpuChartData}
+                                                            options={{
+                                                                plugins: {
+                                                                    legend: {
+                                                                        position: 'top',
+                                                                    }
+                                                                },
+                                                                scales: {
+                                                                    y: {
+                                                                        beginAtZero: true,
+                                                                        title: {
+                                                                            display: true,
+                                                                            text: 'CPU (%)'
+                                                                        }
+                                                                    }
+                                                                },
+                                                                maintainAspectRatio: false,
+                                                            }}
+                                                            style={{ height: '200px' }}
+                                                        />
+                                                    </>
+                                                )}
                                             </CCardBody>
                                         </CCard>
                                     )}
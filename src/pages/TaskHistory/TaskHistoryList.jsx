@@ -20,7 +20,14 @@ const STATUS_PRIORITY = {
     'stopped': 4,
     'success': 5,
     'completed': 5, // 和success同优先级
-    'failed': 6
+    'cached': 5,
+    'failed': 6,
+    'killed': 6,
+    'crashed': 6,
+    'oom_killed': 6,
+    'memory_limit': 6,
+    'timeout': 6,
+    'stalled': 6
 };
 
 // 状态选项
@@ -83,8 +90,22 @@ const TaskHistoryList = ({ taskHistory, onFilter, currentFilter = 'all' }) => {
             case 'success':
             case 'completed':
                 return <CBadge color="success">成功</CBadge>;
+            case 'cached':
+                return <CBadge color="success">未变化已跳过</CBadge>;
             case 'failed':
                 return <CBadge color="danger">失败</CBadge>;
+            case 'killed':
+                return <CBadge color="danger">被终止</CBadge>;
+            case 'crashed':
+                return <CBadge color="danger">崩溃</CBadge>;
+            case 'oom_killed':
+                return <CBadge color="danger">内存耗尽</CBadge>;
+            case 'memory_limit':
+                return <CBadge color="danger">超出内存限制</CBadge>;
+            case 'timeout':
+                return <CBadge color="danger">超时</CBadge>;
+            case 'stalled':
+                return <CBadge color="danger">卡死</CBadge>;
             case 'scheduled':
                 return <CBadge color="warning">已计划</CBadge>;
             case 'paused':
@@ -172,7 +193,14 @@ const TaskHistoryList = ({ taskHistory, onFilter, currentFilter = 'all' }) => {
             case 'running': return '运行中';
             case 'success':
             case 'completed': return '成功';
+            case 'cached': return '未变化已跳过';
             case 'failed': return '失败';
+            case 'killed': return '被终止';
+            case 'crashed': return '崩溃';
+            case 'oom_killed': return '内存耗尽';
+            case 'memory_limit': return '超出内存限制';
+            case 'timeout': return '超时';
+            case 'stalled': return '卡死';
             case 'scheduled': return '已计划';
             case 'paused': return '已暂停';
             case 'stopped': return '已停止';
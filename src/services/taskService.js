@@ -113,6 +113,10 @@ export const taskService = {
 
             // 处理错误
             eventSource.onerror = (error) => {
+                // 连接中断时浏览器会自动重连，并通过Last-Event-ID从中断的位置继续接收日志
+                if (eventSource.readyState === EventSource.CONNECTING) {
+                    return;
+                }
                 if (onError) {
                     onError(error);
                 }
@@ -135,6 +139,12 @@ export const taskService = {
         return response.data;
     },
 
+    // 分页获取任务的执行记录（最近的在前）
+    getTaskExecutions: async (taskId, { offset = 0, limit = 50 } = {}) => {
+        const response = await axios.get(`/api/tasks/${taskId}/executions?offset=${offset}&limit=${limit}`);
+        return response.data;
+    },
+
     // 删除任务
     deleteTask: async (taskId) => {
         const response = await axios.delete(`/api/tasks/${taskId}`);